@@ -0,0 +1,50 @@
+"""
+管理用APIの認証 - ADMIN_TOKEN と一致するトークンを持つリクエストのみ許可する
+
+トークンは X-Admin-Token ヘッダー、または Authorization: Bearer <トークン> で指定します。
+ADMIN_TOKEN が未設定の場合、管理用APIは無効（404）になります。
+"""
+
+import hmac
+from functools import wraps
+from typing import Optional
+
+from flask import jsonify, request
+
+from settings import get_settings
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def request_admin_token() -> Optional[str]:
+    """現在のリクエストで指定されたトークン"""
+    token = request.headers.get(ADMIN_TOKEN_HEADER)
+    if token:
+        return token
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials.strip()
+    return None
+
+
+def is_admin_request() -> bool:
+    """現在のリクエストが管理者のトークンを持っているか"""
+    expected = get_settings().admin_token
+    supplied = request_admin_token()
+    if not expected or not supplied:
+        return False
+    return hmac.compare_digest(supplied.encode("utf-8"), expected.encode("utf-8"))
+
+
+def require_admin(view):
+    """管理者のトークンを持つリクエストのみビュー関数を実行するデコレータ"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not get_settings().admin_token:
+            return jsonify({"success": False, "error": "Not Found"}), 404
+        if not is_admin_request():
+            return jsonify({"success": False, "error": "管理者の認証が必要です"}), 401
+        return view(*args, **kwargs)
+    return wrapper
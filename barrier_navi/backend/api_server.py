@@ -2,25 +2,46 @@
 Flask APIサーバー - stationsデータベースからデータを提供
 """
 
+import hashlib
 import json
 import os
-from typing import Dict, Any, List, Optional
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Mapping, Optional, Tuple
 from datetime import datetime
 
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, after_this_request, g, jsonify, request
 from flask_cors import CORS
-from dotenv import load_dotenv
-from database_connection import DatabaseConnection
-import bcrypt
-import os
-
-# プロジェクトルートのパスを設定
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-# .envファイルから環境変数を読み込む
-# プロジェクトルートの.envを読み込む
-env_path = os.path.join(BASE_DIR, '.env')
-load_dotenv(dotenv_path=env_path)
+from settings import BASE_DIR, config_summary, get_settings
+from structured_logging import configure_logging, init_request_logging
+from metrics import WARMUP_ENVIRON_KEY, init_metrics, render_metrics, span
+from query_stats import query_stats
+from admin_auth import require_admin
+from user_auth import issue_user_token, require_user
+from request_profiler import create_request_profiler, init_request_profiling
+from database_connection import BaseDatabaseConnection
+from db_router import create_database_router
+from json_serializer import FastJSONProvider, dumps, json_bytes_response, ndjson_response, splice_fragments
+from station_snapshot import StationSnapshot, StationSnapshotStore
+from station_record import StationRow
+from compiled_dataset import CompiledDataset
+from scoring import CompiledMetric, compile_definition, compile_definitions, ratio_parts
+from personalized_ranking import personal_modes, personal_score, personal_weights, rank_stations
+from http_cache import conditional_get
+from single_flight import coalesce_requests, request_key
+from result_cache import create_result_cache
+from readiness import Readiness, wait_for
+from compression import init_compression
+from static_assets import StaticAssets
+import logging
+import threading
+import time
+
+# 環境変数（プロジェクトルートの.envを含む）から読み込んだ設定
+settings = get_settings()
+
+# ログはJSON形式でキュー経由で出力する（リクエストを処理するスレッドでは書き込まない）
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # フロントエンドファイルのパスを設定
 FRONTEND_DIR = os.path.join(BASE_DIR, 'frontend')
@@ -28,39 +49,58 @@ VIEW_DIR = os.path.join(FRONTEND_DIR, 'view')
 DIST_DIR = os.path.join(FRONTEND_DIR, 'dist')
 
 app = Flask(__name__, static_folder=FRONTEND_DIR, static_url_path='')
+init_metrics(app)  # ルートごとの処理時間と内訳（DB・スコア計算・ソート・JSONエンコード）を記録
 CORS(app)  # CORSを有効化してフロントエンドからのアクセスを許可
+app.json = FastJSONProvider(app)  # 日本語をエスケープせずUTF-8のまま出力（orjsonがあれば使用）
+init_compression(app)  # 一定サイズ以上のAPIレスポンスをbrotli/gzipで圧縮
+init_request_logging(app)  # リクエストごとのID（X-Request-ID）をログとレスポンスに付与
+static_assets = StaticAssets(FRONTEND_DIR)  # 事前圧縮済みファイル・ハッシュ付きURLでの静的ファイル配信
+request_profiler = create_request_profiler()
+init_request_profiling(app, request_profiler)  # 管理者の ?_profile=1 とN件に1件のサンプリングでプロファイル
 
 # MySQL接続情報（環境変数から取得）
 # 注意: パスワードは必ず.envファイルで設定してください
-MYSQL_CONFIG = {
-    "host": os.getenv("MYSQL_HOST", "localhost"),
-    "port": int(os.getenv("MYSQL_PORT", "3306")),
-    "user": os.getenv("MYSQL_USER", "root"),
-    "password": os.getenv("MYSQL_PASSWORD", ""),  # デフォルト値は空文字列（.envファイル必須）
-    "database": os.getenv("MYSQL_DATABASE", "station")
-}
+MYSQL_CONFIG = settings.mysql_config
+
+# 接続先のデータベース（DB_BACKEND=sqlite の場合はSQLiteのファイル）
+DATABASE_CONFIG = settings.database_config
 
-# デバッグ: 環境変数の読み込み状況を確認
-print("=== 環境変数の読み込み状況 ===")
-print(f".envファイルのパス: {env_path}")
-print(f".envファイルの存在: {os.path.exists(env_path)}")
-print(f"MYSQL_HOST: {MYSQL_CONFIG['host']}")
-print(f"MYSQL_PORT: {MYSQL_CONFIG['port']}")
-print(f"MYSQL_USER: {MYSQL_CONFIG['user']}")
-print(f"MYSQL_PASSWORD: {'***' if MYSQL_CONFIG['password'] else '(未設定)'}")
-print(f"MYSQL_DATABASE: {MYSQL_CONFIG['database']}")
-print("=" * 40)
-
-# .envファイルが設定されているか確認（開発時の警告）
-if not MYSQL_CONFIG["password"]:
-    print("\n⚠️  警告: MYSQL_PASSWORDが設定されていません。")
-    print(f"   .envファイルを確認してください: {env_path}")
-    print("   .envファイルの例:")
-    print("   MYSQL_HOST=localhost")
-    print("   MYSQL_PORT=3306")
-    print("   MYSQL_USER=root")
-    print("   MYSQL_PASSWORD=your_password_here")
-    print("   MYSQL_DATABASE=station\n")
+# 読み込み専用のクエリはレプリカ（MYSQL_REPLICA_HOSTS）に、書き込みはプライマリに接続する
+database_router = create_database_router(settings)
+
+# 書き込んだクライアントの読み込みをプライマリに接続する期限（UNIX時刻）を保持するCookie
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+READ_YOUR_WRITES_SECONDS = settings.read_your_writes_seconds
+
+
+def connect_read_database() -> BaseDatabaseConnection:
+    """
+    読み込み専用のエンドポイントの接続（レプリカ）
+
+    直前に書き込んだクライアント（READ_YOUR_WRITES_COOKIE の期限内）はプライマリに接続し、
+    レプリカへの反映が遅れていても書き込んだ内容を読めるようにします。
+    """
+    try:
+        primary_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except (RuntimeError, ValueError):
+        # リクエストの外（スナップショットの更新など）・不正な値
+        primary_until = 0
+    if primary_until > time.time():
+        return database_router.primary()
+    return database_router.replica()
+
+
+def read_your_writes():
+    """書き込んだクライアントの以後の読み込みを READ_YOUR_WRITES_SECONDS 秒間プライマリに接続する（書き込み後に呼ぶ）"""
+    if not database_router.has_replicas:
+        return
+
+    @after_this_request
+    def set_cookie(response):
+        primary_until = time.time() + READ_YOUR_WRITES_SECONDS
+        response.set_cookie(READ_YOUR_WRITES_COOKIE, f"{primary_until:.3f}",
+                            max_age=int(READ_YOUR_WRITES_SECONDS) + 1, httponly=True, samesite="Lax")
+        return response
 
 BODY_METRIC_DEFINITIONS: Dict[str, Dict[str, Any]] = {
     # フラグ型（〇×で表せる項目）：設置されていれば1点
@@ -134,50 +174,86 @@ BODY_QUERY_COLUMNS = BODY_BASE_COLUMNS + [
     "num_wheelchair_accessible_platforms",
 ]
 
+# stationsテーブルの全カラム（DDL.sqlの定義順）。fieldsパラメータの検証に使用する
+STATION_COLUMNS = [
+    "id",
+    "railway_operator",
+    "station_name",
+    "line_name",
+    "prefecture",
+    "city",
+    "step_response_status",
+    "num_platforms",
+    "num_step_free_platforms",
+    "num_elevators",
+    "num_compliant_elevators",
+    "num_escalators",
+    "num_compliant_escalators",
+    "num_other_lifts",
+    "num_slopes",
+    "num_compliant_slopes",
+    "has_tactile_paving",
+    "has_guidance_system",
+    "has_accessible_restroom",
+    "has_accessible_gate",
+    "has_accessible_ticket_machine",
+    "num_wheelchair_accessible_platforms",
+    "has_fall_prevention",
+]
+
+
+def parse_fields_param() -> Optional[List[str]]:
+    """
+    fieldsパラメータ（カンマ区切りのカラム名）を解析する
 
-def evaluate_metric(value: Any, definition: Dict[str, Any], row: Dict[str, Any] = None) -> Dict[str, Any]:
-    metric_type = definition.get("type", "flag")
+    Returns:
+        取得するカラム名のリスト（未指定の場合はNone＝全カラム）
+
+    Raises:
+        ValueError: stationsテーブルに存在しないカラム名が指定された場合
+    """
+    fields_param = request.args.get('fields', default='', type=str)
+    if not fields_param.strip():
+        return None
+
+    fields: List[str] = []
+    for field in fields_param.split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if field not in STATION_COLUMNS:
+            raise ValueError(f"Unknown field: {field}")
+        if field not in fields:
+            fields.append(field)
+
+    return fields or None
+
+
+def build_select_columns(fields: Optional[List[str]]) -> str:
+    """SELECT句のカラムリストを作成（fieldsは検証済みのカラム名のみ）"""
+    return ", ".join(fields) if fields else "*"
+
+
+def evaluate_metric(value: Any, definition: Dict[str, Any], row: Optional[StationRow] = None,
+                    metric: Optional[CompiledMetric] = None) -> Dict[str, Any]:
+    """
+    評価項目の詳細（表示用の値・達成度・基準を満たすか）
+
+    値と基準を満たすかはスコアと同じコンパイル済みの評価項目（metric.measure）で判定します。
+    metric を省略した場合は definition をコンパイルします（同じ定義の辞書は2回目以降コンパイル済みのもの）。
+    """
+    if metric is None:
+        metric = compile_definition(definition)
     required = definition.get("required", 1) or 1
+    measured, met = metric.measure(value, row)
     result: Dict[str, Any] = {"raw_value": value, "required": required}
 
-    if metric_type == "flag":
-        met = str(value).strip() == "1"
-        ratio = 1.0 if met else 0.0
-        result.update({"processed_value": "○" if met else "×", "ratio": ratio, "met": met})
-    elif metric_type == "ratio":
+    if metric.type == "flag":
+        result.update({"processed_value": "○" if met else "×", "ratio": measured, "met": met})
+    elif metric.type == "ratio":
         # 割合型: 分子と分母のフィールドから計算
-        numerator_key = definition.get("numerator")
-        denominator_key = definition.get("denominator")
-        if row and numerator_key and denominator_key:
-            try:
-                numerator = float(row.get(numerator_key, 0) or 0)
-                denominator = float(row.get(denominator_key, 0) or 0)
-            except (TypeError, ValueError):
-                numerator = 0.0
-                denominator = 0.0
-            
-            if denominator > 0:
-                calculated_ratio = numerator / denominator
-                percentage = calculated_ratio * 100
-                met = calculated_ratio >= required
-                result.update({
-                    "processed_value": f"{int(numerator)}/{int(denominator)} ({percentage:.1f}%)",
-                    "numerator": int(numerator),
-                    "denominator": int(denominator),
-                    "percentage": round(percentage, 1),
-                    "ratio": calculated_ratio,
-                    "met": met
-                })
-            else:
-                result.update({
-                    "processed_value": "0/0 (0.0%)",
-                    "numerator": 0,
-                    "denominator": 0,
-                    "percentage": 0.0,
-                    "ratio": 0.0,
-                    "met": False
-                })
-        else:
+        parts = ratio_parts(row, definition.get("numerator"), definition.get("denominator"))
+        if parts is None:
             result.update({
                 "processed_value": "-",
                 "numerator": 0,
@@ -186,29 +262,48 @@ def evaluate_metric(value: Any, definition: Dict[str, Any], row: Dict[str, Any]
                 "ratio": 0.0,
                 "met": False
             })
+        elif parts[1] > 0:
+            numerator, denominator = parts
+            percentage = measured * 100
+            result.update({
+                "processed_value": f"{int(numerator)}/{int(denominator)} ({percentage:.1f}%)",
+                "numerator": int(numerator),
+                "denominator": int(denominator),
+                "percentage": round(percentage, 1),
+                "ratio": measured,
+                "met": met
+            })
+        else:
+            result.update({
+                "processed_value": "0/0 (0.0%)",
+                "numerator": 0,
+                "denominator": 0,
+                "percentage": 0.0,
+                "ratio": 0.0,
+                "met": False
+            })
     else:
-        try:
-            numeric_value = float(value) if value is not None else 0.0
-        except (TypeError, ValueError):
-            numeric_value = 0.0
-        ratio = min(numeric_value / required, 1.0) if required else 0.0
-        met = numeric_value >= required
-        result.update({"processed_value": numeric_value, "ratio": ratio, "met": met})
+        ratio = min(measured / required, 1.0) if required else 0.0
+        result.update({"processed_value": measured, "ratio": ratio, "met": met})
 
     return result
 
 
-def compute_score(row: Dict[str, Any], definitions: Dict[str, Any], include_details: bool = False) -> Dict[str, Any]:
-    """指定された基準(definitions)に基づいてスコアを計算"""
-    met_items = 0
-    details: List[Dict[str, Any]] = []
+def compute_score(row: StationRow, definitions: Dict[str, Any], include_details: bool = False) -> Dict[str, Any]:
+    """
+    指定された基準(definitions)に基づいてスコアを計算
 
-    for field, definition in definitions.items():
-        metric_result = evaluate_metric(row.get(field), definition, row=row)
-        if metric_result["met"]:
-            met_items += 1
+    定義はコンパイル済みの評価器（scoring.ScoreEvaluator）で計算します。
+    weight・curve を指定した定義では、達成率は重み付きの部分点から計算し、points・max_points を含めます。
+    """
+    evaluator = compile_definitions(definitions)
+    score = evaluator.score(row)
+    details: List[Dict[str, Any]] = []
 
-        if include_details:
+    if include_details:
+        credits = evaluator.credits(row) if evaluator.weighted else None
+        for index, (field, definition) in enumerate(definitions.items()):
+            metric_result = evaluate_metric(row.get(field), definition, row=row, metric=evaluator.metrics[index])
             detail_item = {
                 "key": field,
                 "label": definition["label"],
@@ -224,20 +319,17 @@ def compute_score(row: Dict[str, Any], definitions: Dict[str, Any], include_deta
                 detail_item["numerator"] = metric_result.get("numerator", 0)
                 detail_item["denominator"] = metric_result.get("denominator", 0)
                 detail_item["percentage"] = metric_result.get("percentage", 0.0)
+            # 重み付きの場合は項目の重みと点を含める
+            if credits is not None:
+                detail_item["weight"] = evaluator.metrics[index].weight
+                detail_item["credit"] = round(credits[index][0], 3)
             details.append(detail_item)
 
-    total_items = len(definitions)
-    percentage = (met_items / total_items) * 100 if total_items > 0 else 0
-    
-    return {
-        "met_items": met_items,
-        "total_items": total_items,
-        "percentage": round(percentage, 1),
-        "details": details if include_details else None
-    }
+    score["details"] = details if include_details else None
+    return score
 
 
-def build_station_response(row: Dict[str, Any], mode: str = 'body', include_details: bool = False) -> Dict[str, Any]:
+def build_station_response(row: StationRow, mode: str = 'body', include_details: bool = False) -> Dict[str, Any]:
     """レスポンス用データの構築（モードで切り替え）"""
     # モードに応じて評価基準を切り替える
     definitions = HEARING_METRIC_DEFINITIONS if mode == 'hearing' else VISION_METRIC_DEFINITIONS if mode == 'vision' else BODY_METRIC_DEFINITIONS
@@ -258,112 +350,280 @@ def build_station_response(row: Dict[str, Any], mode: str = 'body', include_deta
             "label": f"{score['met_items']}/{score['total_items']}点"
         }
     }
+    if "points" in score:
+        response["score"]["points"] = score["points"]
+        response["score"]["max_points"] = score["max_points"]
     if include_details:
         response["metrics"] = score["details"]
     return response
 
+
+# スナップショット用の全駅の取得（駅名順）
+SNAPSHOT_QUERY = f"SELECT {', '.join(STATION_COLUMNS)} FROM stations ORDER BY station_name"
+
+
+def load_station_rows() -> List[Dict[str, Any]]:
+    """
+    スナップショット用にstationsテーブルの全行を取得
+
+    スナップショットのバージョンは /api/stations などの生データのETagにも使うため、
+    スコア計算に使うカラム（BODY_QUERY_COLUMNS）だけでなく全カラム（STATION_COLUMNS）を取得します。
+    """
+    db = connect_read_database()
+    try:
+        return db.execute_query(SNAPSHOT_QUERY)
+    finally:
+        db.close()
+
+
+# stationsテーブルの内容の指紋（行数と、行ごとの全カラムのCRC32を駅IDで重み付けした合計）
+# コンパイル済みのデータセットが現在のDBの内容から作成されたかの確認に使う（全駅を読み込むより軽い集計のみ）
+STATION_FINGERPRINT_QUERY = (
+    "SELECT COUNT(*) AS count, SUM((id % 101 + 1) * CRC32(CONCAT_WS('|', "
+    + ", ".join(f"COALESCE({column}, '-')" for column in STATION_COLUMNS)
+    + "))) AS checksum FROM stations"
+)
+
+
+def load_station_fingerprint() -> str:
+    """stationsテーブルの内容の指紋（内容が変わると変わる）"""
+    db = connect_read_database()
+    try:
+        row = db.execute_query(STATION_FINGERPRINT_QUERY)[0]
+    finally:
+        db.close()
+    return f"{int(row['count'])}:{int(row['checksum'] or 0)}"
+
+
+# 事前計算するモード
+SNAPSHOT_MODES = ('body', 'hearing', 'vision')
+
+# 全モードの評価項目（同じ項目は1つにまとめる）。個人向けのランキングで駅ごとの点を事前計算する
+ALL_METRIC_DEFINITIONS: Dict[str, Dict[str, Any]] = {
+    **BODY_METRIC_DEFINITIONS, **HEARING_METRIC_DEFINITIONS, **VISION_METRIC_DEFINITIONS,
+}
+ALL_METRICS_EVALUATOR = compile_definitions(ALL_METRIC_DEFINITIONS)
+
+# 評価基準の定義のバージョン（コンパイル済みのデータセットが現在の定義で作成されたかの確認に使う）
+SCORING_VERSION = hashlib.sha1(dumps([
+    BODY_METRIC_DEFINITIONS, HEARING_METRIC_DEFINITIONS, VISION_METRIC_DEFINITIONS, BODY_QUERY_COLUMNS,
+])).hexdigest()[:16]
+
+# コンパイル済みのデータセット（COMPILED_DATASET）
+COMPILED_DATASET_PATH = settings.compiled_dataset_path
+
+
+def load_snapshot() -> StationSnapshot:
+    """
+    駅データのスナップショットを読み込む
+
+    COMPILED_DATASET が設定されている場合はコンパイル済みのファイルをmmapで読み込み（DBには指紋の集計のみ問い合わせる）、
+    ファイルがない・評価基準の定義が異なる・DBの内容が作成時から変わっている場合はDBから読み込んで計算します。
+    """
+    if COMPILED_DATASET_PATH:
+        try:
+            return CompiledDataset(COMPILED_DATASET_PATH, build_station_response, scoring_version=SCORING_VERSION,
+                                   db_fingerprint=load_station_fingerprint())
+        except (OSError, ValueError) as e:
+            logger.warning("コンパイル済みのデータセットを読み込めません（DBから読み込みます）: %s", e)
+    return StationSnapshot(load_station_rows(), build_station_response)
+
+
+# 駅データのスナップショット（モード別のスコアとJSON断片を事前計算して保持）
+station_snapshot = StationSnapshotStore(load_snapshot)
+
+
+def wants_ndjson() -> bool:
+    """NDJSON形式で1件ずつストリーミングするか（Accept: application/x-ndjson または stream=1）"""
+    if request.args.get('stream', default='', type=str).lower() in ('1', 'true'):
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+
+# データセットのバージョンをキーにしたETag・条件付きGET（駅データAPIに適用）
+dataset_conditional_get = conditional_get(
+    lambda: station_snapshot.get().version,
+    lambda: "ndjson" if wants_ndjson() else "json"
+)
+
+# 作成済みの一覧レスポンスのキャッシュ（バイト数上限つきのLRU/TTL）
+list_result_cache = create_result_cache()
+
+# 同時に届いた同じ条件の一覧・統計APIの処理を1回にまとめる（ストリーミングは対象外）
+coalesce_dataset_requests = coalesce_requests(lambda: None if wants_ndjson() else request_key())
+
+
+def stream_station_fragments(db: BaseDatabaseConnection, query: str, params: tuple, mode: str,
+                             sort_order: str, offset: int, limit: Optional[int]) -> Iterator[bytes]:
+    """
+    一覧の駅データをJSON断片として1件ずつ返す（NDJSONストリーミング用）
+
+    ソートなし（駅名順）の場合はDBから読みながら送信するため、件数によらずメモリ使用量は一定です。
+    スコア順の場合は全件を見ないと順序が決まらないため、(達成率, JSON断片)のみを保持してソートします。
+    """
+    rows = db.iter_query(query, params)
+    try:
+        snapshot = station_snapshot.get()
+        entries = (snapshot.entry(mode, row) for row in rows)
+        if sort_order in ('score-asc', 'score-desc'):
+            entries = iter(sorted(entries, key=lambda x: x[0], reverse=sort_order == 'score-desc'))
+
+        stop = offset + limit if limit is not None else None
+        for _, fragment in islice(entries, offset, stop):
+            yield fragment
+    finally:
+        rows.close()
+
 # ---------------------------------------------------------
 # ★これを新しく追加してください（共通の検索・取得ロジック）
 # ---------------------------------------------------------
-def get_stations_with_score(mode: str):
-    try:
-        # モードに応じた定義を選択
-        definitions = HEARING_METRIC_DEFINITIONS if mode == 'hearing' else VISION_METRIC_DEFINITIONS if mode == 'vision' else BODY_METRIC_DEFINITIONS
-        
-        keyword = request.args.get('keyword', default='', type=str).strip()
-        prefecture = request.args.get('prefecture', default=None, type=str)
-        line_name = request.args.get('line_name', default=None, type=str)
-        limit = request.args.get('limit', default=20, type=int)
-        offset = request.args.get('offset', default=0, type=int)
-        filters_param = request.args.get('filters', default=None, type=str)
-        sort_order = request.args.get('sort', default='none', type=str)
+def get_definitions(mode: str) -> Dict[str, Dict[str, Any]]:
+    """モードに応じた評価基準の定義を返す"""
+    return HEARING_METRIC_DEFINITIONS if mode == 'hearing' else VISION_METRIC_DEFINITIONS if mode == 'vision' else BODY_METRIC_DEFINITIONS
 
-        filter_list = []
-        if filters_param:
-            try:
-                filter_list = json.loads(filters_param)
-                if not isinstance(filter_list, list):
-                    filter_list = []
-            except json.JSONDecodeError:
-                filter_list = []
 
-        where_clause = "FROM stations WHERE 1=1"
-        params: List[Any] = []
+def parse_int_arg(args: Mapping[str, str], key: str, default: Optional[int]) -> Optional[int]:
+    """クエリパラメータを整数に変換（未指定・変換できない場合はdefault）"""
+    try:
+        return int(args.get(key))
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_station_list_args(args: Mapping[str, str], stream: bool = False) -> Dict[str, Any]:
+    """
+    一覧APIのクエリパラメータを解析
+
+    Args:
+        args: クエリパラメータ（Flaskのrequest.argsなど、get()で値を取得できるもの）
+        stream: NDJSONでストリーミングするか（limit指定がなければ全件を返す）
+    """
+    filter_list = []
+    filters_param = args.get('filters')
+    if filters_param:
+        try:
+            filter_list = json.loads(filters_param)
+            if not isinstance(filter_list, list):
+                filter_list = []
+        except json.JSONDecodeError:
+            filter_list = []
 
-        if keyword:
-            where_clause += " AND station_name LIKE %s"
-            params.append(f"%{keyword}%")
-        if prefecture:
-            where_clause += " AND prefecture = %s"
-            params.append(prefecture)
-        if line_name:
-            search_line = line_name.replace('線', '')
-            if search_line.endswith('新幹'):
-                 pass 
-            where_clause += " AND line_name LIKE %s"
-            params.append(f"%{search_line}%")
-
-        # 定義に基づいてフィルタリング
-        for filter_key in filter_list:
-            if filter_key in definitions:
-                metric_def = definitions[filter_key]
-                if metric_def["type"] == "flag":
-                    where_clause += f" AND {filter_key} = %s"
-                    params.append(1)
-                elif metric_def["type"] == "ratio":
-                    # 割合型: 分子と分母の両方が存在し、割合が基準値以上であることを確認
-                    numerator_key = metric_def.get("numerator")
-                    denominator_key = metric_def.get("denominator")
-                    required_ratio = metric_def.get("required", 0.8)
-                    if numerator_key and denominator_key:
-                        # 分母が0より大きく、分子/分母 >= 基準値 の条件
-                        where_clause += f" AND {denominator_key} > 0 AND ({numerator_key} / NULLIF({denominator_key}, 0)) >= %s"
-                        params.append(required_ratio)
-                else:
-                    where_clause += f" AND {filter_key} > %s"
-                    params.append(0)
+    return {
+        "keyword": (args.get('keyword') or '').strip(),
+        "prefecture": args.get('prefecture') or None,
+        "line_name": args.get('line_name') or None,
+        "limit": parse_int_arg(args, 'limit', None if stream else 20),
+        "offset": parse_int_arg(args, 'offset', 0),
+        "filters": filter_list,
+        "sort": args.get('sort') or 'none',
+    }
 
-        db = DatabaseConnection(**MYSQL_CONFIG)
 
-        # ソート処理変更前（ページごとにDBから取得）
-        # count_query = f"SELECT COUNT(*) as total {where_clause}"
-        # count_result = db.execute_query(count_query, tuple(params))
-        # total_count = count_result[0]['total'] if count_result else 0
+def build_station_list_query(mode: str, list_args: Dict[str, Any]) -> Tuple[str, tuple]:
+    """一覧APIの検索条件からSQLとパラメータを作成（並び順は駅名順）"""
+    # モードに応じた定義を選択
+    definitions = get_definitions(mode)
+
+    where_clause = "FROM stations WHERE 1=1"
+    params: List[Any] = []
+
+    if list_args["keyword"]:
+        where_clause += " AND station_name LIKE %s"
+        params.append(f"%{list_args['keyword']}%")
+    if list_args["prefecture"]:
+        where_clause += " AND prefecture = %s"
+        params.append(list_args["prefecture"])
+    if list_args["line_name"]:
+        search_line = list_args["line_name"].replace('線', '')
+        where_clause += " AND line_name LIKE %s"
+        params.append(f"%{search_line}%")
+
+    # 定義に基づいてフィルタリング
+    for filter_key in list_args["filters"]:
+        if filter_key in definitions:
+            metric_def = definitions[filter_key]
+            if metric_def["type"] == "flag":
+                where_clause += f" AND {filter_key} = %s"
+                params.append(1)
+            elif metric_def["type"] == "ratio":
+                # 割合型: 分子と分母の両方が存在し、割合が基準値以上であることを確認
+                numerator_key = metric_def.get("numerator")
+                denominator_key = metric_def.get("denominator")
+                required_ratio = metric_def.get("required", 0.8)
+                if numerator_key and denominator_key:
+                    # 分母が0より大きく、分子/分母 >= 基準値 の条件
+                    where_clause += f" AND {denominator_key} > 0 AND ({numerator_key} / NULLIF({denominator_key}, 0)) >= %s"
+                    params.append(required_ratio)
+            else:
+                where_clause += f" AND {filter_key} > %s"
+                params.append(0)
 
-        # columns = ", ".join(BODY_QUERY_COLUMNS)
-        # query = f"SELECT {columns} {where_clause} ORDER BY station_name LIMIT %s OFFSET %s"
-        # data_params = params + [limit, offset]
-        # rows = db.execute_query(query, tuple(data_params))
-        # db.close()
-        # ここで mode を渡してレスポンスを作る
-        # data = [build_station_response(row, mode=mode, include_details=False) for row in rows]
+    # 全件取得してアプリ側でソート・ページングする
+    columns = ", ".join(BODY_QUERY_COLUMNS)
+    return f"SELECT {columns} {where_clause} ORDER BY station_name", tuple(params)
 
 
-        # ソート処理変更後（全件取得してアプリ側でソート・ページング）
-        columns = ", ".join(BODY_QUERY_COLUMNS)
-        query = f"SELECT {columns} {where_clause} ORDER BY station_name"
+def station_list_cache_key(version: str, mode: str, list_args: Dict[str, Any]) -> tuple:
+    """一覧APIの結果キャッシュのキー（データセットのバージョン・モード・検索条件・ページ）"""
+    return (
+        version, mode,
+        list_args["keyword"], list_args["prefecture"], list_args["line_name"],
+        json.dumps(list_args["filters"], ensure_ascii=False),
+        list_args["sort"], list_args["offset"], list_args["limit"],
+    )
 
-        rows = db.execute_query(query, tuple(params))
-        db.close()
 
-        all_data = [build_station_response(row, mode=mode, include_details=False) for row in rows]
-        total_count = len(all_data)
+def render_station_list(rows: Iterable[Dict[str, Any]], snapshot: StationSnapshot, mode: str,
+                        sort_order: str, offset: int, limit: int) -> bytes:
+    """検索結果の行をスコア順に並べ替え・ページングして一覧APIのレスポンス（JSON）を作成"""
+    # スコアとJSON断片はスナップショットで事前計算済みのものを使う
+    with span("scoring"):
+        all_entries = snapshot.entries(mode, rows)
+    total_count = len(all_entries)
 
+    with span("sort"):
         if sort_order == 'score-asc':
-            all_data.sort(key=lambda x: x['score']['percentage'])
+            all_entries.sort(key=lambda x: x[0])
         elif sort_order == 'score-desc':
-            all_data.sort(key=lambda x: x['score']['percentage'], reverse=True)
+            all_entries.sort(key=lambda x: x[0], reverse=True)
 
-        start = offset
-        end = offset + limit
-        paged_data = all_data[start:end]
+    paged_entries = all_entries[offset:offset + limit]
 
-        return jsonify({
+    # JSON断片を再エンコードせずにそのまま連結する
+    with span("serialize"):
+        return splice_fragments({
             "success": True,
-            "data": paged_data,
-            "count": len(paged_data),
+            "count": len(paged_entries),
             "total_count": total_count
-        })
+        }, "data", (fragment for _, fragment in paged_entries))
+
+
+def get_stations_with_score(mode: str):
+    try:
+        stream = wants_ndjson()
+        list_args = parse_station_list_args(request.args, stream=stream)
+        query, params = build_station_list_query(mode, list_args)
+
+        if stream:
+            db = connect_read_database()
+            response = ndjson_response(stream_station_fragments(
+                db, query, params, mode, list_args["sort"], list_args["offset"], list_args["limit"]))
+            response.call_on_close(db.close)
+            return response
+
+        snapshot = station_snapshot.get()
+        cache_key = station_list_cache_key(snapshot.version, mode, list_args)
+        body = list_result_cache.get(cache_key)
+        if body is None:
+            db = connect_read_database()
+            rows = db.execute_query(query, params)
+            db.close()
+
+            body = render_station_list(rows, snapshot, mode,
+                                       list_args["sort"], list_args["offset"], list_args["limit"])
+            list_result_cache.set(cache_key, body)
+        return json_bytes_response(body)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -372,36 +632,59 @@ def get_station_detail_with_score(station_id: int, mode: str):
     try:
         columns = ", ".join(BODY_QUERY_COLUMNS)
         query = f"SELECT {columns} FROM stations WHERE id = %s"
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         rows = db.execute_query(query, (station_id,))
         db.close()
 
         if not rows:
             return jsonify({"success": False, "error": "Station not found"}), 404
 
-        detail = build_station_response(rows[0], mode=mode, include_details=True)
+        with span("scoring"):
+            detail = build_station_response(rows[0], mode=mode, include_details=True)
         return jsonify({"success": True, "data": detail})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
 @app.route('/api/stations', methods=['GET'])
+@dataset_conditional_get
 def get_stations():
     """全駅データを取得"""
     try:
-        limit = request.args.get('limit', default=100, type=int)
+        fields = parse_fields_param()
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    try:
+        stream = wants_ndjson()
+        # ストリーミング時はlimit指定がなければ全件を返す（エクスポート用）
+        limit = request.args.get('limit', default=None if stream else 100, type=int)
         offset = request.args.get('offset', default=0, type=int)
         prefecture = request.args.get('prefecture', default=None, type=str)
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         
-        query = "SELECT * FROM stations WHERE 1=1"
+        query = f"SELECT {build_select_columns(fields)} FROM stations WHERE 1=1"
         params = []
         
         if prefecture:
             query += " AND prefecture = %s"
             params.append(prefecture)
         
+        if stream:
+            if limit is not None:
+                query += " LIMIT %s OFFSET %s"
+                params.extend([limit, offset])
+            rows = db.iter_query(query, tuple(params) if params else None)
+            skip = offset if limit is None else 0
+            response = ndjson_response(dumps(row) for row in islice(rows, skip, None))
+            response.call_on_close(rows.close)
+            response.call_on_close(db.close)
+            return response
+        
         query += " LIMIT %s OFFSET %s"
         params.extend([limit, offset])
         
@@ -421,12 +704,21 @@ def get_stations():
 
 
 @app.route('/api/stations/<int:station_id>', methods=['GET'])
+@dataset_conditional_get
 def get_station(station_id):
     """特定の駅データを取得"""
     try:
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        fields = parse_fields_param()
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    try:
+        db = connect_read_database()
         stations = db.execute_query(
-            "SELECT * FROM stations WHERE id = %s",
+            f"SELECT {build_select_columns(fields)} FROM stations WHERE id = %s",
             (station_id,)
         )
         db.close()
@@ -449,10 +741,12 @@ def get_station(station_id):
 
 
 @app.route('/api/stations/count', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_stations_count():
     """駅の総数を取得"""
     try:
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         result = db.execute_query("SELECT COUNT(*) as total FROM stations")
         db.close()
         
@@ -467,18 +761,24 @@ def get_stations_count():
         }), 500
 
 
+# 都道府県ごとの駅数（(prefecture, station_name) のインデックスだけで集計できる）
+PREFECTURE_COUNTS_QUERY = """
+    SELECT prefecture, COUNT(*) as count
+    FROM stations
+    WHERE prefecture IS NOT NULL
+    GROUP BY prefecture
+    ORDER BY count DESC
+"""
+
+
 @app.route('/api/stations/prefectures', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_prefectures():
     """都道府県一覧を取得"""
     try:
-        db = DatabaseConnection(**MYSQL_CONFIG)
-        prefectures = db.execute_query("""
-            SELECT prefecture, COUNT(*) as count 
-            FROM stations 
-            WHERE prefecture IS NOT NULL 
-            GROUP BY prefecture 
-            ORDER BY count DESC
-        """)
+        db = connect_read_database()
+        prefectures = db.execute_query(PREFECTURE_COUNTS_QUERY)
         db.close()
         
         return jsonify({
@@ -493,10 +793,12 @@ def get_prefectures():
 
 
 @app.route('/api/stations/statistics', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_statistics():
     """バリアフリー設備の統計を取得"""
     try:
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         stats = db.execute_query("""
             SELECT 
                 COUNT(*) as total_stations,
@@ -521,12 +823,14 @@ def get_statistics():
 
 
 @app.route('/api/stations/averages', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_station_averages():
     """全駅の各項目の平均値を取得"""
     try:
         mode = request.args.get('mode', default='body', type=str)  # body, hearing, vision
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         
         # 全駅の数値を取得
         query = """
@@ -658,8 +962,7 @@ def get_station_averages():
             }
         })
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("集計に失敗しました: %s", request.path)
         return jsonify({
             "success": False,
             "error": str(e)
@@ -688,12 +991,14 @@ def calculate_median(values: List[float]) -> float:
 
 
 @app.route('/api/stations/medians', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_station_medians():
     """全駅の各項目の中央値を取得"""
     try:
         mode = request.args.get('mode', default='body', type=str)  # body, hearing, vision
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         
         # 全駅のデータを取得（中央値計算のため）
         query = """
@@ -881,8 +1186,7 @@ def get_station_medians():
             }
         })
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("集計に失敗しました: %s", request.path)
         return jsonify({
             "success": False,
             "error": str(e)
@@ -890,8 +1194,17 @@ def get_station_medians():
 
 
 @app.route('/api/stations/search', methods=['GET'])
+@dataset_conditional_get
 def search_stations():
     """駅名で検索"""
+    try:
+        fields = parse_fields_param()
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
     try:
         keyword = request.args.get('keyword', default='', type=str)
         limit = request.args.get('limit', default=50, type=int)
@@ -902,9 +1215,9 @@ def search_stations():
                 "error": "Keyword parameter is required"
             }), 400
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         stations = db.execute_query(
-            "SELECT * FROM stations WHERE station_name LIKE %s LIMIT %s",
+            f"SELECT {build_select_columns(fields)} FROM stations WHERE station_name LIKE %s LIMIT %s",
             (f"%{keyword}%", limit)
         )
         db.close()
@@ -922,54 +1235,69 @@ def search_stations():
 
 
 @app.route('/api/body/stations', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_body_stations():
     return get_stations_with_score(mode='body')
     
 @app.route('/api/body/stations/<int:station_id>', methods=['GET'])
+@dataset_conditional_get
 def get_body_detail(station_id: int):
     return get_station_detail_with_score(station_id, mode='body')
 
 @app.route('/api/hearing/stations', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_hearing_stations():
     return get_stations_with_score(mode='hearing')
 
 @app.route('/api/hearing/stations/<int:station_id>', methods=['GET'])
+@dataset_conditional_get
 def get_hearing_detail(station_id):
     return get_station_detail_with_score(station_id, mode='hearing')
 
 @app.route('/api/vision/stations', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_vision_stations():
     return get_stations_with_score(mode='vision')
 
 @app.route('/api/vision/stations/<int:station_id>', methods=['GET'])
+@dataset_conditional_get
 def get_vision_detail(station_id):
     return get_station_detail_with_score(station_id, mode='vision')
 
+def split_line_names(values: Iterable[Optional[str]]) -> List[str]:
+    """「・」区切りの路線名を1路線ずつに分割し、重複を除いてソートしたリストを返す"""
+    lines_set = set()
+    for line_val in values:
+        if line_val:
+            split_lines = line_val.split('・')
+            for line in split_lines:
+                clean_line = line.strip()
+                if clean_line:
+                    lines_set.add(clean_line)
+
+    # 五十音順などでソートして返す
+    return sorted(lines_set)
+
+
 @app.route('/api/lines', methods=['GET'])
+@dataset_conditional_get
+@coalesce_dataset_requests
 def get_lines():
     """路線名一覧を取得（プルダウン用）"""
     try:
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
 
         rows = db.execute_query(
             "SELECT DISTINCT line_name FROM stations WHERE line_name IS NOT NULL AND line_name != ''"
             )
         db.close()
         
-        lines_set = set()
-        for row in rows:
-            line_val = row['line_name']
-            if line_val:
-                split_lines = line_val.split('・')
-                for line in split_lines:
-                    clean_line = line.strip()
-                    if clean_line:
-                        lines_set.add(clean_line)
-        
-        # 五十音順などでソートして返す
         return jsonify({
             "success": True,
-            "data": sorted(list(lines_set))
+            "data": split_line_names(row['line_name'] for row in rows)
         })
     except Exception as e:
         return jsonify({
@@ -978,60 +1306,289 @@ def get_lines():
         }), 500
 
 
+@app.route('/api/cache/stats', methods=['GET'])
+@require_admin
+def get_cache_stats():
+    """一覧APIの結果キャッシュの統計（ヒット・ミス・削除数など）を取得（管理用トークンが必要）"""
+    return jsonify({
+        "success": True,
+        "data": list_result_cache.stats()
+    })
+
+
+# ==================== 管理用API ====================
+
+@app.route('/api/admin/queries', methods=['GET'])
+@require_admin
+def get_query_stats():
+    """
+    SQLのフィンガープリントごとの実行回数・合計時間・p95と、直近のスロークエリ（実行計画つき）を取得
+
+    クエリパラメータ:
+        sort: 並び替えの項目（total_ms, count, mean_ms, p95_ms, max_ms, slow_count、デフォルト: total_ms）
+        limit: 返すフィンガープリントの件数
+    """
+    return jsonify({
+        "success": True,
+        "data": query_stats.snapshot(
+            sort_by=request.args.get('sort', default='total_ms', type=str),
+            limit=parse_int_arg(request.args, 'limit', None),
+        )
+    })
+
+
+@app.route('/api/admin/queries', methods=['DELETE'])
+@require_admin
+def reset_query_stats():
+    """クエリ統計を破棄"""
+    query_stats.reset()
+    return jsonify({"success": True})
+
+
+@app.route('/api/admin/database', methods=['GET'])
+@require_admin
+def get_database_status():
+    """レプリカの状態（接続できるか・除外中の残り時間）と、レプリカ・プライマリへの振り分けの件数を取得"""
+    return jsonify({
+        "success": True,
+        "data": database_router.status()
+    })
+
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@require_admin
+def list_profiles():
+    """保持しているリクエストのプロファイルの一覧（新しい順）"""
+    return jsonify({
+        "success": True,
+        "data": request_profiler.store.summaries()
+    })
+
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@require_admin
+def get_profile_data(profile_id: str):
+    """
+    プロファイルの結果を取得
+
+    folded形式はフレームグラフ用のテキスト、cProfile形式は .prof ファイル（?format=text で累積時間順のテキスト）を返します。
+    """
+    profile = request_profiler.store.get(profile_id)
+    if profile is None:
+        return jsonify({"success": False, "error": "Profile not found"}), 404
+
+    if profile["mode"] == "cprofile":
+        if request.args.get('format') == 'text':
+            return app.response_class(profile["text"], mimetype="text/plain")
+        response = app.response_class(profile["data"], mimetype="application/octet-stream")
+        response.headers["Content-Disposition"] = f'attachment; filename="{profile_id}.prof"'
+        return response
+    return app.response_class(profile["data"], mimetype="text/plain")
+
+
+# ==================== ヘルスチェック・ウォームアップ ====================
+
+# 起動時にDBへ接続できるまで再試行する回数と間隔（秒）
+WARMUP_DB_RETRIES = settings.warmup_db_retries
+WARMUP_DB_RETRY_INTERVAL = settings.warmup_db_retry_interval
+
+# ウォームアップで事前に作成しておくレスポンス（一覧画面の初期表示とアクセスの多い条件）
+WARMUP_PATHS = [
+    f"/api/{mode}/stations?limit=10000&offset=0&sort={sort}"
+    for mode in ('body', 'hearing', 'vision')
+    for sort in ('none', 'score-desc')
+] + [
+    "/api/body/stations?limit=10000&offset=0&sort=score-desc&prefecture=東京都",
+    "/api/stations/prefectures",
+    "/api/lines",
+]
+
+# 必要なスキーマのバージョン（database/migrate.py の MIGRATIONS の最新の番号。マイグレーションを追加したら更新する）
+SCHEMA_VERSION = 2
+
+# ウォームアップの進行状況（すべて完了するまで /readyz は503を返す）
+readiness = Readiness(["database", "indexes", "snapshot", "score_tables", "warm_responses"])
+_warmup_lock = threading.Lock()
+
+
+def check_database():
+    """DBに接続してクエリを実行できるか確認（失敗した場合は例外）"""
+    db = database_router.primary()
+    try:
+        db.execute_query("SELECT 1")
+    finally:
+        db.close()
+
+
+def check_schema() -> int:
+    """
+    マイグレーション（インデックスの追加など）が SCHEMA_VERSION まで適用されているか確認
+
+    Returns:
+        適用済みの最新の番号
+
+    Raises:
+        RuntimeError: 適用されていない場合（schema_migrations テーブルがない場合はDBの例外）
+    """
+    db = database_router.primary()
+    try:
+        rows = db.execute_query("SELECT MAX(version) AS version FROM schema_migrations")
+    finally:
+        db.close()
+    version = (rows[0]["version"] if rows else None) or 0
+    if version < SCHEMA_VERSION:
+        raise RuntimeError(f"マイグレーションが適用されていません（適用済み: {version}、必要: {SCHEMA_VERSION}）。"
+                           f"database/migrate.py を実行してください")
+    return version
+
+
+def warm_up(db_retries: int = WARMUP_DB_RETRIES) -> bool:
+    """
+    リクエストを受け付ける前にDB接続・マイグレーション・スナップショット・スコア・よく使われるレスポンスを用意する
+
+    Gunicornではワーカーをforkする前にマスタープロセスで実行します（config/gunicorn.conf.py）。
+    完了済みの段階は再実行しないため、失敗した場合は /readyz へのアクセス時に続きから再試行します。
+
+    Args:
+        db_retries: DBに接続できるまで再試行する回数
+
+    Returns:
+        すべての段階が完了したか
+    """
+    with _warmup_lock:
+        step = "database"
+        try:
+            if not readiness.is_done("database"):
+                wait_for(check_database, db_retries, WARMUP_DB_RETRY_INTERVAL,
+                         on_retry=lambda n, e: logger.info("データベース接続を待機中... (%d/%d): %s", n, db_retries, e))
+                readiness.mark("database")
+
+            step = "indexes"
+            if not readiness.is_done("indexes"):
+                readiness.mark("indexes", detail=f"version={check_schema()}")
+
+            step = "snapshot"
+            snapshot = station_snapshot.get()
+            readiness.mark("snapshot", detail=f"{len(snapshot)}件 (version={snapshot.version})")
+
+            step = "score_tables"
+            for mode in SNAPSHOT_MODES:
+                snapshot.prepare(mode)
+            snapshot.metric_columns(ALL_METRICS_EVALUATOR)
+            readiness.mark("score_tables")
+
+            step = "warm_responses"
+            if not readiness.is_done("warm_responses"):
+                with app.test_client() as client:
+                    for path in WARMUP_PATHS:
+                        response = client.get(path, environ_base={WARMUP_ENVIRON_KEY: True})
+                        if response.status_code != 200:
+                            raise RuntimeError(f"{path}: HTTP {response.status_code}")
+                readiness.mark("warm_responses", detail=f"{len(WARMUP_PATHS)}件")
+        except Exception as e:
+            logger.warning("ウォームアップに失敗しました（%s）: %s", step, e)
+            readiness.mark(step, ok=False, detail=str(e))
+            return False
+    return readiness.ready
+
+
+def start_warm_up(db_retries: int = 1):
+    """ウォームアップをバックグラウンドで開始（実行中の場合は何もしない）"""
+    if not _warmup_lock.locked():
+        threading.Thread(target=warm_up, kwargs={"db_retries": db_retries}, daemon=True).start()
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """死活監視（プロセスが応答できれば200）"""
+    response = jsonify({"status": "ok"})
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """処理時間のメトリクス（Prometheusのテキスト形式）"""
+    response = app.response_class(render_metrics(), mimetype="text/plain")
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """起動準備の確認（ウォームアップが完了するまで503、ロードバランサーのヘルスチェック用）"""
+    if not readiness.ready:
+        start_warm_up()
+    response = jsonify(readiness.status())
+    response.status_code = 200 if readiness.ready else 503
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 # ==================== 静的ファイル提供 ====================
 
 @app.route('/')
 def index():
     """ルートパスでログイン画面を表示"""
-    return send_file(os.path.join(VIEW_DIR, 'login.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'login.html'))
 
 @app.route('/login')
 def login_page():
     """ログイン画面"""
-    return send_file(os.path.join(VIEW_DIR, 'login.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'login.html'))
 
 @app.route('/home')
 def home_page():
     """ホーム画面"""
-    return send_file(os.path.join(VIEW_DIR, 'home.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'home.html'))
 
 @app.route('/index')
 def index_page():
     """一覧画面（身体障害向け）"""
-    return send_file(os.path.join(VIEW_DIR, 'index.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'index.html'))
 
 @app.route('/hearing')
 def hearing_page():
     """聴覚障害向け一覧画面"""
-    return send_file(os.path.join(VIEW_DIR, 'hearing.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'hearing.html'))
 
 @app.route('/vision')
 def vision_page():
     """視覚障害向け一覧画面"""
-    return send_file(os.path.join(VIEW_DIR, 'vision.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'vision.html'))
 
 @app.route('/profile')
 def profile_page():
     """プロフィール画面"""
-    return send_file(os.path.join(VIEW_DIR, 'profile.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'profile.html'))
 
 @app.route('/detail')
 def detail_page():
     """詳細画面"""
-    return send_file(os.path.join(VIEW_DIR, 'detail.html'))
+    return static_assets.render_view(os.path.join(VIEW_DIR, 'detail.html'))
 
 @app.route('/styles.css')
 def styles_css():
     """CSSファイル"""
-    return send_file(os.path.join(FRONTEND_DIR, 'styles.css'))
+    return static_assets.send(FRONTEND_DIR, 'styles.css')
 
 @app.route('/dist/<path:filename>')
 def dist_files(filename):
     """distディレクトリ内のファイル（JS、CSS等）"""
-    return send_from_directory(DIST_DIR, filename)
+    return static_assets.send(DIST_DIR, filename)
 
 # ==================== 認証関連API ====================
 
+# ログイン用のSQL（ユーザー名またはメールアドレスで検索）
+# OR で検索すると username・email の一意インデックスを使えず全件走査になるため、それぞれの検索を UNION ALL でつなぐ
+LOGIN_USER_QUERY = (
+    "SELECT * FROM users WHERE username = %s"
+    " UNION ALL SELECT * FROM users WHERE email = %s"
+    " LIMIT 1"
+)
+
+
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     """ログイン処理"""
@@ -1046,14 +1603,10 @@ def login():
                 "error": "ユーザー名とパスワードを入力してください"
             }), 400
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = database_router.primary()
         
         # ユーザー名またはメールアドレスで検索
-        # usersテーブルのカラム名を確認して適切に変更してください
-        user = db.execute_query(
-            "SELECT * FROM users WHERE username = %s OR email = %s LIMIT 1",
-            (username, username)
-        )
+        user = db.execute_query(LOGIN_USER_QUERY, (username, username))
         
         if not user:
             db.close()
@@ -1075,7 +1628,8 @@ def login():
                 "error": "パスワード情報が見つかりません"
             }), 500
         
-        # bcryptでパスワードを検証
+        # bcryptでパスワードを検証（認証APIでのみ使うため、最初に必要になった時点で読み込む）
+        import bcrypt
         try:
             if isinstance(password_hash, bytes):
                 password_hash = password_hash.decode('utf-8')
@@ -1112,7 +1666,9 @@ def login():
         
         return jsonify({
             "success": True,
-            "data": user_response
+            "data": user_response,
+            # 本人の情報を返すAPI（/api/me/...）の X-User-Token ヘッダーに指定する
+            "token": issue_user_token(user['id'])
         })
         
     except Exception as e:
@@ -1143,7 +1699,7 @@ def signup():
                 "error": "パスワードは8文字以上で入力してください"
             }), 400
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = database_router.primary()
         
         # ユーザー名の重複チェック
         existing_user = db.execute_query(
@@ -1170,6 +1726,7 @@ def signup():
             }), 400
         
         # パスワードをハッシュ化
+        import bcrypt
         password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         
         # ユーザーを登録
@@ -1187,6 +1744,7 @@ def signup():
             }), 500
         
         db.close()
+        read_your_writes()
         
         return jsonify({
             "success": True,
@@ -1194,9 +1752,7 @@ def signup():
         })
         
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"Signup error: {error_detail}")
+        logger.exception("ユーザー登録に失敗しました")
         return jsonify({
             "success": False,
             "error": f"ユーザー登録に失敗しました: {str(e)}"
@@ -1216,7 +1772,7 @@ def reset_password():
                 "error": "メールアドレスを入力してください"
             }), 400
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = database_router.primary()
         
         # ユーザーを検索
         user = db.execute_query(
@@ -1248,6 +1804,83 @@ def reset_password():
         }), 500
 
 
+# プロフィール取得用のSQL（usersとusers_preferencesは互いに独立して取得できる）
+PROFILE_USER_QUERY = "SELECT id, username, email FROM users WHERE id = %s LIMIT 1"
+PROFILE_PREFERENCES_QUERY = "SELECT disability_type, favorite_stations, preferred_features FROM users_preferences WHERE user_id = %s LIMIT 1"
+
+
+def build_profile_data(user: Dict[str, Any], preferences: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """usersテーブルとusers_preferencesテーブルの行からプロフィールのレスポンスを作成"""
+    # JSONフィールドをパース
+    profile_data = {
+        "id": user.get("id"),
+        "username": user.get("username"),
+        "email": user.get("email"),
+    }
+    
+    if preferences and len(preferences) > 0:
+        pref = preferences[0]
+        # disability_typeをパース
+        disability_type = pref.get("disability_type")
+        if disability_type:
+            try:
+                # JSON文字列をパース（Unicodeエスケープも正しく処理される）
+                if isinstance(disability_type, str):
+                    parsed = json.loads(disability_type)
+                    profile_data["disability_type"] = parsed if isinstance(parsed, list) else [parsed] if parsed else []
+                else:
+                    profile_data["disability_type"] = disability_type if isinstance(disability_type, list) else []
+            except Exception as e:
+                logger.warning("disability_typeを解析できませんでした: %s", e)
+                profile_data["disability_type"] = []
+        else:
+            profile_data["disability_type"] = []
+        
+        # favorite_stationsをパースして駅IDから駅名に変換
+        favorite_stations = pref.get("favorite_stations")
+        if favorite_stations:
+            try:
+                station_ids = json.loads(favorite_stations) if isinstance(favorite_stations, str) else favorite_stations
+                if isinstance(station_ids, list) and len(station_ids) > 0:
+                    # 駅IDのリストから駅名を取得（SQLインジェクション対策のため整数に変換）
+                    station_ids_int = []
+                    for sid in station_ids:
+                        try:
+                            station_ids_int.append(int(sid))
+                        except (ValueError, TypeError):
+                            continue
+                    
+                    if station_ids_int:
+                        # 駅IDの配列として返す（データベース上でIDで表示されるように）
+                        profile_data["favorite_stations"] = station_ids_int
+                    else:
+                        profile_data["favorite_stations"] = []
+                else:
+                    profile_data["favorite_stations"] = []
+            except Exception as e:
+                logger.warning("favorite_stationsを解析できませんでした: %s", e)
+                profile_data["favorite_stations"] = []
+        else:
+            profile_data["favorite_stations"] = []
+        
+        # preferred_featuresをパース
+        preferred_features = pref.get("preferred_features")
+        if preferred_features:
+            try:
+                profile_data["preferred_features"] = json.loads(preferred_features) if isinstance(preferred_features, str) else preferred_features
+            except:
+                profile_data["preferred_features"] = []
+        else:
+            profile_data["preferred_features"] = []
+    else:
+        # users_preferencesにデータがない場合はデフォルト値
+        profile_data["disability_type"] = []
+        profile_data["favorite_stations"] = []
+        profile_data["preferred_features"] = []
+    
+    return profile_data
+
+
 @app.route('/api/auth/profile', methods=['GET'])
 def get_profile():
     """プロフィール情報を取得"""
@@ -1260,13 +1893,10 @@ def get_profile():
                 "error": "ユーザーIDが必要です"
             }), 400
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = connect_read_database()
         
         # ユーザー情報を取得
-        user = db.execute_query(
-            "SELECT id, username, email FROM users WHERE id = %s LIMIT 1",
-            (user_id,)
-        )
+        user = db.execute_query(PROFILE_USER_QUERY, (user_id,))
         
         if not user:
             db.close()
@@ -1280,81 +1910,13 @@ def get_profile():
         # users_preferencesテーブルから設定を取得
         preferences = []
         try:
-            preferences = db.execute_query(
-                "SELECT disability_type, favorite_stations, preferred_features FROM users_preferences WHERE user_id = %s LIMIT 1",
-                (user_id,)
-            )
+            preferences = db.execute_query(PROFILE_PREFERENCES_QUERY, (user_id,))
         except Exception as e:
             # users_preferencesテーブルが存在しない、またはエラーが発生した場合
-            print(f"Warning: Failed to fetch from users_preferences: {str(e)}")
+            logger.warning("users_preferencesを取得できませんでした: %s", e)
             preferences = []
         
-        # JSONフィールドをパース
-        profile_data = {
-            "id": user.get("id"),
-            "username": user.get("username"),
-            "email": user.get("email"),
-        }
-        
-        if preferences and len(preferences) > 0:
-            pref = preferences[0]
-            # disability_typeをパース
-            disability_type = pref.get("disability_type")
-            if disability_type:
-                try:
-                    # JSON文字列をパース（Unicodeエスケープも正しく処理される）
-                    if isinstance(disability_type, str):
-                        parsed = json.loads(disability_type)
-                        profile_data["disability_type"] = parsed if isinstance(parsed, list) else [parsed] if parsed else []
-                    else:
-                        profile_data["disability_type"] = disability_type if isinstance(disability_type, list) else []
-                except Exception as e:
-                    print(f"Warning: Failed to parse disability_type: {e}")
-                    profile_data["disability_type"] = []
-            else:
-                profile_data["disability_type"] = []
-            
-            # favorite_stationsをパースして駅IDから駅名に変換
-            favorite_stations = pref.get("favorite_stations")
-            if favorite_stations:
-                try:
-                    station_ids = json.loads(favorite_stations) if isinstance(favorite_stations, str) else favorite_stations
-                    if isinstance(station_ids, list) and len(station_ids) > 0:
-                        # 駅IDのリストから駅名を取得（SQLインジェクション対策のため整数に変換）
-                        station_ids_int = []
-                        for sid in station_ids:
-                            try:
-                                station_ids_int.append(int(sid))
-                            except (ValueError, TypeError):
-                                continue
-                        
-                        if station_ids_int:
-                            # 駅IDの配列として返す（データベース上でIDで表示されるように）
-                            profile_data["favorite_stations"] = station_ids_int
-                        else:
-                            profile_data["favorite_stations"] = []
-                    else:
-                        profile_data["favorite_stations"] = []
-                except Exception as e:
-                    print(f"Warning: Failed to parse favorite_stations: {e}")
-                    profile_data["favorite_stations"] = []
-            else:
-                profile_data["favorite_stations"] = []
-            
-            # preferred_featuresをパース
-            preferred_features = pref.get("preferred_features")
-            if preferred_features:
-                try:
-                    profile_data["preferred_features"] = json.loads(preferred_features) if isinstance(preferred_features, str) else preferred_features
-                except:
-                    profile_data["preferred_features"] = []
-            else:
-                profile_data["preferred_features"] = []
-        else:
-            # users_preferencesにデータがない場合はデフォルト値
-            profile_data["disability_type"] = []
-            profile_data["favorite_stations"] = []
-            profile_data["preferred_features"] = []
+        profile_data = build_profile_data(user, preferences)
         
         db.close()
         
@@ -1370,6 +1932,75 @@ def get_profile():
         }), 500
 
 
+# 個人向けのランキングで一度に取得できる件数の上限
+MY_STATIONS_MAX_LIMIT = 100
+
+
+def render_personal_ranking(snapshot: StationSnapshot, modes: Tuple[str, ...], weights: Dict[str, float],
+                            offset: int, limit: int) -> bytes:
+    """個人向けのランキング（重み付きの点の合計順）のレスポンス（JSON）を作成"""
+    # JSON断片のモードによらない部分を用意する（ウォームアップ後は計算済み）
+    snapshot.prepare(modes[0])
+    with span("scoring"):
+        columns = snapshot.metric_columns(ALL_METRICS_EVALUATOR)
+        ranked = rank_stations(columns, weights, len(snapshot), offset + limit)[offset:]
+
+    with span("serialize"):
+        return splice_fragments({
+            "success": True,
+            "count": len(ranked),
+            "total_count": len(snapshot),
+        }, "data", (
+            snapshot.fragment(position, dumps(personal_score(columns, weights, position, points)))
+            for position, points in ranked
+        ))
+
+
+@app.route('/api/me/stations', methods=['GET'])
+@require_user
+def get_my_stations():
+    """
+    プロフィールの障害の種類・優先機能に合わせた駅のランキング
+
+    ユーザーはログイン時のトークン（X-User-Token ヘッダー）で判定します。
+    クエリ: limit（デフォルト20、最大 MY_STATIONS_MAX_LIMIT）、offset
+    """
+    try:
+        user_id = g.user_id
+        db = connect_read_database()
+        try:
+            user = db.execute_query(PROFILE_USER_QUERY, (user_id,))
+            if not user:
+                return jsonify({
+                    "success": False,
+                    "error": "ユーザーが見つかりません"
+                }), 404
+            preferences = db.execute_query(PROFILE_PREFERENCES_QUERY, (user_id,))
+        finally:
+            db.close()
+
+        profile_data = build_profile_data(user[0], preferences)
+        modes = personal_modes(profile_data["disability_type"])
+        weights = personal_weights(modes, profile_data["preferred_features"],
+                                   {mode: get_definitions(mode) for mode in modes})
+        limit = min(max(parse_int_arg(request.args, 'limit', 20), 0), MY_STATIONS_MAX_LIMIT)
+        offset = max(parse_int_arg(request.args, 'offset', 0), 0)
+
+        # 同じ条件（モード・重み）のユーザーは同じ結果になるため、結果キャッシュを共有する
+        snapshot = station_snapshot.get()
+        cache_key = (snapshot.version, "me", modes, tuple(weights.items()), offset, limit)
+        body = list_result_cache.get(cache_key)
+        if body is None:
+            body = render_personal_ranking(snapshot, modes, weights, offset, limit)
+            list_result_cache.set(cache_key, body)
+        return json_bytes_response(body)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 @app.route('/api/auth/profile', methods=['PUT'])
 def update_profile():
     """プロフィール情報を更新"""
@@ -1387,7 +2018,7 @@ def update_profile():
                 "error": "ユーザーIDが必要です"
             }), 400
         
-        db = DatabaseConnection(**MYSQL_CONFIG)
+        db = database_router.primary()
         
         # ユーザーの存在確認
         user = db.execute_query(
@@ -1415,6 +2046,9 @@ def update_profile():
                     "error": "このユーザー名は既に使用されています"
                 }), 400
         
+        # 更新後のプロフィールの取得はプライマリから読み込む（途中で失敗した場合も更新済みの部分があるため先に設定）
+        read_your_writes()
+
         # usersテーブルの更新（ユーザー名のみ）
         if username:
             try:
@@ -1439,7 +2073,7 @@ def update_profile():
             )
         except Exception as e:
             # users_preferencesテーブルが存在しない場合
-            print(f"Warning: users_preferences table may not exist: {str(e)}")
+            logger.warning("users_preferencesテーブルが存在しない可能性があります: %s", e)
             existing_pref = []
         
         disability_type_json = None
@@ -1512,8 +2146,7 @@ def update_profile():
                 
                 # updated_atカラムが存在する場合
                 try:
-                    columns = db.execute_query("SHOW COLUMNS FROM users_preferences LIKE 'updated_at'")
-                    if columns:
+                    if db.has_column("users_preferences", "updated_at"):
                         update_fields.append("updated_at = %s")
                         params.append(datetime.now())
                 except:
@@ -1553,12 +2186,13 @@ def update_profile():
 
 
 if __name__ == '__main__':
+    print(config_summary(settings))
     print("Flask APIサーバーを起動します...")
-    port = int(os.getenv("FLASK_PORT", "5000"))
-    host = os.getenv("FLASK_HOST", "0.0.0.0")  # Docker環境では0.0.0.0が必要
-    debug = os.getenv("FLASK_ENV", "production") == "development"
+    host, port = settings.flask_host, settings.flask_port
     print(f"http://{host}:{port} でアクセスできます")
     # 作業ディレクトリをプロジェクトルートに変更
     os.chdir(BASE_DIR)
-    app.run(debug=debug, host=host, port=port)
+    # 起動を待たずにウォームアップを開始（完了するまで /readyz は503を返す）
+    start_warm_up(db_retries=WARMUP_DB_RETRIES)
+    app.run(debug=settings.debug, host=host, port=port)
 
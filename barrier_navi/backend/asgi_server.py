@@ -0,0 +1,420 @@
+"""
+ASGIサーバー - 非同期MySQLドライバ（aiomysql）で主要APIを非同期に処理する
+
+同期版（api_server.py）ではDBの応答を待つ間ワーカーがブロックされるため、
+同時に処理できるリクエスト数がワーカー数（×スレッド数）で頭打ちになります。
+このモジュールでは、DB待ちの多い以下のAPIをイベントループ上で非同期に処理します。
+
+- GET /api/{body,hearing,vision}/stations（NDJSONストリーミングを含む）
+- GET /api/{body,hearing,vision}/stations/<id>
+- GET /api/auth/profile（usersとusers_preferencesを並行して取得）
+
+それ以外のルートは既存のFlaskアプリケーションにそのまま委譲するため、APIの仕様は同期版と同じです。
+
+起動方法（プロジェクトルートで実行）:
+    uvicorn asgi_server:app --app-dir backend --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import aiomysql
+    from a2wsgi import WSGIMiddleware
+    from starlette.applications import Starlette
+    from starlette.datastructures import MutableHeaders
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.requests import Request
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Mount, Route
+except ImportError:
+    raise ImportError(
+        "非同期モードを使用するには追加のパッケージをインストールしてください: "
+        "pip install -r config/requirements-async.txt"
+    )
+
+from werkzeug.datastructures import ETags
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+import api_server
+from compression import COMPRESS_MIN_SIZE, available_encodings, compress, negotiate_encoding
+from http_cache import API_CACHE_CONTROL, compute_etag, encoded_etag, match_etag, normalize_query
+from json_serializer import dumps
+from metrics import begin_request, cancel_request, end_request, span
+from query_stats import is_explainable, query_stats
+from settings import get_settings
+from single_flight import AsyncSingleFlight
+from structured_logging import REQUEST_ID_HEADER, request_id_var
+from station_snapshot import StationSnapshot
+
+logger = logging.getLogger(__name__)
+
+# 非同期コネクションプールのサイズ（ワーカーごと）
+ASYNC_POOL_MIN_SIZE = get_settings().async_db_pool_min_size
+ASYNC_POOL_MAX_SIZE = get_settings().async_db_pool_max_size
+
+# NDJSONストリーミング時にサーバーから一度に取得する行数
+STREAM_BATCH_SIZE = 500
+
+MODES = ("body", "hearing", "vision")
+
+pool: Optional["aiomysql.Pool"] = None
+
+# 同時に届いた同じ条件の一覧APIの処理を1回にまとめる
+list_flight = AsyncSingleFlight()
+
+
+async def fetch_all(query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+    """プールから接続を借りてSQLクエリを実行し、結果を辞書のリストで返す"""
+    with span("db_connect"):
+        conn = await pool.acquire()
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            start = time.perf_counter()
+            with span("db_query"):
+                await cursor.execute(query, params)
+                rows = list(await cursor.fetchall())
+
+            # クエリ統計（同期版のDatabaseConnectionと同じく、スロークエリは実行計画も取得）
+            if query_stats.enabled:
+                seconds = time.perf_counter() - start
+                if query_stats.record(query, seconds):
+                    plan = None
+                    if is_explainable(query):
+                        try:
+                            await cursor.execute(f"EXPLAIN {query}", params)
+                            plan = list(await cursor.fetchall())
+                        except Exception as e:
+                            logger.debug("実行計画を取得できませんでした: %s", e)
+                    query_stats.record_slow(query, seconds, plan)
+            return rows
+    finally:
+        pool.release(conn)
+
+
+async def iter_rows(query: str, params: Optional[tuple] = None) -> AsyncIterator[Dict[str, Any]]:
+    """サーバーサイドカーソルで結果を少しずつ読みながら1行ずつ返す"""
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+            await cursor.execute(query, params)
+            while True:
+                rows = await cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+
+
+async def get_snapshot() -> StationSnapshot:
+    """駅データのスナップショットを取得（読み込みが必要な場合のみスレッドで実行）"""
+    snapshot = api_server.station_snapshot.current()
+    if snapshot is None:
+        snapshot = await asyncio.to_thread(api_server.station_snapshot.get)
+    return snapshot
+
+
+def station_mode(request: Request) -> str:
+    """パス（/api/<mode>/stations...）からモードを取得"""
+    return request.url.path.split("/")[2]
+
+
+def wants_ndjson(request: Request) -> bool:
+    """NDJSON形式で1件ずつストリーミングするか（api_server.wants_ndjsonと同じ判定）"""
+    if request.query_params.get("stream", "").lower() in ("1", "true"):
+        return True
+    accept = parse_accept_header(request.headers.get("accept"))
+    return accept.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+
+def error_response(message: str, status_code: int) -> Response:
+    """エラーレスポンス（同期版と同じ形式）"""
+    return Response(dumps({"success": False, "error": message}) + b"\n",
+                    status_code=status_code, media_type="application/json")
+
+
+def dataset_etag(request: Request, snapshot: StationSnapshot) -> Tuple[str, Optional[str]]:
+    """
+    データセットのバージョンから現在のリクエストのETagを計算
+
+    Returns:
+        (ETag, If-None-Matchに一致したETag（一致しなければNone）)
+    """
+    representation = "ndjson" if wants_ndjson(request) else "json"
+    etag = compute_etag(snapshot.version, request.url.path,
+                        normalize_query(request.query_params.multi_items()), representation)
+    if_none_match = parse_etags(request.headers.get("if-none-match")) or ETags()
+    return etag, match_etag(etag, if_none_match)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """ETag・Cache-Controlなどのキャッシュ関連ヘッダー"""
+    return {"ETag": quote_etag(etag, weak=True), "Cache-Control": API_CACHE_CONTROL, "Vary": "Accept, Accept-Encoding"}
+
+
+def not_modified(etag: str) -> Response:
+    """304 Not Modified"""
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+def json_response(request: Request, body: bytes, etag: str) -> Response:
+    """JSONレスポンス（同期版のafter_requestと同じ条件で圧縮し、ETagを付与）"""
+    body += b"\n"
+    headers = cache_headers(etag)
+    if len(body) >= COMPRESS_MIN_SIZE:
+        accept_encodings = parse_accept_header(request.headers.get("accept-encoding"))
+        encoding = negotiate_encoding(available_encodings(), accept_encodings)
+        if encoding is not None:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = quote_etag(encoded_etag(etag, encoding), weak=True)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def stations_with_score(request: Request) -> Response:
+    """駅一覧（スコア付き）"""
+    mode = station_mode(request)
+    try:
+        snapshot = await get_snapshot()
+        etag, matched = dataset_etag(request, snapshot)
+        if matched is not None:
+            return not_modified(matched)
+
+        stream = wants_ndjson(request)
+        list_args = api_server.parse_station_list_args(request.query_params, stream=stream)
+        query, params = api_server.build_station_list_query(mode, list_args)
+
+        if stream:
+            return StreamingResponse(
+                stream_station_fragments(snapshot, query, params, mode, list_args),
+                media_type="application/x-ndjson",
+                headers={**cache_headers(etag), "X-Accel-Buffering": "no"},
+            )
+
+        async def render() -> bytes:
+            cache = api_server.list_result_cache
+            cache_key = api_server.station_list_cache_key(snapshot.version, mode, list_args)
+            # 共有キャッシュ（Redis）へのアクセスはブロッキングのためスレッドで実行する
+            if cache.shared is None:
+                cached = cache.get(cache_key)
+            else:
+                cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+            rows = await fetch_all(query, params)
+            body = api_server.render_station_list(rows, snapshot, mode, list_args["sort"],
+                                                  list_args["offset"], list_args["limit"])
+            if cache.shared is None:
+                cache.set(cache_key, body)
+            else:
+                await asyncio.to_thread(cache.set, cache_key, body)
+            return body
+
+        key = (request.url.path, normalize_query(request.query_params.multi_items()))
+        body = await list_flight.do(key, render)
+        return json_response(request, body, etag)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def stream_station_fragments(snapshot: StationSnapshot, query: str, params: tuple,
+                                   mode: str, list_args: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """一覧の駅データを1行1件のNDJSONとして返す（同期版のstream_station_fragmentsと同じ順序）"""
+    offset, limit, sort_order = list_args["offset"], list_args["limit"], list_args["sort"]
+    stop = offset + limit if limit is not None else None
+
+    # 途中で打ち切った場合も、カーソルの残りを読み捨ててから接続をプールに返す
+    async with aclosing(iter_rows(query, params)) as rows:
+        if sort_order in ("score-asc", "score-desc"):
+            entries = [snapshot.entry(mode, row) async for row in rows]
+            entries.sort(key=lambda x: x[0], reverse=sort_order == "score-desc")
+            for _, fragment in entries[offset:stop]:
+                yield fragment + b"\n"
+            return
+
+        index = 0
+        async for row in rows:
+            if stop is not None and index >= stop:
+                break
+            if index >= offset:
+                yield snapshot.entry(mode, row)[1] + b"\n"
+            index += 1
+
+
+async def station_detail_with_score(request: Request) -> Response:
+    """駅詳細（スコア付き）"""
+    mode = station_mode(request)
+    station_id = request.path_params["station_id"]
+    try:
+        snapshot = await get_snapshot()
+        etag, matched = dataset_etag(request, snapshot)
+        if matched is not None:
+            return not_modified(matched)
+
+        columns = ", ".join(api_server.BODY_QUERY_COLUMNS)
+        rows = await fetch_all(f"SELECT {columns} FROM stations WHERE id = %s", (station_id,))
+        if not rows:
+            return error_response("Station not found", 404)
+
+        with span("scoring"):
+            detail = api_server.build_station_response(rows[0], mode=mode, include_details=True)
+        with span("serialize"):
+            body = dumps({"success": True, "data": detail})
+        return json_response(request, body, etag)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def profile(request: Request) -> Response:
+    """プロフィール情報を取得（usersとusers_preferencesを並行して取得）"""
+    try:
+        user_id = int(request.query_params.get("user_id", ""))
+    except ValueError:
+        user_id = None
+    if not user_id:
+        return error_response("ユーザーIDが必要です", 400)
+
+    try:
+        users, preferences = await asyncio.gather(
+            fetch_all(api_server.PROFILE_USER_QUERY, (user_id,)),
+            fetch_all(api_server.PROFILE_PREFERENCES_QUERY, (user_id,)),
+            return_exceptions=True,
+        )
+        if isinstance(users, Exception):
+            raise users
+        if not users:
+            return error_response("ユーザーが見つかりません", 404)
+        if isinstance(preferences, Exception):
+            # users_preferencesテーブルが存在しない、またはエラーが発生した場合
+            logger.warning("users_preferencesを取得できませんでした: %s", preferences)
+            preferences = []
+
+        profile_data = api_server.build_profile_data(users[0], preferences)
+        return Response(dumps({"success": True, "data": profile_data}) + b"\n",
+                        media_type="application/json")
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+class RequestIdMiddleware:
+    """
+    リクエストごとのID（X-Request-ID）をログとレスポンスに付与するミドルウェア
+
+    Flaskに委譲するリクエストでも同じIDが使われるよう、IDをリクエストヘッダーにも設定します。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = MutableHeaders(scope=scope)
+        request_id = (request_headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex)[:64]
+        request_headers[REQUEST_ID_HEADER] = request_id
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                if REQUEST_ID_HEADER not in response_headers:
+                    response_headers[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    非同期ルートの処理時間を記録するミドルウェア
+
+    Flaskに委譲したリクエストはFlask側（metrics.init_metrics）で記録するため、ここでは記録しません。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = begin_request()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # ルーティング後のscopeには一致したルートが設定される
+            route = scope.get("route")
+            if isinstance(route, Route):
+                end_request(started, route.path, scope["method"], status)
+            else:
+                cancel_request(started)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """ワーカー起動時にコネクションプールの作成とウォームアップを行い、終了時にプールを閉じる"""
+    global pool
+    if get_settings().db_backend != "mysql":
+        # 非同期ドライバはaiomysqlのみ（SQLiteは同期版の api_server をGunicornで起動する）
+        raise RuntimeError(f"非同期モードはMySQLのみ対応しています（DB_BACKEND={get_settings().db_backend}）")
+    api_server.readiness.require("async_pool")
+    config = api_server.MYSQL_CONFIG
+    pool = await aiomysql.create_pool(
+        host=config["host"],
+        port=config["port"],
+        user=config["user"],
+        password=config["password"],
+        db=config["database"],
+        minsize=ASYNC_POOL_MIN_SIZE,
+        maxsize=ASYNC_POOL_MAX_SIZE,
+        autocommit=True,
+        charset="utf8mb4",
+    )
+    api_server.readiness.mark("async_pool")
+    # Flask側と同じウォームアップを行ってからリクエストを受け付ける
+    await asyncio.to_thread(api_server.warm_up)
+    try:
+        yield
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+# Flask側はflask_corsがCORSヘッダーを付与するため、非同期ルートにのみ設定する
+# （プリフライトのOPTIONSはFlask側で処理される）
+cors = [Middleware(CORSMiddleware, allow_origins=["*"])]
+
+routes = []
+for mode in MODES:
+    routes += [
+        Route(f"/api/{mode}/stations", stations_with_score, methods=["GET"], middleware=cors),
+        Route(f"/api/{mode}/stations/{{station_id:int}}", station_detail_with_score,
+              methods=["GET"], middleware=cors),
+    ]
+routes += [
+    Route("/api/auth/profile", profile, methods=["GET"], middleware=cors),
+    # 上記以外はFlaskアプリケーションに委譲（ブロッキング処理はスレッドプールで実行される）
+    Mount("/", app=WSGIMiddleware(api_server.app)),
+]
+
+app = Starlette(routes=routes, middleware=[Middleware(RequestIdMiddleware), Middleware(MetricsMiddleware)],
+                lifespan=lifespan)
@@ -0,0 +1,332 @@
+"""
+コンパイル済みのデータセット - スナップショットの内容を1つのバイナリファイルに書き出し、mmapで読み込む
+
+StationSnapshot はプロセスごとにDBから全駅を読み込んでスコアとJSON断片を計算するため、
+全国規模のデータではワーカーの起動のたびにDBへの問い合わせと数十秒の計算が発生し、
+STATION_SNAPSHOT_TTL での再読み込み後はワーカーごとに別々のコピーを持ちます。
+
+database/compile_dataset.py で事前に次の内容を1つのファイルに書き出しておき、各ワーカーは
+読み込み専用でmmapします。ファイルの内容はOSのページキャッシュとして全ワーカーで共有され、
+起動時にDBへの問い合わせも計算も行いません。
+
+- 駅データ（stationsテーブルのカラムごとの固定長の配列。文字列は文字列表の番号）
+- モードごとの達成率（float64）とscoreのJSON（文字列表の番号）
+- JSON断片のモードによらない部分（score の前後、文字列表の番号）
+- 駅IDの索引（ソート済みの駅IDと駅の位置）
+- 評価項目ごとの全駅の点（float64、個人向けのランキング用）
+
+ファイルの形式:
+    MAGIC（4バイト） | 形式のバージョン（uint32） | ヘッダーの長さ（uint32） | ヘッダー（JSON） | 各セクション（8バイト境界）
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from json_serializer import dumps
+from scoring import ScoreEvaluator
+from station_record import STATION_FIELDS, Station
+from station_snapshot import StationEntry, StationSnapshot
+
+MAGIC = b"BNDS"
+FORMAT_VERSION = 1
+
+_PREAMBLE = struct.Struct("<4sII")
+_ALIGNMENT = 8
+
+# 整数のカラムのNULL（int32の最小値）と、文字列のカラムのNULL（uint32の最大値）
+INT_NULL = -(2 ** 31)
+STRING_NULL = 2 ** 32 - 1
+
+# 文字列として保持するカラム（それ以外は整数）
+STRING_COLUMNS = frozenset({"railway_operator", "station_name", "line_name", "prefecture", "city"})
+
+
+class _StringTable:
+    """書き出し用の文字列表（同じ内容は同じ番号にする）"""
+
+    def __init__(self):
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+        self._ids: Dict[bytes, int] = {}
+
+    def add(self, value: Optional[bytes]) -> int:
+        if value is None:
+            return STRING_NULL
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.offsets) - 1
+            self._ids[value] = string_id
+            self.data += value
+            self.offsets.append(len(self.data))
+        return string_id
+
+
+def write_compiled_dataset(path: str, snapshot: StationSnapshot, modes: Iterable[str],
+                           scoring_version: str, metric_evaluator: Optional[ScoreEvaluator] = None,
+                           db_fingerprint: Optional[str] = None) -> Dict[str, Any]:
+    """
+    スナップショットの内容をファイルに書き出す（一時ファイルに書いてから置き換える）
+
+    Args:
+        path: 出力するファイル
+        snapshot: DBから読み込んだスナップショット
+        modes: 事前計算するモード（body, hearing, vision）
+        scoring_version: 評価基準の定義のバージョン（読み込み時に現在の定義と一致するか確認する）
+        metric_evaluator: 評価項目ごとの点を書き出す評価器（Noneの場合は書き出さない）
+        db_fingerprint: 作成元のDBの内容の指紋（読み込み時に現在のDBと一致するか確認する）
+
+    Returns:
+        ファイルのヘッダー
+    """
+    stations = snapshot.stations
+    strings = _StringTable()
+    sections: Dict[str, array] = {}
+
+    for name in STATION_FIELDS:
+        if name in STRING_COLUMNS:
+            sections[f"column.{name}"] = array("I", (
+                strings.add(None if value is None else str(value).encode("utf-8"))
+                for value in (getattr(station, name) for station in stations)
+            ))
+        else:
+            values = array("i")
+            for station in stations:
+                value = getattr(station, name)
+                if value is not None and not INT_NULL < int(value) < 2 ** 31:
+                    raise ValueError(f"{name}の値がint32の範囲外です: {value}")
+                values.append(INT_NULL if value is None else int(value))
+            sections[f"column.{name}"] = values
+
+    modes = list(modes)
+    for mode in modes:
+        percentages, scores = snapshot.prepare(mode)
+        sections[f"mode.{mode}.percentage"] = array("d", percentages)
+        sections[f"mode.{mode}.score"] = array("I", (strings.add(score) for score in scores))
+    heads, tails = snapshot.fragment_parts()
+    sections["fragment.head"] = array("I", (strings.add(head) for head in heads))
+    sections["fragment.tail"] = array("I", (strings.add(tail) for tail in tails))
+
+    metric_keys = list(metric_evaluator.keys) if metric_evaluator else []
+    if metric_evaluator:
+        for key, column in snapshot.metric_columns(metric_evaluator).items():
+            sections[f"metric.{key}"] = column
+
+    order = sorted(range(len(stations)), key=lambda i: stations[i].id)
+    sections["index.id.keys"] = array("q", (stations[i].id for i in order))
+    sections["index.id.positions"] = array("I", order)
+    sections["strings.offsets"] = strings.offsets
+
+    # ヘッダーの長さが決まるまでセクションの位置は相対位置で計算し、書き出す直前に確定する
+    layout: Dict[str, List[Any]] = {}
+    relative = 0
+    blobs: List[Tuple[int, bytes]] = []
+    for name, values in list(sections.items()) + [("strings.data", bytes(strings.data))]:
+        blob = values.tobytes() if isinstance(values, array) else values
+        relative += -relative % _ALIGNMENT
+        layout[name] = [relative, len(blob), values.typecode if isinstance(values, array) else "B"]
+        blobs.append((relative, blob))
+        relative += len(blob)
+
+    header = {
+        "dataset_version": snapshot.version,
+        "scoring_version": scoring_version,
+        "db_fingerprint": db_fingerprint,
+        "count": len(stations),
+        "modes": modes,
+        "metrics": metric_keys,
+        "columns": list(STATION_FIELDS),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "sections": layout,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    base = _data_offset(len(header_bytes))
+
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for offset, blob in blobs:
+            f.seek(base + offset)
+            f.write(blob)
+    os.replace(temp_path, path)
+    return header
+
+
+def _data_offset(header_length: int) -> int:
+    """セクションの開始位置（ヘッダーの後の8バイト境界）"""
+    offset = _PREAMBLE.size + header_length
+    return offset + -offset % _ALIGNMENT
+
+
+def _read_header(f, path: str) -> Dict[str, Any]:
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) < _PREAMBLE.size:
+        raise ValueError(f"コンパイル済みのデータセットではありません: {path}")
+    magic, format_version, header_length = _PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError(f"コンパイル済みのデータセットではありません: {path}")
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f"ファイルの形式のバージョンが異なります: {format_version}（対応: {FORMAT_VERSION}）")
+    header = json.loads(f.read(header_length).decode("utf-8"))
+    header["data_offset"] = _data_offset(header_length)
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """ファイルのヘッダーを読み込む（形式が異なる場合はValueError）"""
+    with open(path, "rb") as f:
+        return _read_header(f, path)
+
+
+class CompiledDataset:
+    """
+    mmapで読み込んだコンパイル済みのデータセット（StationSnapshot と同じ使い方）
+
+    配列はmmapの領域をそのまま参照し、JSON断片や駅データは取得時に組み立てます。
+    """
+
+    def __init__(self, path: str, build_response: Callable[..., Dict[str, Any]],
+                 scoring_version: Optional[str] = None, db_fingerprint: Optional[str] = None):
+        """
+        Args:
+            path: database/compile_dataset.py で作成したファイル
+            build_response: 行データからレスポンス用の辞書を作る関数（ファイルにない駅の場合に使用）
+            scoring_version: 現在の評価基準の定義のバージョン（ファイルと異なる場合はValueError）
+            db_fingerprint: 現在のDBの内容の指紋（ファイルと異なる場合はValueError）
+        """
+        with open(path, "rb") as f:
+            header = _read_header(f, path)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if scoring_version is not None and header["scoring_version"] != scoring_version:
+            self._mmap.close()
+            raise ValueError(
+                f"評価基準の定義が変更されています（ファイル: {header['scoring_version']}、現在: {scoring_version}）。"
+                "database/compile_dataset.py で作成し直してください"
+            )
+        if db_fingerprint is not None and header.get("db_fingerprint") != db_fingerprint:
+            self._mmap.close()
+            raise ValueError(
+                f"DBの内容が作成時から変わっています（ファイル: {header.get('db_fingerprint')}、現在: {db_fingerprint}）。"
+                "database/compile_dataset.py で作成し直してください"
+            )
+        self.path = path
+        self.header = header
+        self.version: str = header["dataset_version"]
+        self.modes: List[str] = header["modes"]
+        self.loaded_at = time.time()
+        self._build_response = build_response
+        self._count: int = header["count"]
+        self._metric_columns: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        data = memoryview(self._mmap)
+        base = header["data_offset"]
+        self._sections: Dict[str, memoryview] = {}
+        for name, (offset, length, typecode) in header["sections"].items():
+            view = data[base + offset:base + offset + length]
+            self._sections[name] = view if typecode == "B" else view.cast(typecode)
+
+        # 文字列はmmapから直接切り出す（memoryviewを経由するとbytesへの変換が1回増える）
+        self._strings_base = base + header["sections"]["strings.data"][0]
+        self._string_offsets = self._sections["strings.offsets"]
+        self._heads = self._sections["fragment.head"]
+        self._tails = self._sections["fragment.tail"]
+        self._id_keys = self._sections["index.id.keys"]
+        self._id_positions = self._sections["index.id.positions"]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _string(self, string_id: int) -> bytes:
+        base = self._strings_base
+        return self._mmap[base + self._string_offsets[string_id]:base + self._string_offsets[string_id + 1]]
+
+    def position(self, station_id: Any) -> Optional[int]:
+        """駅IDに対応する駅の位置（駅名順の番号、ファイルにない場合はNone）"""
+        if not isinstance(station_id, int):
+            return None
+        i = bisect_left(self._id_keys, station_id)
+        if i < self._count and self._id_keys[i] == station_id:
+            return self._id_positions[i]
+        return None
+
+    def station(self, position: int) -> Station:
+        """位置に対応する駅データ"""
+        values = []
+        for name in STATION_FIELDS:
+            value = self._sections[f"column.{name}"][position]
+            if name in STRING_COLUMNS:
+                values.append(None if value == STRING_NULL else self._string(value).decode("utf-8"))
+            else:
+                values.append(None if value == INT_NULL else value)
+        return Station(*values)
+
+    def prepare(self, mode: str) -> Tuple[memoryview, memoryview]:
+        """モードごとの全駅の達成率とscoreのJSON（文字列表の番号）"""
+        try:
+            return self._sections[f"mode.{mode}.percentage"], self._sections[f"mode.{mode}.score"]
+        except KeyError:
+            raise ValueError(f"コンパイル済みのデータセットに含まれないモードです: {mode}") from None
+
+    def fragment(self, position: int, score: bytes) -> bytes:
+        """駅のJSON断片の score を差し替えたもの"""
+        return self._string(self._heads[position]) + score + self._string(self._tails[position])
+
+    def _fragment(self, position: int, score_id: int) -> bytes:
+        return self.fragment(position, self._string(score_id))
+
+    def metric_columns(self, evaluator: ScoreEvaluator) -> Dict[str, Any]:
+        """
+        評価項目ごとの全駅の点（駅の並び順）
+
+        ファイルに書き出した項目はmmapの領域をそのまま返し、含まれない項目の組み合わせは初回のみ計算します。
+        """
+        if all(f"metric.{key}" in self._sections for key in evaluator.keys):
+            return {key: self._sections[f"metric.{key}"] for key in evaluator.keys}
+        columns = self._metric_columns.get(evaluator.keys)
+        if columns is None:
+            with self._lock:
+                columns = self._metric_columns.get(evaluator.keys)
+                if columns is None:
+                    columns = evaluator.credit_columns(self.station(position) for position in range(self._count))
+                    self._metric_columns[evaluator.keys] = columns
+        return columns
+
+    def entry(self, mode: str, row: Dict[str, Any]) -> StationEntry:
+        """行データに対応する事前計算結果を取得（ファイルにない駅はその場で計算）"""
+        position = self.position(row.get("id"))
+        if position is None:
+            data = self._build_response(row, mode=mode, include_details=False)
+            return data["score"]["percentage"], dumps(data)
+        percentages, scores = self.prepare(mode)
+        return percentages[position], self._fragment(position, scores[position])
+
+    def entries(self, mode: str, rows: Iterable[Dict[str, Any]]) -> List[StationEntry]:
+        """複数の行データの事前計算結果（一覧APIの全件の処理用）"""
+        percentages, scores = self.prepare(mode)
+        # 全件（全国規模で数万件）を処理するため、position・_fragment を展開してローカル変数で参照する
+        data, base, offsets = self._mmap, self._strings_base, self._string_offsets
+        keys, positions, heads, tails, count = self._id_keys, self._id_positions, self._heads, self._tails, self._count
+        result = []
+        for row in rows:
+            station_id = row.get("id")
+            i = bisect_left(keys, station_id) if isinstance(station_id, int) else count
+            if i == count or keys[i] != station_id:
+                result.append(self.entry(mode, row))
+                continue
+            position = positions[i]
+            head, score, tail = heads[position], scores[position], tails[position]
+            result.append((
+                percentages[position],
+                data[base + offsets[head]:base + offsets[head + 1]]
+                + data[base + offsets[score]:base + offsets[score + 1]]
+                + data[base + offsets[tail]:base + offsets[tail + 1]],
+            ))
+        return result
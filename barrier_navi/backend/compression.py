@@ -0,0 +1,103 @@
+"""
+レスポンス圧縮 - APIレスポンスをAccept-Encodingに応じてbrotli/gzipで圧縮する
+
+brotliパッケージがインストールされていればbrotliを優先し、なければgzipのみを使用します。
+小さいレスポンスは圧縮しても効果が薄いため、COMPRESS_MIN_SIZEバイト以上のみ圧縮します。
+"""
+
+import gzip
+from typing import List, Optional
+
+from flask import Flask, request
+from werkzeug.datastructures import Accept
+
+from http_cache import encoded_etag
+from settings import get_settings
+
+try:
+    import brotli
+except ImportError:  # brotliは任意の依存パッケージ
+    brotli = None
+
+# 圧縮するレスポンスの最小サイズ（バイト）
+COMPRESS_MIN_SIZE = get_settings().compress_min_size
+
+# 圧縮レベル（リクエストごとに圧縮するため速度を優先）
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# 圧縮対象のContent-Type
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+}
+
+
+def available_encodings() -> List[str]:
+    """サーバー側で使用できる圧縮形式（優先順）"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(encodings: List[str], accept_encodings: Optional[Accept] = None) -> Optional[str]:
+    """
+    Accept-Encodingから使用する圧縮形式を決定（対応していなければNone）
+
+    Args:
+        encodings: サーバー側で使用できる圧縮形式（優先順）
+        accept_encodings: 解析済みのAccept-Encoding（省略時は現在のFlaskのリクエスト）
+    """
+    if accept_encodings is None:
+        accept_encodings = request.accept_encodings
+    best = accept_encodings.best_match(encodings)
+    return best if best in encodings else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """指定した形式でデータを圧縮"""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """
+    after_requestフック：条件を満たすレスポンスを圧縮する
+
+    ストリーミング・ファイル送信（direct_passthrough）・既に圧縮済みのレスポンスは対象外です。
+    304にも200と同じ Vary を付与します（共有キャッシュが保存済みのレスポンスのヘッダーを304で更新するため）。
+    """
+    if response.status_code == 304 and response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add("Accept-Encoding")
+        return response
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding(available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+
+    # 圧縮前と圧縮後は別の表現なので、ETagも区別する（弱いETagは弱いまま）
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+    return response
+
+
+def init_compression(app: Flask):
+    """アプリケーションにレスポンス圧縮を設定"""
+    app.after_request(compress_response)
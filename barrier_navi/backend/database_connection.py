@@ -1,59 +1,119 @@
 """
-ローカルMySQLデータベースに接続してデータを取得するプログラム
+データベースに接続してデータを取得するプログラム（MySQL・SQLite）
+
+SQLはMySQLの書き方（プレースホルダーは %s）で記述し、SQLiteに接続した場合は実行時に変換します。
+接続先は環境変数 DB_BACKEND（mysql / sqlite）で選び、connect_database() で接続します。
 """
 
+import logging
 import os
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
+import re
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional
 
-# .envファイルから環境変数を読み込む
-load_dotenv()
+from metrics import span
+from query_stats import is_explainable, query_stats
 
+logger = logging.getLogger(__name__)
 
-class DatabaseConnection:
-    """データベース接続を管理するクラス"""
-    
-    def __init__(self, host: str = "localhost", port: int = 3306, 
-                 database: str = "mysql", user: str = "root", 
-                 password: str = "", **kwargs):
-        """
-        MySQLデータベース接続を初期化
-        
-        Args:
-            host: MySQLサーバーのホスト名（デフォルト: localhost）
-            port: MySQLサーバーのポート番号（デフォルト: 3306）
-            database: データベース名（デフォルト: mysql）
-            user: ユーザー名（デフォルト: root）
-            password: パスワード（デフォルト: 空文字列）
-            **kwargs: その他の接続パラメータ
-        """
+# mysql.connector（最初の接続時に一度だけ読み込む）
+_mysql_connector = None
+
+# sqlite3（最初の接続時に一度だけ読み込む）
+_sqlite3 = None
+
+# SQLiteで書き込み中のロックの解除を待つ時間（秒）
+SQLITE_BUSY_TIMEOUT = 10.0
+
+_MYSQL_PLACEHOLDER = re.compile(r"%s")
+# 列名・式の間の / （MySQLでは整数同士でも小数の割り算になる）
+_DIVISION = re.compile(r"(\w+|\))\s*/\s*(?=[\w(])")
+
+
+def _get_mysql_connector():
+    """mysql.connectorを読み込んで返す（読み込み済みの場合はそのまま返す）"""
+    global _mysql_connector
+    if _mysql_connector is None:
         try:
             import mysql.connector
-            from mysql.connector import Error
         except ImportError:
             raise ImportError(
                 "MySQLを使用するには mysql-connector-python をインストールしてください: "
                 "pip install mysql-connector-python"
             )
-        
+        _mysql_connector = mysql.connector
+    return _mysql_connector
+
+
+def _get_sqlite3():
+    """sqlite3を読み込んで返す（MySQLのDATETIMEと同じ形式で日時を保存・取得するよう設定する）"""
+    global _sqlite3
+    if _sqlite3 is None:
+        import sqlite3
+        sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=" ", timespec="seconds"))
+        sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode("utf-8")))
+        _sqlite3 = sqlite3
+    return _sqlite3
+
+
+def _sqlite_concat_ws(separator: Optional[str], *values: Any) -> Optional[str]:
+    """MySQLの CONCAT_WS（NULLの値は飛ばす）"""
+    if separator is None:
+        return None
+    return separator.join(str(value) for value in values if value is not None)
+
+
+def _sqlite_crc32(value: Any) -> Optional[int]:
+    """MySQLの CRC32（文字列はUTF-8のバイト列、数値は文字列にしてから計算）"""
+    if value is None:
+        return None
+    data = value if isinstance(value, bytes) else str(value).encode("utf-8")
+    return zlib.crc32(data)
+
+
+@lru_cache(maxsize=1024)
+def to_sqlite_query(query: str) -> str:
+    """
+    MySQL向けのSQLをSQLiteで実行できる形に変換
+
+    - プレースホルダー: %s → ?
+    - 割り算: SQLiteでは整数同士の / が整数の割り算になるため、MySQLと同じく小数の割り算にする
+    """
+    query = _MYSQL_PLACEHOLDER.sub("?", query)
+    return _DIVISION.sub(r"\1 * 1.0 / ", query)
+
+
+class BaseDatabaseConnection(ABC):
+    """
+    データベース接続の共通処理（クエリの実行・クエリ統計・メトリクス）
+
+    スキーマの確認（has_column・has_index）は接続先ごとに実装します。実装していない接続先は作成時にTypeErrorになります。
+    """
+
+    # スロークエリの実行計画を取得する構文
+    explain_prefix = "EXPLAIN "
+
+    def __init__(self):
         self.connection = None
         self.cursor = None
-        
-        try:
-            self.connection = mysql.connector.connect(
-                host=host,
-                port=port,
-                database=database,
-                user=user,
-                password=password,
-                **kwargs
-            )
-            self.cursor = self.connection.cursor(dictionary=True)  # 辞書形式で結果を取得
-            print(f"MySQLデータベース '{database}' に接続しました。")
-        except Error as e:
-            print(f"MySQL接続エラー: {e}")
-            raise
-    
+
+    def _prepare(self, query: str) -> str:
+        """SQLを接続先の書き方に変換（MySQLはそのまま）"""
+        return query
+
+    def _execute(self, query: str, params: Optional[tuple] = None):
+        if params:
+            self.cursor.execute(self._prepare(query), params)
+        else:
+            self.cursor.execute(self._prepare(query))
+
+    def _discard_results(self):
+        """iter_queryが途中で中断された場合に未読の結果を破棄"""
+
     def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """
         SQLクエリを実行して結果を取得
@@ -66,16 +126,80 @@ class DatabaseConnection:
             クエリ結果のリスト（辞書形式）
         """
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            
-            # 辞書形式で結果を取得（cursor(dictionary=True)で既に設定済み）
-            return self.cursor.fetchall()
+            start = time.perf_counter()
+            with span("db_query"):
+                self._execute(query, params)
+                rows = self.cursor.fetchall()
         except Exception as e:
-            print(f"クエリ実行エラー: {e}")
+            logger.error("クエリ実行エラー: %s", e)
             raise
+
+        if query_stats.enabled:
+            self._record_query(query, params, time.perf_counter() - start)
+        return rows
+
+    def _record_query(self, query: str, params: Optional[tuple], seconds: float):
+        """クエリ統計に実行時間を記録（スロークエリの場合は実行計画も取得）"""
+        if not query_stats.record(query, seconds):
+            return
+        plan = None
+        if is_explainable(query):
+            try:
+                plan = self.explain(query, params)
+            except Exception as e:
+                logger.debug("実行計画を取得できませんでした: %s", e)
+        query_stats.record_slow(query, seconds, plan)
+
+    def explain(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """
+        クエリの実行計画を取得（MySQLは EXPLAIN、SQLiteは EXPLAIN QUERY PLAN の結果）
+
+        Args:
+            query: SELECTクエリ（プレースホルダーは %s を使用）
+            params: クエリパラメータ
+        """
+        self._execute(self.explain_prefix + query, params)
+        return self.cursor.fetchall()
+    
+    def iter_query(self, query: str, params: Optional[tuple] = None,
+                   batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        SQLクエリを実行して結果を1行ずつ返す（全件をメモリに載せない）
+
+        Args:
+            query: 実行するSQLクエリ（プレースホルダーは %s を使用）
+            params: クエリパラメータ（タプルまたはリスト）
+            batch_size: サーバーから一度に取得する行数
+
+        Yields:
+            クエリ結果の行（辞書形式）
+        """
+        try:
+            start = time.perf_counter()
+            with span("db_query"):
+                self._execute(query, params)
+        except Exception as e:
+            logger.error("クエリ実行エラー: %s", e)
+            raise
+
+        # 結果を読みながら返すため、記録するのは実行までの時間（未読の結果があるため実行計画は取得しない）
+        if query_stats.enabled:
+            seconds = time.perf_counter() - start
+            if query_stats.record(query, seconds):
+                query_stats.record_slow(query, seconds)
+
+        exhausted = False
+        try:
+            while True:
+                rows = self.cursor.fetchmany(batch_size)
+                if not rows:
+                    exhausted = True
+                    break
+                yield from rows
+        finally:
+            # 途中で中断された場合は未読の結果を読み捨てて接続を再利用可能にする
+            if not exhausted:
+                self._discard_results()
     
     def execute_non_query(self, query: str, params: Optional[tuple] = None):
         """
@@ -86,16 +210,28 @@ class DatabaseConnection:
             params: クエリパラメータ
         """
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            self.connection.commit()
-            print(f"クエリが正常に実行されました。影響を受けた行数: {self.cursor.rowcount}")
+            start = time.perf_counter()
+            with span("db_query"):
+                self._execute(query, params)
+                self.connection.commit()
+            logger.debug("クエリが正常に実行されました。影響を受けた行数: %d", self.cursor.rowcount)
         except Exception as e:
             self.connection.rollback()
-            print(f"クエリ実行エラー: {e}")
+            logger.error("クエリ実行エラー: %s", e)
             raise
+
+        if query_stats.enabled:
+            seconds = time.perf_counter() - start
+            if query_stats.record(query, seconds):
+                query_stats.record_slow(query, seconds)
+
+    @abstractmethod
+    def has_column(self, table: str, column: str) -> bool:
+        """テーブルにカラムが存在するか"""
+
+    @abstractmethod
+    def has_index(self, table: str, index: str) -> bool:
+        """テーブルにインデックスが存在するか"""
     
     def close(self):
         """データベース接続を閉じる"""
@@ -103,7 +239,127 @@ class DatabaseConnection:
             self.cursor.close()
         if self.connection:
             self.connection.close()
-        print("データベース接続を閉じました。")
+        logger.debug("データベース接続を閉じました。")
+
+
+class MySQLConnection(BaseDatabaseConnection):
+    """MySQLへの接続"""
+
+    def __init__(self, host: str = "localhost", port: int = 3306, 
+                 database: str = "mysql", user: str = "root", 
+                 password: str = "", **kwargs):
+        """
+        MySQLデータベース接続を初期化
+        
+        Args:
+            host: MySQLサーバーのホスト名（デフォルト: localhost）
+            port: MySQLサーバーのポート番号（デフォルト: 3306）
+            database: データベース名（デフォルト: mysql）
+            user: ユーザー名（デフォルト: root）
+            password: パスワード（デフォルト: 空文字列）
+            **kwargs: その他の接続パラメータ
+        """
+        super().__init__()
+        mysql_connector = _get_mysql_connector()
+        
+        try:
+            with span("db_connect"):
+                self.connection = mysql_connector.connect(
+                    host=host,
+                    port=port,
+                    database=database,
+                    user=user,
+                    password=password,
+                    **kwargs
+                )
+            self.cursor = self.connection.cursor(dictionary=True)  # 辞書形式で結果を取得
+            logger.debug("MySQLデータベース '%s' に接続しました。", database)
+        except mysql_connector.Error as e:
+            logger.error("MySQL接続エラー: %s", e)
+            raise
+
+    def _discard_results(self):
+        self.connection.consume_results()
+
+    def has_column(self, table: str, column: str) -> bool:
+        return bool(self.execute_query(f"SHOW COLUMNS FROM {table} LIKE %s", (column,)))
+
+    def has_index(self, table: str, index: str) -> bool:
+        return bool(self.execute_query(f"SHOW INDEX FROM {table} WHERE Key_name = %s", (index,)))
+
+
+# 既存のスクリプト（check_*.py など）で使用している名前
+DatabaseConnection = MySQLConnection
+
+
+def _dict_row(cursor, row: tuple) -> Dict[str, Any]:
+    """SQLiteの行を辞書に変換（mysql.connectorの cursor(dictionary=True) と同じ形式）"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteConnection(BaseDatabaseConnection):
+    """
+    SQLiteのファイルへの接続（ネットワークを介さずローカルのファイルから読み込む）
+
+    SQLはMySQLの書き方のまま受け取り、to_sqlite_query() で変換して実行します。
+    テーブルは database/import_csv_sqlite.py で作成します。
+    """
+
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+    def __init__(self, path: str, **kwargs):
+        """
+        Args:
+            path: SQLiteのファイルのパス（存在しない場合はエラー）
+            **kwargs: sqlite3.connect に渡すその他のパラメータ
+        """
+        super().__init__()
+        sqlite3 = _get_sqlite3()
+        try:
+            with span("db_connect"):
+                # mode=rw: ファイルがない場合に空のデータベースを作成しない
+                # ストリーミングのレスポンスでは別のスレッドで閉じることがあるため check_same_thread=False
+                self.connection = sqlite3.connect(
+                    f"file:{path}?mode=rw",
+                    uri=True,
+                    timeout=SQLITE_BUSY_TIMEOUT,
+                    check_same_thread=False,
+                    detect_types=sqlite3.PARSE_DECLTYPES,
+                    **kwargs
+                )
+            self.connection.row_factory = _dict_row
+            # MySQLと同じクエリで駅データの指紋（api_server.STATION_FINGERPRINT_QUERY）を計算できるようにする
+            self.connection.create_function("CONCAT_WS", -1, _sqlite_concat_ws, deterministic=True)
+            self.connection.create_function("CRC32", 1, _sqlite_crc32, deterministic=True)
+            self.cursor = self.connection.cursor()
+            logger.debug("SQLiteデータベース '%s' に接続しました。", path)
+        except sqlite3.Error as e:
+            logger.error("SQLite接続エラー: %s (%s)", e, path)
+            raise
+
+    def _prepare(self, query: str) -> str:
+        return to_sqlite_query(query)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return any(row["name"] == column for row in self.execute_query(f"PRAGMA table_info({table})"))
+
+    def has_index(self, table: str, index: str) -> bool:
+        return any(row["name"] == index for row in self.execute_query(f"PRAGMA index_list({table})"))
+
+
+def connect_database(backend: str = "mysql", **kwargs) -> BaseDatabaseConnection:
+    """
+    接続先（Settings.database_config）に応じてMySQLまたはSQLiteに接続
+
+    Args:
+        backend: "mysql" または "sqlite"
+        **kwargs: MySQLConnection / SQLiteConnection に渡す接続情報
+    """
+    if backend == "sqlite":
+        return SQLiteConnection(**kwargs)
+    if backend == "mysql":
+        return MySQLConnection(**kwargs)
+    raise ValueError(f"未対応のDB_BACKENDです: {backend}（mysql または sqlite）")
 
 
 # def create_sample_database(host: str = "localhost", port: int = 3306,
@@ -177,6 +433,9 @@ class DatabaseConnection:
 
 def main():
     """メイン関数 - stationデータベースのstationsテーブルからデータを取得"""
+    # .envファイルから環境変数を読み込む
+    from dotenv import load_dotenv
+    load_dotenv()
     
     # MySQL接続情報を設定（環境変数から取得）
     MYSQL_CONFIG = {
@@ -0,0 +1,114 @@
+"""
+読み書きの振り分け - 読み込み専用のクエリをMySQLのレプリカに、書き込みをプライマリに接続する
+
+駅データの一覧・詳細・統計などの読み込みがリクエストの大半を占めるため、
+レプリカ（MYSQL_REPLICA_HOSTS）が設定されている場合はそれらをレプリカにラウンドロビンで振り分けます。
+接続に失敗したレプリカは一定時間（REPLICA_RETRY_INTERVAL）候補から外し、
+使えるレプリカがない場合はプライマリに接続します。
+
+レプリカには更新が遅れて反映されるため、書き込んだ直後のクライアントの読み込みは
+呼び出し側（api_server）の判断でプライマリに接続します（read-your-writes）。
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from database_connection import BaseDatabaseConnection, connect_database
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseRouter:
+    """プライマリとレプリカへの接続を振り分けるクラス"""
+
+    def __init__(self, primary: Dict[str, Any], replicas: List[Dict[str, Any]], retry_interval: float = 30.0,
+                 connect: Callable[..., BaseDatabaseConnection] = connect_database):
+        """
+        Args:
+            primary: プライマリの接続先（connect_database に渡す値）
+            replicas: レプリカの接続先のリスト（空の場合はすべてプライマリに接続）
+            retry_interval: 接続に失敗したレプリカを候補から外す時間（秒）
+            connect: 接続する関数
+        """
+        self.primary_config = primary
+        self.replica_configs = replicas
+        self.retry_interval = retry_interval
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+        # レプリカごとの候補に戻す時刻（time.monotonic）
+        self._down_until: List[float] = [0.0] * len(replicas)
+        self.replica_connections = 0
+        self.fallbacks = 0
+
+    @property
+    def has_replicas(self) -> bool:
+        return bool(self.replica_configs)
+
+    def primary(self) -> BaseDatabaseConnection:
+        """プライマリに接続（書き込み・書き込み直後の読み込み用）"""
+        return self._connect(**self.primary_config)
+
+    def _candidates(self) -> List[int]:
+        """接続を試すレプリカの順番（ラウンドロビンで開始位置をずらし、候補から外したものを除く）"""
+        count = len(self.replica_configs)
+        start = next(self._next) % count
+        now = time.monotonic()
+        with self._lock:
+            return [i % count for i in range(start, start + count) if self._down_until[i % count] <= now]
+
+    def replica(self) -> BaseDatabaseConnection:
+        """
+        レプリカに接続（読み込み専用のクエリ用）
+
+        接続に失敗したレプリカは retry_interval 秒間候補から外して次のレプリカを試し、
+        すべて失敗した場合（レプリカがない場合を含む）はプライマリに接続します。
+        """
+        for index in self._candidates() if self.has_replicas else ():
+            try:
+                db = self._connect(**self.replica_configs[index])
+            except Exception as e:
+                with self._lock:
+                    self._down_until[index] = time.monotonic() + self.retry_interval
+                logger.warning("レプリカに接続できません（%d秒間除外します）: %s: %s",
+                               self.retry_interval, self.replica_configs[index].get("host"), e)
+                continue
+            with self._lock:
+                self.replica_connections += 1
+            return db
+
+        if self.has_replicas:
+            with self._lock:
+                self.fallbacks += 1
+        return self.primary()
+
+    def status(self) -> Dict[str, Any]:
+        """レプリカの状態（管理用API・ログ用）"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replicas": [
+                    {
+                        "host": config.get("host"),
+                        "port": config.get("port"),
+                        "healthy": down_until <= now,
+                        "retry_in_seconds": max(0.0, round(down_until - now, 1)),
+                    }
+                    for config, down_until in zip(self.replica_configs, self._down_until)
+                ],
+                "replica_connections": self.replica_connections,
+                "primary_fallbacks": self.fallbacks,
+            }
+
+
+def create_database_router(settings) -> DatabaseRouter:
+    """設定（Settings）からプライマリ・レプリカの接続先を読み込んで作成"""
+    return DatabaseRouter(
+        settings.database_config,
+        settings.replica_database_configs,
+        retry_interval=settings.replica_retry_interval,
+    )
+
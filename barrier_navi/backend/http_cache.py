@@ -0,0 +1,98 @@
+"""
+HTTPキャッシュ - データセットのバージョンをもとにETagと条件付きGET（304）を処理する
+
+駅データはCSVインポート時にしか変化しないため、(データセットのバージョン, パス,
+正規化したクエリパラメータ, 表現形式) が同じであればレスポンスも同じになります。
+ハンドラーを実行する前にETagを計算し、If-None-Matchと一致すれば304を返します。
+
+バージョンはスナップショット（STATION_SNAPSHOT_TTL 秒ごとに再読み込み）のものですが、詳細・/api/lines・
+SQLで絞り込む一覧などはDBを直接読むため、DBの更新後の最大 STATION_SNAPSHOT_TTL 秒は同じETagで異なる内容を
+返すことがあります。そのため強いETagではなく弱いETag（W/"..."）を付与します（ブラウザ・CDNでは
+さらに max-age 秒まで古い内容が使われるため、更新が反映されるまでは最大 TTL + max-age 秒です）。
+"""
+
+import hashlib
+from functools import wraps
+from typing import Callable, Iterable, Optional, Tuple
+
+from flask import make_response, request
+from werkzeug.datastructures import ETags
+
+from settings import get_settings
+
+# APIレスポンスのCache-Control（ブラウザ・CDNはmax-age経過後にETagで再検証する）
+API_CACHE_MAX_AGE = get_settings().api_cache_max_age
+API_CACHE_CONTROL = f"public, max-age={API_CACHE_MAX_AGE}, must-revalidate"
+
+# 圧縮したレスポンスのETagに付与する圧縮形式（圧縮の有無で別の表現として扱う）
+ETAG_ENCODINGS = ("br", "gzip")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """圧縮形式ごとのETagの値"""
+    return f"{etag}-{encoding}"
+
+
+def normalize_query(items: Iterable[Tuple[str, str]]) -> str:
+    """クエリパラメータを順序によらない文字列に正規化（同じ条件なら同じ値になる）"""
+    return "&".join(f"{key}={value}" for key, value in sorted(items))
+
+
+def compute_etag(version: str, path: str, query: str, representation: str = "") -> str:
+    """
+    ETagの値を計算（引用符・W/ を付ける前の値）
+
+    Args:
+        version: データセットのバージョン
+        path: リクエストのパス
+        query: normalize_query()で正規化したクエリパラメータ
+        representation: レスポンスの表現形式（JSON/NDJSONなど、同じURLで内容が変わる場合に指定）
+    """
+    key = "\n".join([version, path, query, representation])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:32]
+
+
+def match_etag(etag: str, if_none_match: ETags) -> Optional[str]:
+    """
+    If-None-Matchに一致するETag（圧縮形式ごとの値を含む）を返す（一致しなければNone）
+    """
+    candidates = [etag] + [encoded_etag(etag, encoding) for encoding in ETAG_ENCODINGS]
+    return next((c for c in candidates if if_none_match.contains_weak(c)), None)
+
+
+def conditional_get(get_version: Callable[[], str],
+                    get_representation: Callable[[], str] = lambda: ""):
+    """
+    データセットのバージョンをキーにETag・304・Cache-Controlを付与するデコレータを作成
+
+    Args:
+        get_version: 現在のデータセットのバージョンを返す関数
+        get_representation: 現在のリクエストの表現形式を返す関数
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                version = get_version()
+            except Exception:
+                # バージョンが取得できない（DB接続エラーなど）場合はキャッシュせずに処理する
+                return view(*args, **kwargs)
+
+            etag = compute_etag(version, request.path, normalize_query(request.args.items(multi=True)),
+                                get_representation())
+            matched = match_etag(etag, request.if_none_match)
+            if matched is not None:
+                # クライアントが保持している表現（圧縮形式）のETagをそのまま返す
+                response = make_response("", 304)
+                etag = matched
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = API_CACHE_CONTROL
+            response.vary.add("Accept")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,138 @@
+"""
+JSONシリアライザ - APIレスポンスを高速にUTF-8のJSONへ変換する
+
+orjsonがインストールされていればorjsonを使用し、なければ標準ライブラリのjsonで
+同じ形式（キーをソート、区切り文字なし、日本語はエスケープせずそのまま）を出力します。
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from metrics import span
+
+try:
+    import orjson
+except ImportError:  # orjsonは任意の依存パッケージ
+    orjson = None
+
+# スプライス用のプレースホルダー（エンコード後に事前生成済みのJSON断片へ置き換える）
+_FRAGMENT_PLACEHOLDER = "@@barrier_navi_fragments@@"
+
+
+def _default(o: Any) -> Any:
+    """標準で変換できない型の変換（FlaskのDefaultJSONProviderと同じ結果にする）"""
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, sort_keys: bool = True, pretty: bool = False) -> bytes:
+    """
+    オブジェクトをUTF-8のJSONバイト列に変換
+
+    Args:
+        obj: 変換するオブジェクト
+        sort_keys: キーをソートするか（jsonifyと同じ出力にするためデフォルトはTrue）
+        pretty: インデントして出力するか（デバッグ用）
+
+    Returns:
+        JSONバイト列（日本語は\\uXXXXにエスケープしない）
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    return json.dumps(
+        obj,
+        default=_default,
+        ensure_ascii=False,
+        sort_keys=sort_keys,
+        indent=2 if pretty else None,
+        separators=None if pretty else (",", ":"),
+    ).encode("utf-8")
+
+
+def splice_fragments(envelope: Dict[str, Any], key: str, fragments: Iterable[bytes]) -> bytes:
+    """
+    事前にエンコード済みのJSON断片を配列としてレスポンスに埋め込む
+
+    Args:
+        envelope: 配列以外のレスポンス項目（success, countなど）
+        key: 配列を格納するキー名（例: "data"）
+        fragments: 要素ごとのJSONバイト列
+
+    Returns:
+        レスポンス全体のJSONバイト列
+    """
+    head = dumps({**envelope, key: _FRAGMENT_PLACEHOLDER})
+    placeholder = dumps(_FRAGMENT_PLACEHOLDER)
+    return head.replace(placeholder, b"[" + b",".join(fragments) + b"]", 1)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify()などで使われるJSONプロバイダー（UTF-8のまま、orjsonがあれば使用）"""
+
+    ensure_ascii = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys)).decode("utf-8")
+
+    def response(self, *args: Any, **kwargs: Any):
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = args or kwargs
+
+        with span("serialize"):
+            body = dumps(obj, sort_keys=self.sort_keys, pretty=self._app.debug) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def json_bytes_response(body: bytes, status: int = 200):
+    """エンコード済みのJSONバイト列からFlaskのレスポンスを作成"""
+    return current_app.response_class(body + b"\n", status=status, mimetype="application/json")
+
+
+def ndjson_response(fragments: Iterable[bytes]):
+    """
+    JSON断片を1行ずつ送信するNDJSON（application/x-ndjson）のストリーミングレスポンスを作成
+
+    Args:
+        fragments: 1行分ずつのJSONバイト列（ジェネレータを渡すと全件をメモリに載せずに送信する）
+    """
+    def generate() -> Iterator[bytes]:
+        try:
+            for fragment in fragments:
+                yield fragment + b"\n"
+        finally:
+            # クライアントが途中で切断した場合も元のジェネレータを確実に終了させる
+            close = getattr(fragments, "close", None)
+            if close is not None:
+                close()
+
+    response = current_app.response_class(generate(), mimetype="application/x-ndjson")
+    # リバースプロキシでバッファリングせず、最初の行からすぐに送信させる
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,185 @@
+"""
+メトリクス - リクエストの処理時間をヒストグラムに記録し、Prometheusのテキスト形式で出力する
+
+ルートごとのリクエスト全体の処理時間に加えて、処理の内訳（DB接続・クエリ実行・スコア計算・
+ソート・JSONエンコード）を span() で区切って計測します。
+
+    with span("sort"):
+        entries.sort(...)
+
+区間の時間はリクエストごとに合計し、リクエストの終了時にまとめてヒストグラムに記録します
+（リクエストの外で実行された span() は何も記録しません）。
+
+値はプロセスごとに保持します。Gunicornで複数のワーカーを起動している場合、
+/metrics の値は応答したワーカーのものです。
+"""
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# ヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 起動時のウォームアップ（api_server.warm_up）が送るリクエストのWSGI environのキー。
+# 実際のアクセスではないため処理時間・プロファイルに記録しない（Gunicornではfork前に記録すると全ワーカーに引き継がれる）
+WARMUP_ENVIRON_KEY = "barrier_navi.warmup"
+
+# 処理中のリクエストの区間ごとの合計時間（リクエストの外ではNone）
+_spans_var: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("metric_spans", default=None)
+
+
+class Histogram:
+    """ラベルの組み合わせごとに値の分布を記録するヒストグラム"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            name: メトリクス名
+            help_text: 説明（# HELP に出力）
+            label_names: ラベル名（observeに渡す値と同じ順序）
+            buckets: 区切りの値（昇順）
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # ラベルの値 -> [区切りごとの件数（累積ではない、最後は+Inf）..., 合計値]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        """値を記録"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        """Prometheusのテキスト形式の行を返す"""
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(snapshot.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            count = cumulative + series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    """ラベルの値のエスケープ"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REQUEST_DURATION = Histogram(
+    "barrier_navi_request_duration_seconds",
+    "リクエスト全体の処理時間",
+    ("route", "method", "status"),
+)
+
+SPAN_DURATION = Histogram(
+    "barrier_navi_request_span_seconds",
+    "リクエスト内の処理区間（db_connect, db_query, scoring, sort, serialize）ごとの合計時間",
+    ("route", "span"),
+)
+
+_started_at = time.time()
+
+
+class span:
+    """処理区間の時間を現在のリクエストに加算するコンテキストマネージャ"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        spans = _spans_var.get()
+        if spans is not None:
+            spans[self.name] = spans.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def begin_request() -> Tuple[contextvars.Token, float]:
+    """リクエストの計測を開始（end_requestに渡す値を返す）"""
+    return _spans_var.set({}), time.perf_counter()
+
+
+def end_request(started: Tuple[contextvars.Token, float], route: str, method: str, status: int):
+    """リクエストの計測を終了し、処理時間と区間ごとの時間を記録"""
+    token, start = started
+    duration = time.perf_counter() - start
+    spans = _spans_var.get() or {}
+    _spans_var.reset(token)
+
+    REQUEST_DURATION.observe((route, method, str(status)), duration)
+    for name, seconds in spans.items():
+        SPAN_DURATION.observe((route, name), seconds)
+
+
+def cancel_request(started: Tuple[contextvars.Token, float]):
+    """リクエストの計測を記録せずに終了"""
+    _spans_var.reset(started[0])
+
+
+def render_metrics() -> str:
+    """全メトリクスをPrometheusのテキスト形式で返す"""
+    lines = [
+        "# HELP barrier_navi_process_start_time_seconds プロセスの起動時刻（UNIX時間）",
+        "# TYPE barrier_navi_process_start_time_seconds gauge",
+        f'barrier_navi_process_start_time_seconds{{pid="{os.getpid()}"}} {_started_at:.3f}',
+    ]
+    lines += REQUEST_DURATION.render()
+    lines += SPAN_DURATION.render()
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    """
+    Flaskアプリケーションの全リクエストの処理時間を記録する
+
+    ルートのラベルにはURLのパターン（/api/stations/<int:station_id> など）を使い、
+    どのルートにも一致しないリクエストは "unmatched" として記録します。
+    ウォームアップのリクエスト（environ に WARMUP_ENVIRON_KEY があるもの）は記録しません。
+    """
+    from flask import g, request
+
+    @app.before_request
+    def begin_request_metrics():
+        if request.environ.get(WARMUP_ENVIRON_KEY):
+            return
+        g.metrics_started = begin_request()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def end_request_metrics(exc):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        status = g.pop("metrics_status", 500)
+        end_request(started, route, request.method, status)
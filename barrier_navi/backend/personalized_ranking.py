@@ -0,0 +1,122 @@
+"""
+個人向けのランキング - プロフィールの障害の種類・優先機能から評価項目と重みを決めて全駅を並べる
+
+users_preferences の disability_type（身体・聴覚・視覚）から評価に使うモードを決め、
+それらのモードの評価項目を重み1、preferred_features（エレベーター・案内設備など）に対応する項目を
+PREFERRED_FEATURE_WEIGHT の重みにします。
+
+駅ごとの評価項目の点はスナップショットで事前に計算した列（StationSnapshot.metric_columns）を使い、
+ランキングは列と重みの内積と上位k件の選択だけで計算します（リクエストごとにスコアを計算し直さない）。
+"""
+
+from heapq import nlargest
+from itertools import repeat
+from operator import add, mul
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+# プロフィールの障害の種類とモードの対応
+DISABILITY_TYPE_TO_MODE = {"身体": "body", "聴覚": "hearing", "視覚": "vision"}
+
+# 障害の種類が登録されていない場合のモード（画面の初期表示と同じ）
+DEFAULT_MODES = ("body",)
+
+# 優先機能に対応する評価項目の重み（それ以外の項目は1）
+PREFERRED_FEATURE_WEIGHT = 3.0
+
+# 優先機能とモードごとの評価項目の対応（frontend/src/index.ts の PREFERRED_FEATURE_TO_METRIC_KEY と同じ）
+PREFERRED_FEATURE_TO_METRIC_KEYS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "エレベーター": {"body": ("elevator_ratio",), "vision": ("num_compliant_elevators",)},
+    "エスカレーター": {"body": ("escalator_ratio",), "vision": ("num_compliant_escalators",)},
+    "障害者対応型改札口": {mode: ("has_accessible_gate",) for mode in ("body", "hearing", "vision")},
+    "障害者対応型便所": {mode: ("has_accessible_restroom",) for mode in ("body", "hearing", "vision")},
+    "案内設備": {mode: ("has_guidance_system",) for mode in ("body", "hearing", "vision")},
+    "転落防止設備": {mode: ("has_fall_prevention",) for mode in ("body", "hearing", "vision")},
+    "段差解消": {
+        "body": ("step_response_status", "platform_ratio"),
+        "vision": ("step_response_status", "platform_ratio"),
+    },
+    "車いす対応プラットフォーム": {"body": ("num_wheelchair_accessible_platforms",)},
+}
+
+
+def personal_modes(disability_types: Any) -> Tuple[str, ...]:
+    """プロフィールの障害の種類から評価に使うモード（登録がない場合は DEFAULT_MODES）"""
+    modes: List[str] = []
+    for disability_type in disability_types if isinstance(disability_types, list) else []:
+        mode = DISABILITY_TYPE_TO_MODE.get(str(disability_type).strip())
+        if mode and mode not in modes:
+            modes.append(mode)
+    return tuple(modes) or DEFAULT_MODES
+
+
+def personal_weights(modes: Sequence[str], preferred_features: Any,
+                     definitions_by_mode: Mapping[str, Mapping[str, Any]]) -> Dict[str, float]:
+    """
+    評価項目ごとの重み
+
+    Args:
+        modes: 評価に使うモード
+        preferred_features: プロフィールの優先機能（文字列のリスト）
+        definitions_by_mode: モードごとの評価基準の定義
+
+    Returns:
+        評価項目 → 重み（モードの定義の順。複数のモードに含まれる項目は1つにまとめる）
+    """
+    weights: Dict[str, float] = {}
+    for mode in modes:
+        for key in definitions_by_mode[mode]:
+            weights.setdefault(key, 1.0)
+
+    for feature in preferred_features if isinstance(preferred_features, list) else []:
+        mapping = PREFERRED_FEATURE_TO_METRIC_KEYS.get(feature) if isinstance(feature, str) else None
+        for mode in modes if mapping else ():
+            for key in mapping.get(mode, ()):
+                if key in weights:
+                    weights[key] = PREFERRED_FEATURE_WEIGHT
+    return weights
+
+
+def rank_stations(columns: Mapping[str, Sequence[float]], weights: Mapping[str, float],
+                  count: int, k: int) -> List[Tuple[int, float]]:
+    """
+    重み付きの点の合計が大きい順に上位k件の駅を選ぶ（同点の場合は駅の並び順）
+
+    Args:
+        columns: 評価項目ごとの全駅の点（StationSnapshot.metric_columns）
+        weights: 評価項目ごとの重み
+        count: 駅数
+        k: 取得する件数
+
+    Returns:
+        (駅の位置, 重み付きの点の合計) のリスト
+    """
+    totals = [0.0] * count
+    for key, weight in weights.items():
+        if weight == 1:
+            totals = list(map(add, totals, columns[key]))
+        elif weight:
+            totals = list(map(add, totals, map(mul, columns[key], repeat(weight))))
+    top = nlargest(k, range(count), key=totals.__getitem__)
+    return [(position, totals[position]) for position in top]
+
+
+def personal_score(columns: Mapping[str, Sequence[float]], weights: Mapping[str, float],
+                   position: int, points: float) -> Dict[str, Any]:
+    """
+    ランキングの駅のスコア（build_station_response の score と同じ形式、重み付きの points・max_points を含む）
+
+    点が1の項目（基準を満たす項目）を達成項目として数えます。
+    """
+    met_items = sum(1 for key in weights if columns[key][position] >= 1.0)
+    total_items = len(weights)
+    max_points = sum(weights.values())
+    percentage = (points / max_points) * 100 if max_points > 0 else 0
+    return {
+        "met_items": met_items,
+        "total_items": total_items,
+        "percentage": round(percentage, 1),
+        "label": f"{met_items}/{total_items}点",
+        "points": round(points, 2),
+        "max_points": round(max_points, 2),
+    }
+
@@ -0,0 +1,178 @@
+"""
+クエリ統計 - SQL文をフィンガープリント（リテラルを除いた形）ごとに集計し、遅いクエリを記録する
+
+一覧APIのSQLは検索条件に応じて WHERE 句を組み立てるため、同じ形のクエリでも値は毎回異なります。
+数値・文字列などのリテラルとプレースホルダーを ? に置き換えた形をキーにして、
+実行回数・合計時間・p95などを集計し、どの条件の組み合わせが遅いかを確認できるようにします。
+
+QUERY_STATS=1 の場合のみ有効です。SLOW_QUERY_MS 以上かかったクエリは実行計画（EXPLAIN）とともに
+ログに出力し、直近のものを保持します（パラメータの値は個人情報を含むことがあるため保持しません）。
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# フィンガープリントごとに保持する直近の実行時間の件数（p95の計算に使用）
+SAMPLE_SIZE = 1000
+
+# 集計するフィンガープリントの上限（超えた分は集計しない）
+MAX_FINGERPRINTS = 500
+
+# 保持する直近のスロークエリの件数
+SLOW_QUERY_HISTORY = 50
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    """
+    SQL文のリテラル・プレースホルダーを ? に置き換え、空白をまとめた形を返す
+
+    例: "SELECT * FROM stations WHERE prefecture = %s AND id IN (1, 2)"
+        -> "SELECT * FROM stations WHERE prefecture = ? AND id IN (?+)"
+    """
+    text = _STRING_LITERAL.sub("?", query)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _IN_LIST.sub("(?+)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def is_explainable(query: str) -> bool:
+    """EXPLAINで実行計画を取得できるクエリか（SELECTのみ対象）"""
+    return query.lstrip().upper().startswith("SELECT")
+
+
+class _QueryStat:
+    """フィンガープリントごとの集計値"""
+
+    __slots__ = ("count", "total", "max", "slow_count", "samples", "last_plan")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow_count = 0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+        self.last_plan: Optional[List[Dict[str, Any]]] = None
+
+
+class QueryStats:
+    """クエリの実行時間をフィンガープリントごとに集計するクラス"""
+
+    def __init__(self, enabled: bool, slow_ms: float):
+        """
+        Args:
+            enabled: 集計するか
+            slow_ms: スロークエリとして記録する実行時間（ミリ秒）
+        """
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self._stats: Dict[str, _QueryStat] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, query: str, seconds: float) -> bool:
+        """
+        クエリの実行時間を記録
+
+        Returns:
+            スロークエリか（呼び出し側で実行計画を取得して record_slow を呼ぶ）
+        """
+        key = fingerprint(query)
+        slow = seconds * 1000 >= self.slow_ms
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    self._dropped += 1
+                    return slow
+                stat = self._stats[key] = _QueryStat()
+            stat.count += 1
+            stat.total += seconds
+            stat.max = max(stat.max, seconds)
+            stat.samples.append(seconds)
+            if slow:
+                stat.slow_count += 1
+        return slow
+
+    def record_slow(self, query: str, seconds: float, plan: Optional[List[Dict[str, Any]]] = None):
+        """スロークエリを実行計画とともにログに出力して保持"""
+        key = fingerprint(query)
+        duration_ms = round(seconds * 1000, 1)
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is not None and plan is not None:
+                stat.last_plan = plan
+            self._slow.append({
+                "fingerprint": key,
+                "duration_ms": duration_ms,
+                "plan": plan,
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+        logger.warning("スロークエリ (%.1f ms): %s", duration_ms, key,
+                       extra={"fingerprint": key, "duration_ms": duration_ms, "plan": plan})
+
+    def snapshot(self, sort_by: str = "total_ms", limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        集計結果を取得
+
+        Args:
+            sort_by: 並び替えの項目（total_ms, count, mean_ms, p95_ms, max_ms, slow_count）
+            limit: 返すフィンガープリントの件数
+        """
+        with self._lock:
+            items = [(key, stat.count, stat.total, stat.max, stat.slow_count, sorted(stat.samples), stat.last_plan)
+                     for key, stat in self._stats.items()]
+            slow = list(self._slow)
+            dropped = self._dropped
+
+        queries = []
+        for key, count, total, max_seconds, slow_count, samples, plan in items:
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+            queries.append({
+                "fingerprint": key,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                "p95_ms": round(p95 * 1000, 3),
+                "max_ms": round(max_seconds * 1000, 3),
+                "slow_count": slow_count,
+                "last_plan": plan,
+            })
+        if queries and sort_by in queries[0]:
+            queries.sort(key=lambda q: q[sort_by], reverse=True)
+
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_ms,
+            "queries": queries[:limit] if limit is not None else queries,
+            "recent_slow_queries": slow[::-1],
+            "untracked": dropped,
+        }
+
+    def reset(self):
+        """集計結果を破棄"""
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self._dropped = 0
+
+
+# プロセス全体で共有する集計（DatabaseConnectionと非同期モードのクエリを記録）
+query_stats = QueryStats(get_settings().query_stats_enabled, get_settings().slow_query_ms)
@@ -0,0 +1,92 @@
+"""
+起動準備の状態管理 - ウォームアップの進行状況を記録し、/readyz の判定に使う
+
+デプロイ直後のプロセスは、DB接続・駅データのスナップショット・スコアの事前計算・
+結果キャッシュがまだ用意されていないため、最初のリクエストが遅くなります。
+ウォームアップの各段階の完了を記録し、すべて完了するまでは準備中として扱います。
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class Readiness:
+    """ウォームアップの各段階（チェック項目）の完了状態を保持するクラス"""
+
+    def __init__(self, checks: Iterable[str]):
+        """
+        Args:
+            checks: 準備完了に必要なチェック項目の名前
+        """
+        self._lock = threading.Lock()
+        self._checks: Dict[str, Optional[str]] = {name: None for name in checks}
+        self._done: Dict[str, bool] = {name: False for name in checks}
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    def require(self, name: str):
+        """チェック項目を追加（ASGIモードのコネクションプールなど、起動方法によって必要な項目）"""
+        with self._lock:
+            if name not in self._done:
+                self._done[name] = False
+                self._checks[name] = None
+                self.ready_at = None
+
+    def mark(self, name: str, ok: bool = True, detail: Optional[str] = None):
+        """チェック項目の結果を記録（失敗した場合はdetailにエラー内容を残す）"""
+        with self._lock:
+            self._done[name] = ok
+            self._checks[name] = detail
+            if all(self._done.values()):
+                if self.ready_at is None:
+                    self.ready_at = time.time()
+            else:
+                self.ready_at = None
+
+    def is_done(self, name: str) -> bool:
+        with self._lock:
+            return self._done.get(name, False)
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return all(self._done.values())
+
+    def status(self) -> Dict[str, Any]:
+        """/readyz のレスポンス用の状態"""
+        with self._lock:
+            ready = all(self._done.values())
+            return {
+                "status": "ready" if ready else "starting",
+                "checks": {
+                    name: {"ok": self._done[name], "detail": self._checks[name]}
+                    for name in self._done
+                },
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+            }
+
+
+def wait_for(check: Callable[[], Any], retries: int, interval: float,
+              on_retry: Optional[Callable[[int, Exception], None]] = None) -> Any:
+    """
+    checkが成功するまで一定間隔で再試行する
+
+    Args:
+        check: 成功するまで呼び出す関数（例外が発生した場合は失敗とみなす）
+        retries: 最大試行回数
+        interval: 再試行までの待ち時間（秒）
+        on_retry: 失敗するたびに (試行回数, 例外) を受け取る関数
+
+    Returns:
+        checkの戻り値（すべて失敗した場合は最後の例外を送出）
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            return check()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e)
+            time.sleep(interval)
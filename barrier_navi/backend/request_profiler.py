@@ -0,0 +1,263 @@
+"""
+リクエストのプロファイリング - 本番環境で個別のリクエストをプロファイルする
+
+特定の検索条件だけが遅い場合に、再デプロイせずに原因を調べるための仕組みです。
+
+- 管理者のリクエスト（admin_auth）に ?_profile=1 または X-Profile: 1 を付けると、そのリクエストを
+  プロファイルします。?_profile=cprofile の場合はcProfileを使います
+- PROFILE_SAMPLE_RATE=N を指定すると、N件に1件の割合でランダムにリクエストをプロファイルします
+  （同時に1件まで、前回から SAMPLE_MIN_INTERVAL 秒以上空ける）
+- 結果は直近 PROFILE_BUFFER_SIZE 件をリングバッファに保持し、レスポンスの X-Profile-ID ヘッダーの
+  IDで管理用API（/api/admin/profiles/<ID>）から取得できます
+
+デフォルトの形式はスタックごとの処理時間（マイクロ秒）を "関数;関数;関数 時間" の1行で表した
+folded stacks 形式で、flamegraph.pl や speedscope でフレームグラフとして表示できます。
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from flask import Flask, g, request
+
+from admin_auth import is_admin_request
+from metrics import WARMUP_ENVIRON_KEY
+from settings import get_settings
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-ID"
+
+# ランダムサンプリングの最小間隔（秒）
+SAMPLE_MIN_INTERVAL = 1.0
+
+
+def _frame_name(code) -> str:
+    """フレームグラフに表示する関数名（folded stacks形式の区切り文字 ; は使えないため置き換える）"""
+    name = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name.replace(";", ":")
+
+
+def _builtin_name(func: Any) -> str:
+    """組み込み関数（C関数）の表示名"""
+    module = getattr(func, "__module__", None) or getattr(type(getattr(func, "__self__", None)), "__name__", "")
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", repr(func))
+    return f"{module}.{name}".replace(";", ":") if module else name.replace(";", ":")
+
+
+class StackProfiler:
+    """
+    関数の呼び出し・終了を記録し、呼び出しスタックごとの処理時間（自身の時間）を集計するプロファイラ
+
+    開始したスレッドの呼び出しのみを記録します。開始時点より外側の関数の終了は無視します。
+    """
+
+    def __init__(self):
+        self._stack: List[str] = []
+        self._last = 0.0
+        self.stacks: Counter = Counter()
+
+    def _charge(self, now: float):
+        """現在のスタックに前回のイベントからの経過時間を加算"""
+        if self._stack:
+            self.stacks[tuple(self._stack)] += now - self._last
+        self._last = now
+
+    def _callback(self, frame, event: str, arg: Any):
+        now = time.perf_counter()
+        if event == "call":
+            self._charge(now)
+            self._stack.append(_frame_name(frame.f_code))
+        elif event == "c_call":
+            self._charge(now)
+            self._stack.append(_builtin_name(arg))
+        elif self._stack:  # return, c_return, c_exception
+            self._charge(now)
+            self._stack.pop()
+
+    def start(self):
+        self._last = time.perf_counter()
+        sys.setprofile(self._callback)
+
+    def stop(self):
+        sys.setprofile(None)
+        self._charge(time.perf_counter())
+
+    def folded(self) -> str:
+        """folded stacks形式（"関数;関数;関数 マイクロ秒"）の文字列"""
+        lines = []
+        for stack, seconds in self.stacks.items():
+            micros = int(seconds * 1_000_000)
+            if micros > 0:
+                lines.append(f"{';'.join(stack)} {micros}")
+        lines.sort()
+        return "\n".join(lines) + "\n"
+
+
+class ProfileStore:
+    """プロファイル結果を直近の一定件数だけ保持するリングバッファ"""
+
+    def __init__(self, size: int):
+        self._profiles: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profile: Dict[str, Any]) -> str:
+        """プロファイル結果を追加してIDを返す"""
+        with self._lock:
+            profile["id"] = f"{os.getpid()}-{next(self._ids)}"
+            self._profiles.append(profile)
+        return profile["id"]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for profile in self._profiles:
+                if profile["id"] == profile_id:
+                    return profile
+        return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """保持しているプロファイルの一覧（新しい順、結果の本体は含まない）"""
+        with self._lock:
+            profiles = list(self._profiles)
+        return [{k: v for k, v in p.items() if k not in ("data", "text")} for p in reversed(profiles)]
+
+
+class RequestProfiler:
+    """リクエスト単位でプロファイラを開始・停止し、結果を保存するクラス"""
+
+    def __init__(self, sample_rate: int, buffer_size: int):
+        """
+        Args:
+            sample_rate: N件に1件の割合でランダムにプロファイルする（0の場合は行わない）
+            buffer_size: 保持するプロファイル結果の件数
+        """
+        self.sample_rate = sample_rate
+        self.store = ProfileStore(buffer_size)
+        self._sample_lock = threading.Lock()
+        self._last_sampled = 0.0
+
+    def requested_mode(self) -> Optional[str]:
+        """管理者がプロファイルを要求している場合はその形式（"folded" または "cprofile"）"""
+        value = request.args.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+        if not value or value.lower() in ("0", "false") or not is_admin_request():
+            return None
+        return "cprofile" if value.lower() == "cprofile" else "folded"
+
+    def try_sample(self) -> bool:
+        """ランダムサンプリングの対象にするか（対象にした場合は finish_sample を呼ぶこと、APIのみ対象）"""
+        if self.sample_rate <= 0 or not request.path.startswith("/api/") or request.path.startswith("/api/admin/"):
+            return False
+        if random.randrange(self.sample_rate) != 0:
+            return False
+        if time.monotonic() - self._last_sampled < SAMPLE_MIN_INTERVAL:
+            return False
+        if not self._sample_lock.acquire(blocking=False):
+            return False
+        self._last_sampled = time.monotonic()
+        return True
+
+    def finish_sample(self):
+        self._sample_lock.release()
+
+    def start(self, mode: str):
+        """プロファイラを開始"""
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackProfiler()
+            profiler.start()
+        return profiler, time.perf_counter()
+
+    def stop(self, started: Tuple[Any, float], mode: str, trigger: str, status: int) -> str:
+        """プロファイラを停止して結果を保存し、IDを返す"""
+        profiler, start = started
+        text = None
+        if mode == "cprofile":
+            profiler.disable()
+            duration = time.perf_counter() - start
+            profiler.create_stats()
+            data = marshal.dumps(profiler.stats)  # snakevizなどで開ける .prof 形式
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(50)
+            text = out.getvalue()
+        else:
+            profiler.stop()
+            duration = time.perf_counter() - start
+            data = profiler.folded()
+        return self.store.add({
+            "mode": mode,
+            "trigger": trigger,
+            "method": request.method,
+            "path": request.path,
+            "query": request.query_string.decode("utf-8", "replace"),
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "data": data,
+            "text": text,
+        })
+
+
+def create_request_profiler() -> RequestProfiler:
+    """設定（PROFILE_SAMPLE_RATE, PROFILE_BUFFER_SIZE）からプロファイラを作成"""
+    settings = get_settings()
+    return RequestProfiler(settings.profile_sample_rate, settings.profile_buffer_size)
+
+
+def init_request_profiling(app: Flask, profiler: RequestProfiler):
+    """
+    要求されたリクエストとサンプリング対象のリクエストをプロファイルする
+
+    プロファイルの対象はビュー関数の実行からレスポンスの作成まで（ストリーミングの本文の送信は含まない）です。
+    ウォームアップのリクエスト（metrics.WARMUP_ENVIRON_KEY）はプロファイルしません。
+    """
+
+    @app.before_request
+    def start_profiling():
+        if request.environ.get(WARMUP_ENVIRON_KEY):
+            return
+        mode = profiler.requested_mode()
+        trigger = "request"
+        if mode is None:
+            if not profiler.try_sample():
+                return
+            mode, trigger = "folded", "sample"
+        g.profile = (mode, trigger, profiler.start(mode))
+
+    @app.after_request
+    def stop_profiling(response):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+        mode, trigger, started = profile
+        try:
+            profile_id = profiler.stop(started, mode, trigger, response.status_code)
+        finally:
+            if trigger == "sample":
+                profiler.finish_sample()
+        if trigger == "request":
+            response.headers[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    @app.teardown_request
+    def cleanup_profiling(exc):
+        # 例外でafter_requestが呼ばれなかった場合もプロファイラを止める
+        profile = g.pop("profile", None)
+        if profile is not None:
+            mode, trigger, started = profile
+            try:
+                profiler.stop(started, mode, trigger, 500)
+            finally:
+                if trigger == "sample":
+                    profiler.finish_sample()
@@ -0,0 +1,167 @@
+"""
+結果キャッシュ - 作成済みの一覧レスポンスをバイト数上限つきのLRU/TTLで保持する
+
+一覧APIのレスポンスは (データセットのバージョン, 検索条件, ページ) が同じなら同じ内容になるため、
+作成したJSONをそのまま保持して再利用します。上限は件数ではなくレスポンスの合計バイト数で指定し、
+超えた場合は最も長く使われていないものから削除します。
+
+環境変数 RESULT_CACHE_REDIS_URL を指定すると、Redisを共有キャッシュとしても使用し、
+複数のワーカー（プロセス）間で作成済みのレスポンスを共有します（redisパッケージが必要）。
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from settings import get_settings
+
+# キャッシュの合計サイズの上限（バイト）と有効期間（秒）
+RESULT_CACHE_MAX_BYTES = get_settings().result_cache_max_bytes
+RESULT_CACHE_TTL_SECONDS = get_settings().result_cache_ttl
+
+# 共有キャッシュ（Redis）の接続先（未指定の場合はプロセス内のみ）
+RESULT_CACHE_REDIS_URL = get_settings().result_cache_redis_url
+
+
+class SharedCacheBackend:
+    """複数のワーカーで共有するキャッシュ（Redis）"""
+
+    def __init__(self, url: str, prefix: str = "barrier_navi:result:"):
+        """
+        Args:
+            url: Redisの接続先（例: redis://localhost:6379/0）
+            prefix: キーの接頭辞
+        """
+        try:
+            import redis  # redisは任意の依存パッケージ（共有キャッシュを使う場合のみ必要）
+        except ImportError:
+            raise ImportError("共有キャッシュを使用するにはredisパッケージをインストールしてください: pip install redis")
+        # 共有キャッシュが応答しない場合にリクエストを長く待たせない
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._prefix = prefix
+
+    def _key(self, key: Hashable) -> str:
+        return self._prefix + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        return self._client.get(self._key(key))
+
+    def set(self, key: Hashable, value: bytes, ttl: float):
+        self._client.set(self._key(key), value, px=int(ttl * 1000))
+
+
+class ResultCache:
+    """バイト数上限つきのLRU/TTLキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 ttl: float = RESULT_CACHE_TTL_SECONDS,
+                 shared: Optional[SharedCacheBackend] = None):
+        """
+        Args:
+            max_bytes: 保持するレスポンスの合計バイト数の上限
+            ttl: 各エントリの有効期間（秒）
+            shared: 共有キャッシュ（Noneの場合はプロセス内のみ）
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared = shared
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "shared_hits": 0,
+            "shared_errors": 0,
+        }
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """キーに対応する値を返す（ないか期限切れの場合は共有キャッシュを確認し、それでもなければNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                self._remove(key)
+                self._counters["expirations"] += 1
+
+        value = self._get_shared(key)
+        with self._lock:
+            if value is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["shared_hits"] += 1
+            self._store(key, value)
+        return value
+
+    def set(self, key: Hashable, value: bytes):
+        """値を保存（上限を超える場合は古いものから削除）"""
+        with self._lock:
+            self._store(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, self.ttl)
+            except Exception:
+                self._count("shared_errors")
+
+    def clear(self):
+        """プロセス内のエントリをすべて削除"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミス・削除数などの統計"""
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "shared": self.shared is not None,
+            }
+
+    def _get_shared(self, key: Hashable) -> Optional[bytes]:
+        if self.shared is None:
+            return None
+        try:
+            return self.shared.get(key)
+        except Exception:
+            # 共有キャッシュに接続できない場合はプロセス内のキャッシュのみで動作する
+            self._count("shared_errors")
+            return None
+
+    def _store(self, key: Hashable, value: bytes):
+        # ロックを取得した状態で呼び出す
+        if key in self._entries:
+            self._remove(key)
+        if len(value) > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+
+    def _remove(self, key: Hashable):
+        # ロックを取得した状態で呼び出す
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+
+def create_result_cache() -> ResultCache:
+    """環境変数の設定に従って結果キャッシュを作成"""
+    shared = SharedCacheBackend(RESULT_CACHE_REDIS_URL) if RESULT_CACHE_REDIS_URL else None
+    return ResultCache(shared=shared)
@@ -0,0 +1,247 @@
+"""
+スコア計算 - 評価基準の定義を重み・部分点つきの評価器にコンパイルして駅データに適用する
+
+評価基準の定義（api_server の *_METRIC_DEFINITIONS）の各項目には、次のキーを追加できます。
+
+- weight: 項目の重み（0以上、デフォルト1）
+- curve: 部分点の付け方
+    - "step"（デフォルト）: 基準値以上なら1、未満なら0（従来の達成・未達成の2値）
+    - "linear": 基準値に対する達成度（数値型は 値/基準値、割合型は 割合/基準値、フラグ型は1か0）。1が上限
+      割合型の詳細の ratio は基準値で割らない 分子/分母 のため、基準値が1でない項目では linear の点と一致しません
+    - "thresholds": thresholds の [下限, 点] のうち、値が下限以上の最も大きい下限の点（どれにも達しない場合は0）
+- thresholds: curve が "thresholds" の場合の [下限, 点] のリスト（下限の昇順、点は0〜1）
+
+スコアの達成率は Σ(点 × 重み) / Σ(重み) です。weight・curve を指定しない定義では
+点は達成項目数と一致し、達成率は従来どおり 達成項目数 / 総項目数 で計算されます。
+
+定義は最初に1回だけ ScoreEvaluator にコンパイルし（項目ごとの値の取り出し方・部分点の計算を決めておく）、
+駅ごと・全駅の一括の計算ではコンパイル済みの評価器を使います。
+詳細の内訳（api_server.evaluate_metric）も同じ measure で値と達成・未達成を判定します。
+"""
+
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+CURVES = ("step", "linear", "thresholds")
+
+# 項目の値の取り出し（(項目の値, 駅データ) → (値, 基準を満たすか)）。割合型は駅データの分子・分母から計算する
+Measure = Callable[[Any, Any], Tuple[float, bool]]
+
+
+@dataclass(frozen=True)
+class CompiledMetric:
+    """コンパイル済みの評価項目"""
+
+    key: str
+    type: str
+    required: float
+    weight: float
+    curve: str
+    thresholds: Tuple[Tuple[float, float], ...]
+    measure: Measure
+
+    def credit(self, value: float, met: bool) -> float:
+        """項目の点（0〜1、重みを掛ける前）"""
+        if self.curve == "step":
+            return 1.0 if met else 0.0
+        if self.curve == "linear":
+            return max(0.0, min(value / self.required, 1.0))
+        credit = 0.0
+        for lower, points in self.thresholds:
+            if value < lower:
+                break
+            credit = points
+        return credit
+
+
+def _to_float(value: Any) -> float:
+    """数値に変換（NULL・変換できない値は0）"""
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def ratio_parts(row: Any, numerator_key: Optional[str], denominator_key: Optional[str]) -> Optional[Tuple[float, float]]:
+    """割合型の (分子, 分母)（駅データ・フィールドの指定がない場合は None、数値に変換できない場合は (0, 0)）"""
+    if not (row and numerator_key and denominator_key):
+        return None
+    try:
+        return float(row.get(numerator_key, 0) or 0), float(row.get(denominator_key, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0, 0.0
+
+
+def _flag_measure(value: Any, row: Any) -> Tuple[float, bool]:
+    met = str(value).strip() == "1"
+    return (1.0 if met else 0.0), met
+
+
+def _ratio_measure(numerator_key: Optional[str], denominator_key: Optional[str], required: float) -> Measure:
+    def measure(value: Any, row: Any) -> Tuple[float, bool]:
+        parts = ratio_parts(row, numerator_key, denominator_key)
+        if parts is None or parts[1] <= 0:
+            return 0.0, False
+        ratio = parts[0] / parts[1]
+        return ratio, ratio >= required
+    return measure
+
+
+def _number_measure(required: float) -> Measure:
+    def measure(value: Any, row: Any) -> Tuple[float, bool]:
+        value = _to_float(value)
+        return value, value >= required
+    return measure
+
+
+def compile_metric(key: str, definition: Mapping[str, Any]) -> CompiledMetric:
+    """
+    評価項目の定義をコンパイル
+
+    Raises:
+        ValueError: weight・curve・thresholds が不正な場合
+    """
+    metric_type = definition.get("type", "flag")
+    required = definition.get("required", 1) or 1
+
+    weight = definition.get("weight", 1)
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+        raise ValueError(f"{key}: weight は0以上の数値で指定してください: {weight!r}")
+
+    curve = definition.get("curve", "step")
+    if curve not in CURVES:
+        raise ValueError(f"{key}: curve は {', '.join(CURVES)} のいずれかです: {curve!r}")
+
+    thresholds: Tuple[Tuple[float, float], ...] = ()
+    if curve == "thresholds":
+        try:
+            thresholds = tuple((float(lower), float(points)) for lower, points in definition["thresholds"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{key}: thresholds は [下限, 点] のリストで指定してください") from None
+        if not thresholds or any(not 0 <= points <= 1 for _, points in thresholds) \
+                or [lower for lower, _ in thresholds] != sorted(lower for lower, _ in thresholds):
+            raise ValueError(f"{key}: thresholds は下限の昇順、点は0〜1で指定してください")
+
+    if metric_type == "flag":
+        measure = _flag_measure
+    elif metric_type == "ratio":
+        measure = _ratio_measure(definition.get("numerator"), definition.get("denominator"), required)
+    else:
+        measure = _number_measure(required)
+
+    return CompiledMetric(key, metric_type, required, float(weight), curve, thresholds, measure)
+
+
+class ScoreEvaluator:
+    """コンパイル済みの評価基準（駅ごと・全駅一括のスコア計算）"""
+
+    def __init__(self, definitions: Mapping[str, Mapping[str, Any]]):
+        """
+        Args:
+            definitions: 評価基準の定義（項目名 → 定義）
+
+        Raises:
+            ValueError: 定義が不正な場合
+        """
+        self.metrics: Tuple[CompiledMetric, ...] = tuple(
+            compile_metric(key, definition) for key, definition in definitions.items()
+        )
+        self.keys: Tuple[str, ...] = tuple(metric.key for metric in self.metrics)
+        self.total_items = len(self.metrics)
+        self.max_points = sum(metric.weight for metric in self.metrics)
+        # weight・curve を指定した項目があるか（ない場合は従来の達成項目数でスコアを計算する）
+        self.weighted = any(metric.weight != 1 or metric.curve != "step" for metric in self.metrics)
+
+    def credits(self, row: Any) -> List[Tuple[float, bool]]:
+        """項目ごとの (点, 基準を満たすか)（定義の順）"""
+        result = []
+        for metric in self.metrics:
+            value, met = metric.measure(row.get(metric.key), row)
+            result.append((metric.credit(value, met), met))
+        return result
+
+    def score(self, row: Any) -> Dict[str, Any]:
+        """
+        駅データのスコアを計算
+
+        Returns:
+            met_items・total_items・percentage（weight・curve を指定した定義では points・max_points も含む）
+        """
+        met_items = 0
+        if not self.weighted:
+            for metric in self.metrics:
+                if metric.measure(row.get(metric.key), row)[1]:
+                    met_items += 1
+            percentage = (met_items / self.total_items) * 100 if self.total_items > 0 else 0
+            return {"met_items": met_items, "total_items": self.total_items, "percentage": round(percentage, 1)}
+
+        points = 0.0
+        for metric in self.metrics:
+            value, met = metric.measure(row.get(metric.key), row)
+            if met:
+                met_items += 1
+            points += metric.credit(value, met) * metric.weight
+        percentage = (points / self.max_points) * 100 if self.max_points > 0 else 0
+        return {
+            "met_items": met_items,
+            "total_items": self.total_items,
+            "percentage": round(percentage, 1),
+            "points": round(points, 2),
+            "max_points": round(self.max_points, 2),
+        }
+
+    def score_many(self, rows: Iterable[Any]) -> List[Dict[str, Any]]:
+        """複数の駅データのスコア（score() を行ごとに呼ぶのと同じ結果）"""
+        score = self.score
+        return [score(row) for row in rows]
+
+    def credit_columns(self, rows: Iterable[Any]) -> Dict[str, array]:
+        """
+        項目ごとの全駅の点（重みを掛ける前、駅の並びは rows の順）
+
+        重みを変えた達成率は、列と重みの内積を重みの合計で割るだけで計算できます。
+        """
+        columns = [array("d") for _ in self.metrics]
+        pairs = list(zip(self.metrics, columns))
+        for row in rows:
+            for metric, column in pairs:
+                value, met = metric.measure(row.get(metric.key), row)
+                column.append(metric.credit(value, met))
+        return dict(zip(self.keys, columns))
+
+
+# 定義（辞書）ごとのコンパイル済みの評価器。定義は読み込み後に変更しないこと
+_EVALUATORS: Dict[int, Tuple[Mapping[str, Any], ScoreEvaluator]] = {}
+
+
+def compile_definitions(definitions: Mapping[str, Mapping[str, Any]]) -> ScoreEvaluator:
+    """
+    評価基準の定義をコンパイル（同じ定義の辞書は2回目以降コンパイル済みのものを返す）
+
+    モジュールの定数の定義用です。リクエストごとに作る定義は ScoreEvaluator を直接作成してください。
+    """
+    cached = _EVALUATORS.get(id(definitions))
+    if cached is not None and cached[0] is definitions:
+        return cached[1]
+    evaluator = ScoreEvaluator(definitions)
+    _EVALUATORS[id(definitions)] = (definitions, evaluator)
+    return evaluator
+
+
+# 評価項目（1項目）の定義の辞書ごとのコンパイル済みの評価項目
+_METRICS: Dict[int, Tuple[Mapping[str, Any], CompiledMetric]] = {}
+
+
+def compile_definition(definition: Mapping[str, Any]) -> CompiledMetric:
+    """
+    評価項目（1項目）の定義をコンパイル（同じ定義の辞書は2回目以降コンパイル済みのものを返す）
+
+    項目名がわからない場合（evaluate_metric を単独で呼ぶ場合）用です。項目名には label を使います。
+    """
+    cached = _METRICS.get(id(definition))
+    if cached is not None and cached[0] is definition:
+        return cached[1]
+    metric = compile_metric(str(definition.get("label", "")), definition)
+    _METRICS[id(definition)] = (definition, metric)
+    return metric
@@ -0,0 +1,213 @@
+"""
+アプリケーション設定 - 環境変数（.envファイルを含む）を一度だけ読み込んで型付きの設定として保持する
+
+各モジュールは os.getenv を直接呼ばず、get_settings() で取得した設定を参照します。
+.envファイルはプロジェクトルートのものを最初の呼び出し時に一度だけ読み込みます
+（既に設定されている環境変数は上書きしません）。
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# プロジェクトルート（backendディレクトリの親）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV_PATH = os.path.join(BASE_DIR, ".env")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """アプリケーション全体の設定"""
+
+    # .envファイル
+    env_path: str
+    env_file_found: bool
+
+    # 接続先のデータベース（mysql / sqlite）とSQLiteのファイル
+    db_backend: str
+    sqlite_path: str
+
+    # MySQL接続情報
+    mysql_host: str
+    mysql_port: int
+    mysql_user: str
+    mysql_password: str
+    mysql_database: str
+
+    # 読み込み専用のクエリの接続先（MySQLのレプリカの "ホスト:ポート"、db_router.py）
+    mysql_replica_hosts: Tuple[str, ...]
+    replica_retry_interval: float
+    # 書き込んだクライアントの読み込みをプライマリに接続する時間（秒、レプリカの遅延への対策）
+    read_your_writes_seconds: float
+
+    # 開発サーバー（python backend/api_server.py）
+    flask_host: str
+    flask_port: int
+    flask_env: str
+
+    # 駅データのスナップショット・キャッシュ
+    station_snapshot_ttl: float
+    # コンパイル済みのデータセット（database/compile_dataset.py で作成、設定した場合はDBの代わりに読み込む）
+    compiled_dataset_path: Optional[str]
+    api_cache_max_age: int
+    compress_min_size: int
+    result_cache_max_bytes: int
+    result_cache_ttl: float
+    result_cache_redis_url: Optional[str]
+
+    # ウォームアップ
+    warmup_db_retries: int
+    warmup_db_retry_interval: float
+
+    # 非同期モード（asgi_server.py）
+    async_db_pool_min_size: int
+    async_db_pool_max_size: int
+
+    # ログ（全体のレベルと、モジュールごとのレベル "モジュール=レベル,..."）
+    log_level: str
+    log_levels: str
+
+    # クエリ統計・スロークエリログ（query_stats.py）
+    query_stats_enabled: bool
+    slow_query_ms: float
+
+    # 管理用API（/api/admin/...）のトークン。未設定の場合は管理用APIを無効にする
+    admin_token: Optional[str]
+
+    # ログイン時に発行するユーザーのトークン（user_auth.py）の署名の鍵。未設定の場合は起動ごとにランダム
+    secret_key: Optional[str]
+
+    # リクエストのプロファイリング（request_profiler.py）
+    profile_sample_rate: int
+    profile_buffer_size: int
+
+    @property
+    def mysql_config(self) -> Dict[str, Any]:
+        """DatabaseConnectionに渡す接続情報"""
+        return {
+            "host": self.mysql_host,
+            "port": self.mysql_port,
+            "user": self.mysql_user,
+            "password": self.mysql_password,
+            "database": self.mysql_database,
+        }
+
+    @property
+    def database_config(self) -> Dict[str, Any]:
+        """connect_databaseに渡す接続先（DB_BACKENDに応じてMySQLの接続情報またはSQLiteのファイル）"""
+        if self.db_backend == "sqlite":
+            return {"backend": "sqlite", "path": self.sqlite_path}
+        return {"backend": self.db_backend, **self.mysql_config}
+
+    @property
+    def replica_database_configs(self) -> List[Dict[str, Any]]:
+        """レプリカの接続先（connect_databaseに渡す値、SQLiteの場合はなし）"""
+        if self.db_backend != "mysql":
+            return []
+        configs = []
+        for item in self.mysql_replica_hosts:
+            host, _, port = item.partition(":")
+            configs.append({**self.database_config, "host": host, "port": int(port) if port else self.mysql_port})
+        return configs
+
+    @property
+    def debug(self) -> bool:
+        return self.flask_env == "development"
+
+
+def _env_flag(value: str) -> bool:
+    """環境変数の値を真偽値に変換（1, true, yes, on を真とする）"""
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _load_env_file(path: str) -> bool:
+    """.envファイルがあれば環境変数に読み込む（python-dotenvはファイルがある場合のみ読み込む）"""
+    if not os.path.exists(path):
+        return False
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=path)
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """設定を読み込む（2回目以降は同じオブジェクトを返す）"""
+    env_file_found = _load_env_file(ENV_PATH)
+    env = os.environ
+    return Settings(
+        env_path=ENV_PATH,
+        env_file_found=env_file_found,
+        db_backend=env.get("DB_BACKEND", "mysql").strip().lower(),
+        # 相対パスはプロジェクトルートからのパス
+        sqlite_path=os.path.join(BASE_DIR, env.get("SQLITE_PATH", os.path.join("database", "stations.sqlite3"))),
+        mysql_host=env.get("MYSQL_HOST", "localhost"),
+        mysql_port=int(env.get("MYSQL_PORT", "3306")),
+        mysql_user=env.get("MYSQL_USER", "root"),
+        mysql_password=env.get("MYSQL_PASSWORD", ""),  # デフォルト値は空文字列（.envファイル必須）
+        mysql_database=env.get("MYSQL_DATABASE", "station"),
+        mysql_replica_hosts=tuple(host.strip() for host in env.get("MYSQL_REPLICA_HOSTS", "").split(",") if host.strip()),
+        replica_retry_interval=float(env.get("REPLICA_RETRY_INTERVAL", "30")),
+        read_your_writes_seconds=float(env.get("READ_YOUR_WRITES_SECONDS", "10")),
+        flask_host=env.get("FLASK_HOST", "0.0.0.0"),  # Docker環境では0.0.0.0が必要
+        flask_port=int(env.get("FLASK_PORT", "5000")),
+        flask_env=env.get("FLASK_ENV", "production"),
+        station_snapshot_ttl=float(env.get("STATION_SNAPSHOT_TTL", "300")),
+        compiled_dataset_path=os.path.join(BASE_DIR, env["COMPILED_DATASET"]) if env.get("COMPILED_DATASET") else None,
+        api_cache_max_age=int(env.get("API_CACHE_MAX_AGE", "60")),
+        compress_min_size=int(env.get("COMPRESS_MIN_SIZE", "1024")),
+        result_cache_max_bytes=int(env.get("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        result_cache_ttl=float(env.get("RESULT_CACHE_TTL", "300")),
+        result_cache_redis_url=env.get("RESULT_CACHE_REDIS_URL") or None,
+        warmup_db_retries=int(env.get("WARMUP_DB_RETRIES", "30")),
+        warmup_db_retry_interval=float(env.get("WARMUP_DB_RETRY_INTERVAL", "2")),
+        async_db_pool_min_size=int(env.get("ASYNC_DB_POOL_MIN_SIZE", "1")),
+        async_db_pool_max_size=int(env.get("ASYNC_DB_POOL_MAX_SIZE", "20")),
+        log_level=env.get("LOG_LEVEL", "INFO"),
+        log_levels=env.get("LOG_LEVELS", ""),
+        query_stats_enabled=_env_flag(env.get("QUERY_STATS", "0")),
+        slow_query_ms=float(env.get("SLOW_QUERY_MS", "200")),
+        admin_token=env.get("ADMIN_TOKEN") or None,
+        secret_key=env.get("SECRET_KEY") or None,
+        profile_sample_rate=int(env.get("PROFILE_SAMPLE_RATE", "0")),
+        profile_buffer_size=int(env.get("PROFILE_BUFFER_SIZE", "50")),
+    )
+
+
+def config_summary(settings: Settings) -> str:
+    """起動時に表示する設定の概要（パスワードは伏せる）"""
+    lines = [
+        "=== 環境変数の読み込み状況 ===",
+        f".envファイルのパス: {settings.env_path}",
+        f".envファイルの存在: {settings.env_file_found}",
+        f"DB_BACKEND: {settings.db_backend}",
+    ]
+    if settings.compiled_dataset_path:
+        lines.append(f"COMPILED_DATASET: {settings.compiled_dataset_path}")
+    if settings.db_backend == "sqlite":
+        lines += [f"SQLITE_PATH: {settings.sqlite_path}", "=" * 40]
+        return "\n".join(lines)
+
+    lines += [
+        f"MYSQL_HOST: {settings.mysql_host}",
+        f"MYSQL_PORT: {settings.mysql_port}",
+        f"MYSQL_USER: {settings.mysql_user}",
+        f"MYSQL_PASSWORD: {'***' if settings.mysql_password else '(未設定)'}",
+        f"MYSQL_DATABASE: {settings.mysql_database}",
+        f"MYSQL_REPLICA_HOSTS: {', '.join(settings.mysql_replica_hosts) or '(なし)'}",
+        "=" * 40,
+    ]
+    if not settings.mysql_password:
+        # .envファイルが設定されているか確認（開発時の警告）
+        lines += [
+            "",
+            "⚠️  警告: MYSQL_PASSWORDが設定されていません。",
+            f"   .envファイルを確認してください: {settings.env_path}",
+            "   .envファイルの例:",
+            "   MYSQL_HOST=localhost",
+            "   MYSQL_PORT=3306",
+            "   MYSQL_USER=root",
+            "   MYSQL_PASSWORD=your_password_here",
+            "   MYSQL_DATABASE=station",
+        ]
+    return "\n".join(lines)
@@ -0,0 +1,117 @@
+"""
+リクエストの集約（single-flight） - 同時に届いた同じリクエストの処理を1回にまとめる
+
+アクセスが集中すると、同じ条件の一覧・統計APIが同時に何度も呼ばれ、それぞれが
+DBからの取得・スコア計算・ソートを行います。処理中の同じキーのリクエストがあれば
+新たに処理せずにその完了を待ち、結果（レスポンス本文）を共有します。
+
+結果を保持するのは処理中の間だけです（完了後のリクエストは改めて処理されます）。
+"""
+
+import threading
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from flask import current_app, make_response, request
+
+from http_cache import normalize_query
+
+
+class _Call:
+    """処理中の呼び出し（完了を待つためのイベントと結果）"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """スレッド間で同じキーの処理を1回にまとめるクラス"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        キーに対応する処理を実行し、結果を返す
+
+        同じキーの処理が実行中であれば、fnは呼ばずにその結果を待って返します
+        （処理中に例外が発生した場合は、待っていた呼び出しにも同じ例外を送出します）。
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """イベントループ上で同じキーの処理を1回にまとめるクラス（ASGIモード用）"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """キーに対応するコルーチンを実行し、結果を返す（実行中であればその結果を待つ）"""
+        import asyncio  # ASGIモードでのみ使うため、WSGIでの起動時には読み込まない
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # 待っている側がキャンセルされても、共有している処理は継続させる
+        return await asyncio.shield(task)
+
+
+def request_key() -> Hashable:
+    """現在のリクエストのキー（パスと正規化したクエリパラメータ）"""
+    return request.path, normalize_query(request.args.items(multi=True))
+
+
+def coalesce_requests(get_key: Callable[[], Optional[Hashable]] = request_key):
+    """
+    同時に届いた同じリクエストのビュー関数の実行を1回にまとめるデコレータを作成
+
+    ビュー関数のレスポンス（ステータス・ヘッダー・本文）を共有し、リクエストごとに
+    新しいレスポンスを作り直します（圧縮・ETagの付与はそれぞれのリクエストで行われます）。
+
+    Args:
+        get_key: 現在のリクエストのキーを返す関数（Noneを返した場合はまとめずに処理する）
+    """
+    flight = SingleFlight()
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = get_key()
+            if key is None:
+                return view(*args, **kwargs)
+
+            def run():
+                response = make_response(view(*args, **kwargs))
+                return response.status_code, list(response.headers), response.get_data()
+
+            status, headers, body = flight.do(key, run)
+            return current_app.response_class(body, status=status, headers=headers)
+        return wrapper
+    return decorator
@@ -0,0 +1,144 @@
+"""
+静的ファイル配信 - 事前圧縮済みファイルの配信とコンテンツハッシュ付きURLの付与
+
+フロントエンドのビルド（npm run build）で生成された .br / .gz ファイルがあれば、
+Accept-Encodingに応じてリクエストごとに圧縮せずそのまま返します。
+HTMLページ内のJS・CSSのURLには内容のハッシュ（?v=...）を付与し、
+ハッシュ付きURLへのリクエストには長期間のimmutableキャッシュを指定します。
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+from compression import negotiate_encoding
+from http_cache import match_etag
+
+# ハッシュ付きURLのキャッシュ期間（1年）
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# ハッシュなしURL・HTMLは毎回ETagで再検証する
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# 事前圧縮ファイルの拡張子（優先順）
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# HTML内のJS・CSSの参照（src="/dist/index.js", href="styles.css" など）
+ASSET_REFERENCE_PATTERN = re.compile(r'((?:src|href)=")(/?)((?:dist/[\w.-]+\.js)|styles\.css)(")')
+
+
+class StaticAssets:
+    """フロントエンドの静的ファイル（HTML・JS・CSS）を配信するクラス"""
+
+    def __init__(self, frontend_dir: str):
+        """
+        Args:
+            frontend_dir: フロントエンドのディレクトリ（styles.css, dist/, view/ を含む）
+        """
+        self.frontend_dir = frontend_dir
+        self._hashes: Dict[str, Tuple[float, str]] = {}
+        self._views: Dict[str, Tuple[Tuple[float, ...], List[str], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def content_hash(self, path: str) -> str:
+        """ファイル内容のハッシュ（更新日時が変わった場合のみ再計算）"""
+        mtime = os.path.getmtime(path)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._hashes[path] = (mtime, digest)
+        return digest
+
+    def send(self, directory: str, filename: str):
+        """
+        静的ファイルを送信（事前圧縮版があれば優先し、キャッシュヘッダーを付与）
+
+        Args:
+            directory: 配信元のディレクトリ
+            filename: ディレクトリからの相対パス
+        """
+        path = safe_join(directory, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        encoding = None
+        send_path = path
+        available = [enc for enc, suffix in PRECOMPRESSED_SUFFIXES.items()
+                     if os.path.isfile(path + suffix)
+                     and os.path.getmtime(path + suffix) >= os.path.getmtime(path)]
+        if available:
+            encoding = negotiate_encoding(available)
+            if encoding is not None:
+                send_path = path + PRECOMPRESSED_SUFFIXES[encoding]
+
+        response = send_file(send_path, mimetype=mimetype, conditional=True)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        if available:
+            response.vary.add("Accept-Encoding")
+
+        version = request.args.get("v")
+        if version and version == self.content_hash(path):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+        return response
+
+    def render_view(self, path: str):
+        """
+        HTMLページを送信（JS・CSSの参照にコンテンツハッシュを付与）
+
+        Args:
+            path: HTMLファイルのパス
+        """
+        body = self._view_body(path)
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        # 圧縮後のレスポンスのETag（compress_response で圧縮形式ごとの値になる）にも一致させる
+        matched = match_etag(etag, request.if_none_match)
+        if matched is not None:
+            response = current_app.response_class(status=304, mimetype="text/html")
+            etag = matched
+        else:
+            response = current_app.response_class(body, mimetype="text/html")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+        return response
+
+    def _view_body(self, path: str) -> bytes:
+        """ハッシュ付きURLに書き換えたHTML（HTML・参照ファイルが更新されるまでキャッシュ）"""
+        cached = self._views.get(path)
+        if cached is not None and cached[0] == self._mtimes(path, cached[1]):
+            return cached[2]
+
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        asset_paths = [os.path.join(self.frontend_dir, m.group(3))
+                       for m in ASSET_REFERENCE_PATTERN.finditer(html)]
+
+        def add_version(match: "re.Match[str]") -> str:
+            asset_path = os.path.join(self.frontend_dir, match.group(3))
+            if not os.path.isfile(asset_path):
+                return match.group(0)
+            return (f"{match.group(1)}{match.group(2)}{match.group(3)}"
+                    f"?v={self.content_hash(asset_path)}{match.group(4)}")
+
+        body = ASSET_REFERENCE_PATTERN.sub(add_version, html).encode("utf-8")
+        with self._lock:
+            self._views[path] = (self._mtimes(path, asset_paths), asset_paths, body)
+        return body
+
+    @staticmethod
+    def _mtimes(path: str, asset_paths: List[str]) -> Tuple[float, ...]:
+        """HTMLと参照ファイルの更新日時（存在しないファイルは0）"""
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else 0.0
+                     for p in [path] + asset_paths)
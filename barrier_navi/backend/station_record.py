@@ -0,0 +1,71 @@
+"""
+駅データのレコード - スナップショットで保持する1駅分の値を __slots__ のオブジェクトとして持つ
+
+DBから取得した行は1駅ごとに辞書（カラム名 → 値）で、全国規模のデータでは辞書のハッシュテーブルと
+同じ値の文字列（鉄道事業者・都道府県・市・路線名）の重複がメモリの大半を占めます。
+Stationはカラムを固定の属性として持ち、繰り返し現れる文字列は sys.intern で1つにまとめます。
+
+スコア計算（evaluate_metric・compute_score）やレスポンスの作成は行の辞書と同じく
+get() で値を取得するため、DBの行とStationのどちらでも同じ関数で処理できます。
+"""
+
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Union
+
+# 多くの駅で同じ値が繰り返し現れるため、同じ文字列オブジェクトを共有するカラム
+INTERNED_COLUMNS = frozenset({"railway_operator", "line_name", "prefecture", "city"})
+
+
+@dataclass(slots=True)
+class Station:
+    """stationsテーブルの1行（DDL.sqlの定義順。取得しなかったカラムはNone）"""
+
+    id: Any = None
+    railway_operator: Optional[str] = None
+    station_name: Optional[str] = None
+    line_name: Optional[str] = None
+    prefecture: Optional[str] = None
+    city: Optional[str] = None
+    step_response_status: Optional[int] = None
+    num_platforms: Optional[int] = None
+    num_step_free_platforms: Optional[int] = None
+    num_elevators: Optional[int] = None
+    num_compliant_elevators: Optional[int] = None
+    num_escalators: Optional[int] = None
+    num_compliant_escalators: Optional[int] = None
+    num_other_lifts: Optional[int] = None
+    num_slopes: Optional[int] = None
+    num_compliant_slopes: Optional[int] = None
+    has_tactile_paving: Optional[int] = None
+    has_guidance_system: Optional[int] = None
+    has_accessible_restroom: Optional[int] = None
+    has_accessible_gate: Optional[int] = None
+    has_accessible_ticket_machine: Optional[int] = None
+    num_wheelchair_accessible_platforms: Optional[int] = None
+    has_fall_prevention: Optional[int] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Station":
+        """DBの行（辞書）から作成（stationsテーブルにないキーは無視する）"""
+        values = []
+        for name in STATION_FIELDS:
+            value = row.get(name)
+            if name in INTERNED_COLUMNS and isinstance(value, str):
+                value = sys.intern(value)
+            values.append(value)
+        return cls(*values)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """辞書の get() と同じ使い方で値を取得（stationsテーブルにないカラムはdefault）"""
+        return getattr(self, key, default)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in STATION_FIELDS}
+
+
+# Stationの属性（stationsテーブルのカラム）
+STATION_FIELDS = tuple(field.name for field in fields(Station))
+
+# スコア計算・レスポンスの作成で受け取る行（DBの行の辞書、またはスナップショットのStation）
+StationRow = Union[Dict[str, Any], Station]
@@ -0,0 +1,180 @@
+"""
+駅データのスナップショット - stationsテーブルをプロセス内に保持する
+
+駅データはCSVインポート時にしか変化しないため、全駅の行データを一度だけ取得して保持し、
+モードごとのスコアとレスポンス用のJSON断片を事前に計算しておきます。
+一覧APIはSQLで絞り込んだ駅IDに対応するJSON断片をそのまま連結してレスポンスを作成します。
+
+全国規模のデータでもメモリを抑えるため、行データは Station（__slots__ のレコード）で保持し、
+JSON断片はモードによらない部分（駅名・路線名など）を1駅につき1つだけ保持して、
+モードごとに異なる score の部分（同じ値が多いため共有する）と取得時に連結します。
+"""
+
+import hashlib
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from json_serializer import dumps
+from scoring import ScoreEvaluator
+from settings import get_settings
+from station_record import Station
+
+# スナップショットの有効期間（秒）。期限切れ後の最初のアクセスで再読み込みする
+SNAPSHOT_TTL_SECONDS = get_settings().station_snapshot_ttl
+
+# (スコアの達成率, レスポンス用のJSON断片)
+StationEntry = Tuple[float, bytes]
+
+
+# JSON断片の score の位置に置く値（モードによらない部分を前後に分けるために使う）
+_SCORE_PLACEHOLDER = "@@barrier_navi_score@@"
+
+
+def split_fragment(data: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    """レスポンス用の辞書のJSONを score の値の前後に分ける（前 + scoreのJSON + 後 = 辞書全体のJSON）"""
+    head, _, tail = dumps({**data, "score": _SCORE_PLACEHOLDER}).partition(dumps(_SCORE_PLACEHOLDER))
+    return head, tail
+
+
+class StationSnapshot:
+    """ある時点のstationsテーブルの内容と、モード別の事前計算結果"""
+
+    def __init__(self, rows: List[Dict[str, Any]],
+                 build_response: Callable[..., Dict[str, Any]]):
+        """
+        Args:
+            rows: stationsテーブルの行データ（station_name順、全カラム。バージョンは全カラムの内容から計算する）
+            build_response: 行データからレスポンス用の辞書を作る関数（build_station_response）。
+                score 以外の項目はモードによらないこと
+        """
+        self.version = hashlib.sha1(dumps(rows)).hexdigest()[:16]
+        self.stations: List[Station] = [Station.from_row(row) for row in rows]
+        self._positions: Dict[Any, int] = {station.id: i for i, station in enumerate(self.stations)}
+        self.loaded_at = time.time()
+        self._build_response = build_response
+        # 駅ごとのJSON断片の score より前・後の部分（最初に計算したモードで作成）
+        self._heads: List[bytes] = []
+        self._tails: List[bytes] = []
+        # モードごとの (駅の並び順の達成率, scoreのJSON)
+        self._scores: Dict[str, Tuple[array, List[bytes]]] = {}
+        # 評価項目ごとの全駅の点（個人向けのランキング用、評価項目の組み合わせごと）
+        self._metric_columns: Dict[Tuple[str, ...], Dict[str, array]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def prepare(self, mode: str) -> Tuple[array, List[bytes]]:
+        """モードごとの全駅の達成率とscoreのJSONを返す（初回のみ計算）"""
+        scores = self._scores.get(mode)
+        if scores is None:
+            with self._lock:
+                scores = self._scores.get(mode)
+                if scores is None:
+                    scores = self._compute(mode)
+                    self._scores[mode] = scores
+        return scores
+
+    def _compute(self, mode: str) -> Tuple[array, List[bytes]]:
+        percentages = array("d")
+        fragments: List[bytes] = []
+        shared: Dict[bytes, bytes] = {}
+        build_templates = not self._heads
+        for station in self.stations:
+            data = self._build_response(station, mode=mode, include_details=False)
+            score = dumps(data["score"])
+            percentages.append(data["score"]["percentage"])
+            fragments.append(shared.setdefault(score, score))
+            if build_templates:
+                head, tail = split_fragment(data)
+                self._heads.append(head)
+                self._tails.append(tail)
+        return percentages, fragments
+
+    def fragment_parts(self) -> Tuple[List[bytes], List[bytes]]:
+        """駅ごとのJSON断片の score より前・後の部分（いずれかのモードの事前計算後に有効）"""
+        return self._heads, self._tails
+
+    def fragment(self, position: int, score: bytes) -> bytes:
+        """駅のJSON断片の score を差し替えたもの（いずれかのモードの事前計算後に有効）"""
+        return self._heads[position] + score + self._tails[position]
+
+    def metric_columns(self, evaluator: ScoreEvaluator) -> Dict[str, array]:
+        """評価項目ごとの全駅の点（駅の並び順、初回のみ計算）"""
+        columns = self._metric_columns.get(evaluator.keys)
+        if columns is None:
+            with self._lock:
+                columns = self._metric_columns.get(evaluator.keys)
+                if columns is None:
+                    columns = evaluator.credit_columns(self.stations)
+                    self._metric_columns[evaluator.keys] = columns
+        return columns
+
+    def entry(self, mode: str, row: Dict[str, Any]) -> StationEntry:
+        """
+        行データに対応する事前計算結果を取得
+
+        スナップショット作成後に追加された駅など、見つからない場合はその場で計算します。
+        """
+        position = self._positions.get(row.get("id"))
+        if position is None:
+            data = self._build_response(row, mode=mode, include_details=False)
+            return data["score"]["percentage"], dumps(data)
+        percentages, scores = self.prepare(mode)
+        return percentages[position], self._heads[position] + scores[position] + self._tails[position]
+
+    def entries(self, mode: str, rows: Iterable[Dict[str, Any]]) -> List[StationEntry]:
+        """複数の行データの事前計算結果（entry() を行ごとに呼ぶのと同じ結果、一覧APIの全件の処理用）"""
+        percentages, scores = self.prepare(mode)
+        positions, heads, tails = self._positions, self._heads, self._tails
+        result = []
+        for row in rows:
+            position = positions.get(row.get("id"))
+            if position is None:
+                result.append(self.entry(mode, row))
+            else:
+                result.append((percentages[position], heads[position] + scores[position] + tails[position]))
+        return result
+
+
+class StationSnapshotStore:
+    """スナップショットの読み込みと期限切れ時の再読み込みを管理するクラス"""
+
+    def __init__(self, load_snapshot: Callable[[], StationSnapshot],
+                 ttl: float = SNAPSHOT_TTL_SECONDS):
+        """
+        Args:
+            load_snapshot: スナップショットを読み込む関数（DBから作成、またはコンパイル済みのファイルを読み込む）
+            ttl: スナップショットの有効期間（秒）
+        """
+        self._load_snapshot = load_snapshot
+        self._ttl = ttl
+        self._snapshot: Optional[StationSnapshot] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[StationSnapshot]:
+        """有効期間内のスナップショットを返す（読み込みが必要な場合はNone、DBにはアクセスしない）"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.time() - snapshot.loaded_at < self._ttl:
+            return snapshot
+        return None
+
+    def get(self) -> StationSnapshot:
+        """有効なスナップショットを返す（未読み込み・期限切れの場合は読み込む）"""
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.time() - snapshot.loaded_at >= self._ttl:
+                snapshot = self._load_snapshot()
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        """スナップショットを破棄して次回アクセス時に再読み込みさせる"""
+        with self._lock:
+            self._snapshot = None
@@ -0,0 +1,156 @@
+"""
+構造化ログ - JSON形式のログをキュー経由で出力し、リクエストIDを付与する
+
+print() はリクエストを処理しているスレッドで標準出力へ同期的に書き込むため、
+負荷が高いと出力待ちがそのままレスポンス時間に加わります。
+ログはキュー（QueueHandler）に積むだけにして、書き込みは専用のスレッド（QueueListener）で行います。
+
+- 1行1件のJSON（ts, level, logger, message, request_id と extra で渡した項目）
+- レベルは LOG_LEVEL（全体）と LOG_LEVELS（モジュールごと、例: "database_connection=DEBUG,api_server=INFO"）で指定
+- リクエストIDは X-Request-ID ヘッダーを引き継ぐか、なければ生成し、レスポンスヘッダーにも付与
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+from typing import Dict, Optional
+
+from flask import Flask, g, request
+
+from settings import get_settings
+
+# 処理中のリクエストのID（スレッド・非同期タスクごとに独立）
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# LogRecordの標準の属性（これ以外はextraで渡された項目としてJSONに含める）
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """ログを1行のJSONに変換するフォーマッター"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """ログに処理中のリクエストIDを付与するフィルター"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    キューに積むハンドラー
+
+    標準のQueueHandlerはキューに積む前にメッセージを文字列に整形しますが、
+    整形はリスナーのスレッドで行えばよいため、リクエストIDの付与のみ行ってそのまま積みます。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_levels(value: str) -> Dict[str, str]:
+    """LOG_LEVELS（"モジュール=レベル,..."）を辞書に変換"""
+    levels = {}
+    for item in value.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener():
+    """ログを書き込むスレッドを開始（fork後の子プロセスでも呼び出す）"""
+    global _listener
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    """キューに残っているログを書き込んでからスレッドを停止"""
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    """
+    ルートロガーにキュー経由のJSONハンドラーを設定（2回目以降の呼び出しは何もしない）
+
+    Gunicornのpreload_appではマスタープロセスで設定してからforkするため、
+    子プロセスではforkの直後に書き込み用のスレッドを作り直します。
+    """
+    global _queue_handler
+    if _queue_handler is not None:
+        return
+
+    settings = get_settings()
+    _queue_handler = _QueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.log_level.upper())
+    for name, level in parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _start_listener()
+    atexit.register(_stop_listener)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_start_listener)
+
+
+def init_request_logging(app: Flask):
+    """リクエストごとにIDを割り当て、ログとレスポンスヘッダー（X-Request-ID）に付与する"""
+
+    @app.before_request
+    def assign_request_id():
+        request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.request_id_token = request_id_var.set(request_id[:64])
+
+    @app.after_request
+    def add_request_id_header(response):
+        request_id = request_id_var.get()
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+
+    @app.teardown_request
+    def reset_request_id(exc):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            request_id_var.reset(token)
@@ -0,0 +1,57 @@
+"""
+ユーザーの認証 - ログイン時に発行する署名付きトークンで本人のリクエストか確認する
+
+/api/auth/login の成功時にユーザーIDを署名したトークン（token）を返し、本人の情報を返すAPI
+（/api/me/...）では X-User-Token ヘッダーのトークンからユーザーIDを取得します。
+クエリパラメータの user_id は信用しません（他人のIDを指定すると障害の種類などが読めてしまうため）。
+
+署名の鍵は SECRET_KEY です。未設定の場合は起動ごとにランダムな鍵を使うため、
+再起動後や複数台で起動している場合は、ログインし直すまでトークンが無効になります。
+"""
+
+import secrets
+from functools import wraps
+from typing import Optional
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from settings import get_settings
+
+USER_TOKEN_HEADER = "X-User-Token"
+
+# トークンの有効期間（秒）
+USER_TOKEN_MAX_AGE = 7 * 24 * 60 * 60
+
+# Gunicornではfork前のマスタープロセスで読み込むため、ランダムな鍵も全ワーカーで共通になる
+_serializer = URLSafeTimedSerializer(get_settings().secret_key or secrets.token_hex(32), salt="barrier_navi.user")
+
+
+def issue_user_token(user_id: int) -> str:
+    """ユーザーIDを署名したトークン"""
+    return _serializer.dumps(int(user_id))
+
+
+def request_user_id() -> Optional[int]:
+    """現在のリクエストのトークンのユーザーID（トークンがない・不正・期限切れの場合はNone）"""
+    token = request.headers.get(USER_TOKEN_HEADER)
+    if not token:
+        return None
+    try:
+        user_id = _serializer.loads(token, max_age=USER_TOKEN_MAX_AGE)
+    except BadSignature:
+        return None
+    return user_id if isinstance(user_id, int) else None
+
+
+def require_user(view):
+    """ログイン済みのユーザーのトークンを持つリクエストのみビュー関数を実行するデコレータ（g.user_id に設定）"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = request_user_id()
+        if user_id is None:
+            return jsonify({"success": False, "error": "ログインが必要です"}), 401
+        g.user_id = user_id
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,214 @@
+"""
+スコア計算の回帰チェック - コンパイル済みの評価器の結果を重み付きスコア導入前の実装と比較する
+
+weight・curve を指定しない定義（api_server の *_METRIC_DEFINITIONS）では、compute_score・evaluate_metric の結果は
+重み付きスコア（scoring.py）の導入前と完全に同じである必要があります（APIのレスポンス・ETag・コンパイル済みの
+データセットが変わらないこと）。導入前の実装をこのファイルに固定し、同梱の tokyo_stations.csv と合成データの
+全駅・全モードで、詳細の内訳を含めてJSONの文字列（キーの順序を含む）が一致することを確認します。
+
+あわせて weight・curve を指定した定義で、詳細の内訳の達成項目数がスコアの met_items と一致することを確認します。
+
+一致しない項目があれば終了コード1で終了します。
+
+使い方（プロジェクトルートで実行）:
+    python benchmarks/check_scoring.py                       # tokyo・10k で確認
+    python benchmarks/check_scoring.py --datasets tokyo,100k # データセットを指定
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import api_server  # noqa: E402
+from datasets import DATASETS, station_rows  # noqa: E402
+
+# 値が欠けている・数値に変換できない駅データ（データセットにない場合の確認用）
+EDGE_ROWS = [
+    {"id": -1},
+    {"id": -2, "num_platforms": "x", "num_step_free_platforms": 3, "step_response_status": " 1 ",
+     "num_slopes": None, "num_other_lifts": "abc", "num_elevators": 0, "num_compliant_elevators": 2},
+    {"id": -3, "num_elevators": "2", "num_compliant_elevators": "1", "has_accessible_gate": 1,
+     "num_escalators": -1, "num_compliant_escalators": 1, "num_slopes": "3.5"},
+]
+
+
+def reference_evaluate_metric(value: Any, definition: Dict[str, Any], row: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """重み付きスコア導入前の evaluate_metric"""
+    metric_type = definition.get("type", "flag")
+    required = definition.get("required", 1) or 1
+    result: Dict[str, Any] = {"raw_value": value, "required": required}
+
+    if metric_type == "flag":
+        met = str(value).strip() == "1"
+        ratio = 1.0 if met else 0.0
+        result.update({"processed_value": "○" if met else "×", "ratio": ratio, "met": met})
+    elif metric_type == "ratio":
+        numerator_key = definition.get("numerator")
+        denominator_key = definition.get("denominator")
+        if row and numerator_key and denominator_key:
+            try:
+                numerator = float(row.get(numerator_key, 0) or 0)
+                denominator = float(row.get(denominator_key, 0) or 0)
+            except (TypeError, ValueError):
+                numerator = 0.0
+                denominator = 0.0
+
+            if denominator > 0:
+                calculated_ratio = numerator / denominator
+                percentage = calculated_ratio * 100
+                met = calculated_ratio >= required
+                result.update({
+                    "processed_value": f"{int(numerator)}/{int(denominator)} ({percentage:.1f}%)",
+                    "numerator": int(numerator),
+                    "denominator": int(denominator),
+                    "percentage": round(percentage, 1),
+                    "ratio": calculated_ratio,
+                    "met": met
+                })
+            else:
+                result.update({
+                    "processed_value": "0/0 (0.0%)",
+                    "numerator": 0,
+                    "denominator": 0,
+                    "percentage": 0.0,
+                    "ratio": 0.0,
+                    "met": False
+                })
+        else:
+            result.update({
+                "processed_value": "-",
+                "numerator": 0,
+                "denominator": 0,
+                "percentage": 0.0,
+                "ratio": 0.0,
+                "met": False
+            })
+    else:
+        try:
+            numeric_value = float(value) if value is not None else 0.0
+        except (TypeError, ValueError):
+            numeric_value = 0.0
+        ratio = min(numeric_value / required, 1.0) if required else 0.0
+        met = numeric_value >= required
+        result.update({"processed_value": numeric_value, "ratio": ratio, "met": met})
+
+    return result
+
+
+def reference_compute_score(row: Dict[str, Any], definitions: Dict[str, Any], include_details: bool = False) -> Dict[str, Any]:
+    """重み付きスコア導入前の compute_score"""
+    met_items = 0
+    details: List[Dict[str, Any]] = []
+
+    for field, definition in definitions.items():
+        metric_result = reference_evaluate_metric(row.get(field), definition, row=row)
+        if metric_result["met"]:
+            met_items += 1
+
+        if include_details:
+            detail_item = {
+                "key": field,
+                "label": definition["label"],
+                "value": metric_result["processed_value"],
+                "raw_value": metric_result["raw_value"],
+                "ratio": round(metric_result["ratio"], 2),
+                "met": metric_result["met"],
+                "type": definition["type"],
+                "required": definition["required"]
+            }
+            if definition.get("type") == "ratio":
+                detail_item["numerator"] = metric_result.get("numerator", 0)
+                detail_item["denominator"] = metric_result.get("denominator", 0)
+                detail_item["percentage"] = metric_result.get("percentage", 0.0)
+            details.append(detail_item)
+
+    total_items = len(definitions)
+    percentage = (met_items / total_items) * 100 if total_items > 0 else 0
+
+    return {
+        "met_items": met_items,
+        "total_items": total_items,
+        "percentage": round(percentage, 1),
+        "details": details if include_details else None
+    }
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def weighted_definitions(definitions: Dict[str, Any]) -> Dict[str, Any]:
+    """全項目に weight・curve を指定した定義（linear と thresholds を交互に使う）"""
+    weighted = {}
+    for index, (key, definition) in enumerate(definitions.items()):
+        if index % 2:
+            weighted[key] = {**definition, "weight": index % 3 + 1, "curve": "linear"}
+        else:
+            weighted[key] = {**definition, "weight": 2, "curve": "thresholds", "thresholds": [[0.5, 0.5], [1, 1]]}
+    return weighted
+
+
+def check(rows: List[Dict[str, Any]]) -> List[str]:
+    """一致しない項目の一覧"""
+    mismatches = []
+    for mode in ("body", "hearing", "vision"):
+        definitions = api_server.get_definitions(mode)
+        weighted = weighted_definitions(definitions)
+        for row in rows:
+            for include_details in (False, True):
+                expected = dumps(reference_compute_score(row, definitions, include_details))
+                actual = dumps(api_server.compute_score(row, definitions, include_details))
+                if actual != expected:
+                    mismatches.append(f"compute_score {mode} id={row.get('id')} details={include_details}: "
+                                      f"{expected} != {actual}")
+
+            for field, definition in definitions.items():
+                for metric_row in (row, None):
+                    expected = dumps(reference_evaluate_metric(row.get(field), definition, row=metric_row))
+                    actual = dumps(api_server.evaluate_metric(row.get(field), definition, row=metric_row))
+                    if actual != expected:
+                        mismatches.append(f"evaluate_metric {mode} {field} id={row.get('id')}: {expected} != {actual}")
+
+            score = api_server.compute_score(row, weighted, include_details=True)
+            met_details = sum(1 for detail in score["details"] if detail["met"])
+            if met_details != score["met_items"]:
+                mismatches.append(f"weighted {mode} id={row.get('id')}: details {met_details} != met_items {score['met_items']}")
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="スコア計算を重み付きスコア導入前の実装と比較")
+    parser.add_argument("--datasets", default="tokyo,10k", help="データセット（カンマ区切り: tokyo,10k,100k）")
+    args = parser.parse_args()
+
+    datasets = [name.strip() for name in args.datasets.split(",") if name.strip()]
+    unknown = [name for name in datasets if name not in DATASETS]
+    if unknown:
+        parser.error(f"不明なデータセット: {', '.join(unknown)}")
+
+    logging.disable(logging.CRITICAL)
+    mismatches = check(EDGE_ROWS)
+    for name in datasets:
+        rows = station_rows(name)
+        found = check(rows)
+        print(f"{name}: {len(rows)}件 {'OK' if not found else f'NG {len(found)}件'}")
+        mismatches.extend(found)
+
+    if mismatches:
+        print("NG: 重み付きスコア導入前の実装と一致しない結果があります", file=sys.stderr)
+        for line in mismatches[:20]:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
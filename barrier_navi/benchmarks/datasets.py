@@ -0,0 +1,66 @@
+"""
+ベンチマーク用のデータセット - 同梱のCSV（tokyo_stations.csv）と、それをもとにした合成データ
+
+合成データは synthetic_stations.py で作成した全国規模のデータです（設備の値の分布は実データと同じ、
+都道府県・鉄道事業者・路線は全国に分散）。seedが同じであれば同じデータになります。
+"""
+
+import csv
+import os
+import sys
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_DIR = os.path.join(BASE_DIR, "database")
+TOKYO_CSV = os.path.join(DATABASE_DIR, "tokyo_stations.csv")
+
+sys.path.insert(0, DATABASE_DIR)
+
+from import_csv_data import DB_COLUMNS, POSSIBLE_MAPPINGS, convert_row  # noqa: E402
+
+# データセット名 -> 駅数（tokyoは同梱のCSVそのもの、10kは全国の駅数とほぼ同じ規模）
+DATASETS = {"tokyo": None, "10k": 10_000, "100k": 100_000}
+
+
+def column_mapping(csv_columns: List[str]) -> Dict[str, str]:
+    """CSVのヘッダーからインポート時と同じカラムの対応を作成"""
+    mapping = {}
+    for db_column, possible_names in POSSIBLE_MAPPINGS.items():
+        for csv_column in csv_columns:
+            if csv_column.strip() in possible_names:
+                mapping[db_column] = csv_column
+                break
+    return mapping
+
+
+@lru_cache(maxsize=None)
+def load_csv(path: str = TOKYO_CSV) -> Tuple[List[str], List[Dict[str, str]]]:
+    """CSV（Shift_JIS）を読み込み、(ヘッダー, DictReaderの行のリスト) を返す"""
+    with open(path, encoding="cp932", newline="") as f:
+        reader = csv.DictReader(f)
+        return list(reader.fieldnames), list(reader)
+
+
+def csv_rows(name: str, seed: int = 0) -> Tuple[Dict[str, str], List[Dict[str, str]]]:
+    """
+    インポート前のCSVの行（文字列の辞書）を返す
+
+    Returns:
+        (カラムの対応, 行のリスト)
+    """
+    header, rows = load_csv()
+    mapping = column_mapping(header)
+    size = DATASETS[name]
+    if size is None:
+        return mapping, rows
+
+    from synthetic_stations import generate_rows
+    return mapping, list(generate_rows(size, seed))
+
+
+@lru_cache(maxsize=None)
+def station_rows(name: str, seed: int = 0) -> List[Dict[str, Any]]:
+    """stationsテーブルの行（DBから取得した場合と同じ型の辞書）を返す"""
+    mapping, rows = csv_rows(name, seed)
+    return [dict(zip(DB_COLUMNS, convert_row(row, mapping))) for row in rows]
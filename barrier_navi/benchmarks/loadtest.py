@@ -0,0 +1,441 @@
+"""
+負荷試験 - アプリケーション全体（Gunicorn + api_server）のスループットとレイテンシを計測する
+
+一時的なSQLiteのファイルを作成してデータを登録し、SQLiteの接続先（DB_BACKEND=sqlite）と本番と同じ設定
+（config/gunicorn.conf.py）でGunicornを起動して、画面の操作に近い割合のリクエストを送ります。
+
+リクエストの種類と割合（--mix で変更可能）:
+    list             一覧（モード・都道府県・路線・絞り込み・並び順をランダムに選択、画面と同じく limit=10000）
+    detail           詳細（ランダムな駅）
+    lines            路線一覧
+    medians          中央値（ランダムなモード）
+    login            ログイン（bcryptの検証を含む）
+    profile_get      プロフィールの取得
+    profile_update   プロフィールの更新
+
+--concurrency 個のクライアント（プロセス）がそれぞれKeep-Aliveの接続で、応答を受け取り次第次のリクエストを送ります。
+最初の --warmup 秒の結果は集計しません。結果はリクエストの種類ごとの件数・エラー数・RPS・
+p50/p95/p99（ミリ秒）です。
+
+使い方（プロジェクトルートで実行）:
+    python benchmarks/loadtest.py                                   # tokyo（130件）で30秒
+    python benchmarks/loadtest.py --dataset 10k --duration 60 --concurrency 16 --json > result.json
+    python benchmarks/loadtest.py --url http://localhost:5000 --mix list=5,detail=3,lines=1,medians=1
+                                                                    # 起動済みのサーバー（DBはそのまま）に送る
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUNICORN_CONF = os.path.join(BASE_DIR, "config", "gunicorn.conf.py")
+
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datasets import DATASETS, station_rows  # noqa: E402
+
+DEFAULT_MIX = {
+    "list": 40,
+    "detail": 25,
+    "lines": 5,
+    "medians": 8,
+    "login": 4,
+    "profile_get": 15,
+    "profile_update": 3,
+}
+
+MODES = ("body", "hearing", "vision")
+SORT_ORDERS = ("none", "score-desc", "score-asc")
+DISABILITY_TYPES = ("身体", "聴覚", "視覚")
+PREFERRED_FEATURES = (
+    "エレベーター", "エスカレーター", "障害者対応型改札口", "障害者対応型便所",
+    "案内設備", "転落防止設備", "段差解消", "車いす対応プラットフォーム",
+)
+
+# 負荷試験用のユーザー（ユーザー名は loadtest0001 のような連番）
+USER_PASSWORD = "loadtest-password"
+
+# サーバーの準備（/readyz が200を返す）を待つ最大時間（秒）
+READY_TIMEOUT = 120.0
+
+
+def seed_database(path: str, dataset: str, users: int, seed: int) -> Dict[str, Any]:
+    """
+    SQLiteのファイルに駅データと負荷試験用のユーザーを登録（マイグレーションも適用する）
+
+    Returns:
+        リクエストの作成に使う値（駅ID・都道府県・路線名・ユーザーID）
+    """
+    import sqlite3
+
+    import bcrypt
+    from api_server import split_line_names
+    from database_connection import SQLiteConnection
+    from import_csv_data import DB_COLUMNS
+    from import_csv_sqlite import create_schema, replace_stations
+    from migrate import migrate
+
+    rng = random.Random(seed)
+    stations = station_rows(dataset, seed)
+    station_ids = [row["id"] for row in stations]
+
+    # bcryptのハッシュ化は遅いため全員同じパスワード（ログイン時の検証の負荷は変わらない）
+    password_hash = bcrypt.hashpw(USER_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    user_rows = [
+        {"id": i, "username": f"loadtest{i:04d}", "email": f"loadtest{i:04d}@example.com", "password_hash": password_hash}
+        for i in range(1, users + 1)
+    ]
+    preference_rows = [
+        {
+            "user_id": i,
+            "disability_type": json.dumps([rng.choice(DISABILITY_TYPES)], ensure_ascii=False),
+            "favorite_stations": json.dumps(rng.sample(station_ids, min(5, len(station_ids)))),
+            "preferred_features": json.dumps(rng.sample(PREFERRED_FEATURES, rng.randint(0, 3)), ensure_ascii=False),
+        }
+        for i in range(1, users + 1)
+    ]
+    connection = sqlite3.connect(path)
+    try:
+        # 読み込みと書き込み（ログイン日時・プロフィールの更新）を並行して行うためWALモードにする
+        connection.execute("PRAGMA journal_mode=WAL")
+        create_schema(connection)
+        replace_stations(connection, (tuple(row[column] for column in DB_COLUMNS) for row in stations))
+        for table, rows in (("users", user_rows), ("users_preferences", preference_rows)):
+            columns = list(rows[0]) if rows else []
+            connection.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row.values()) for row in rows],
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+    # 本番と同じインデックスを作成
+    db = SQLiteConnection(path)
+    try:
+        migrate(db)
+    finally:
+        db.close()
+
+    return {
+        "station_ids": station_ids,
+        "prefectures": sorted({row["prefecture"] for row in stations if row["prefecture"]}),
+        "lines": split_line_names(row["line_name"] for row in stations),
+        "user_ids": [row["id"] for row in user_rows],
+    }
+
+
+def server_catalog(url: str) -> Dict[str, Any]:
+    """起動済みのサーバーからリクエストの作成に使う値を取得（--url 指定時、ユーザーは存在しない前提）"""
+    host, port = urlsplit(url).hostname, urlsplit(url).port or 80
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+
+    def get(path: str) -> Any:
+        connection.request("GET", path)
+        return json.loads(connection.getresponse().read())["data"]
+
+    stations = get("/api/stations?limit=100000&fields=id,prefecture")
+    return {
+        "station_ids": [row["id"] for row in stations],
+        "prefectures": sorted({row["prefecture"] for row in stations if row["prefecture"]}),
+        "lines": get("/api/lines"),
+        "user_ids": [],
+    }
+
+
+def filter_keys() -> Dict[str, List[str]]:
+    """モードごとの絞り込みの項目（一覧APIの filters に指定できる値）"""
+    from api_server import get_definitions
+    return {mode: list(get_definitions(mode)) for mode in MODES}
+
+
+class RequestMix:
+    """リクエストの種類を割合に応じて選び、画面からのリクエストに近いパラメータを作成するクラス"""
+
+    def __init__(self, mix: Dict[str, int], catalog: Dict[str, Any], filters: Dict[str, List[str]], seed: int):
+        self.routes = [route for route, weight in mix.items() if weight > 0]
+        self.weights = [mix[route] for route in self.routes]
+        self.catalog = catalog
+        self.filters = filters
+        self.rng = random.Random(seed)
+
+    def next(self) -> Tuple[str, str, str, Optional[bytes]]:
+        """次のリクエスト (種類, メソッド, パス, 本文)"""
+        route = self.rng.choices(self.routes, self.weights)[0]
+        method, path, body = getattr(self, f"_{route}")()
+        return route, method, path, json.dumps(body).encode("utf-8") if body is not None else None
+
+    def _list(self):
+        rng = self.rng
+        mode = rng.choice(MODES)
+        params = {"limit": 10000, "offset": 0, "sort": rng.choice(SORT_ORDERS)}
+        if rng.random() < 0.3 and self.catalog["prefectures"]:
+            params["prefecture"] = rng.choice(self.catalog["prefectures"])
+        if rng.random() < 0.15 and self.catalog["lines"]:
+            params["line_name"] = rng.choice(self.catalog["lines"])
+        if rng.random() < 0.5:
+            params["filters"] = json.dumps(rng.sample(self.filters[mode], rng.randint(1, 3)))
+        return "GET", f"/api/{mode}/stations?{urlencode(params)}", None
+
+    def _detail(self):
+        mode = self.rng.choice(MODES)
+        return "GET", f"/api/{mode}/stations/{self.rng.choice(self.catalog['station_ids'])}", None
+
+    def _lines(self):
+        return "GET", "/api/lines", None
+
+    def _medians(self):
+        return "GET", f"/api/stations/medians?mode={self.rng.choice(MODES)}", None
+
+    def _login(self):
+        user_id = self.rng.choice(self.catalog["user_ids"])
+        return "POST", "/api/auth/login", {"username": f"loadtest{user_id:04d}", "password": USER_PASSWORD}
+
+    def _profile_get(self):
+        return "GET", f"/api/auth/profile?user_id={self.rng.choice(self.catalog['user_ids'])}", None
+
+    def _profile_update(self):
+        rng = self.rng
+        return "PUT", "/api/auth/profile", {
+            "user_id": rng.choice(self.catalog["user_ids"]),
+            "disability_type": [rng.choice(DISABILITY_TYPES)],
+            "favorite_stations": rng.sample(self.catalog["station_ids"], min(5, len(self.catalog["station_ids"]))),
+            "preferred_features": rng.sample(PREFERRED_FEATURES, rng.randint(0, 3)),
+        }
+
+
+def run_client(options: Dict[str, Any]) -> List[Tuple[str, int, float]]:
+    """
+    1つのクライアント（Keep-Aliveの接続）でリクエストを送り続ける（multiprocessingで実行）
+
+    Returns:
+        計測期間中のリクエストの [(種類, ステータスコード（接続エラーは0）, 秒)]
+    """
+    mix = RequestMix(options["mix"], options["catalog"], options["filters"], options["seed"])
+    host, port = options["host"], options["port"]
+    measure_from, deadline = options["measure_from"], options["deadline"]
+    headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip, br"}
+
+    results = []
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    while True:
+        route, method, path, body = mix.next()
+        start = time.perf_counter()
+        if start >= deadline:
+            break
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=60)
+            status = 0
+        if start >= measure_from:
+            results.append((route, status, time.perf_counter() - start))
+    connection.close()
+    return results
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """ソート済みの値のpパーセンタイル（nearest-rank法）"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(results: List[Tuple[str, int, float]], seconds: float) -> Dict[str, Dict[str, Any]]:
+    """リクエストの種類ごとの件数・エラー数・RPS・レイテンシ（ミリ秒）"""
+    by_route: Dict[str, List[Tuple[int, float]]] = {}
+    for route, status, elapsed in results:
+        by_route.setdefault(route, []).append((status, elapsed))
+    by_route["total"] = [(status, elapsed) for _, status, elapsed in results]
+
+    summary = {}
+    for route, values in by_route.items():
+        latencies = sorted(elapsed for _, elapsed in values)
+        summary[route] = {
+            "count": len(values),
+            "errors": sum(1 for status, _ in values if status == 0 or status >= 400),
+            "rps": round(len(values) / seconds, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        }
+    return summary
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database: str, port: int, workers: int, threads: int, log_path: str) -> subprocess.Popen:
+    """SQLiteのファイルに接続するapi_serverをGunicornで起動"""
+    env = dict(
+        os.environ,
+        DB_BACKEND="sqlite",
+        SQLITE_PATH=database,
+        FLASK_HOST="127.0.0.1",
+        FLASK_PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+    )
+    with open(log_path, "wb") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", GUNICORN_CONF, "api_server:app"],
+            cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+
+def wait_until_ready(host: str, port: int, server: Optional[subprocess.Popen], timeout: float = READY_TIMEOUT):
+    """/readyz が200を返すまで待つ（サーバーが終了した場合・時間切れの場合は例外）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"サーバーが終了しました（終了コード {server.returncode}）")
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=5)
+            connection.request("GET", "/readyz")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{timeout:.0f}秒以内にサーバーの準備ができませんでした")
+
+
+def stop_server(server: subprocess.Popen):
+    """Gunicornを停止（SIGTERMで処理中のリクエストを待ってから終了する）"""
+    if server.poll() is None:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """"list=40,detail=25" の形式の割合"""
+    mix = {route: 0 for route in DEFAULT_MIX}
+    for item in value.split(","):
+        route, _, weight = item.partition("=")
+        route = route.strip()
+        if route not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"不明なリクエストの種類: {route}")
+        mix[route] = int(weight or 1)
+    return mix
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """サーバーの起動・データの登録から負荷をかけて集計するまで"""
+    mix = args.mix
+    server = None
+    with tempfile.TemporaryDirectory(prefix="barrier_navi_loadtest_") as tmpdir:
+        log_path = os.path.join(tmpdir, "server.log")
+        if args.url:
+            split = urlsplit(args.url)
+            host, port = split.hostname, split.port or 80
+            catalog = server_catalog(args.url)
+            # 起動済みのサーバーには負荷試験用のユーザーがいないため、ユーザーを使うリクエストは送らない
+            mix = {route: (0 if route.startswith(("login", "profile")) else weight) for route, weight in mix.items()}
+        else:
+            host, port = "127.0.0.1", free_port()
+            database = os.path.join(tmpdir, "stations.sqlite3")
+            catalog = seed_database(database, args.dataset, args.users, args.seed)
+            server = start_server(database, port, args.workers, args.threads, log_path)
+
+        try:
+            wait_until_ready(host, port, server)
+            started = time.time()
+            measure_from = time.perf_counter() + args.warmup
+            deadline = measure_from + args.duration
+            # perf_counterはプロセス間で共通の時計（CLOCK_MONOTONIC）のため、開始・終了時刻をそのまま渡せる
+            filters = filter_keys()
+            clients = [
+                {
+                    "mix": mix, "catalog": catalog, "filters": filters, "seed": args.seed + i,
+                    "host": host, "port": port, "measure_from": measure_from, "deadline": deadline,
+                }
+                for i in range(args.concurrency)
+            ]
+            with multiprocessing.get_context("fork").Pool(args.concurrency) as pool:
+                results = [item for client in pool.map(run_client, clients) for item in client]
+        except Exception:
+            if server is not None and os.path.exists(log_path):
+                with open(log_path, encoding="utf-8", errors="replace") as f:
+                    sys.stderr.write(f.read()[-4000:])
+            raise
+        finally:
+            if server is not None:
+                stop_server(server)
+
+    return {
+        "python": sys.version.split()[0],
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "target": args.url or "gunicorn+sqlite",
+        "dataset": None if args.url else args.dataset,
+        "stations": len(catalog["station_ids"]),
+        "workers": None if args.url else args.workers,
+        "threads": None if args.url else args.threads,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "mix": {route: weight for route, weight in mix.items() if weight > 0},
+        "routes": summarize(results, args.duration),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="アプリケーション全体の負荷試験（RPS・p50/p95/p99）")
+    parser.add_argument("--dataset", default="tokyo", choices=list(DATASETS), help="駅データ（datasets.py）")
+    parser.add_argument("--users", type=int, default=200, help="登録するユーザー数")
+    parser.add_argument("--duration", type=float, default=30.0, help="計測する時間（秒）")
+    parser.add_argument("--warmup", type=float, default=3.0, help="集計しない最初の時間（秒）")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時に接続するクライアント数")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count() * 2 + 1, help="Gunicornのワーカー数")
+    parser.add_argument("--threads", type=int, default=4, help="Gunicornのワーカーごとのスレッド数")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="リクエストの種類と割合（例: list=40,detail=25,lines=5）")
+    parser.add_argument("--seed", type=int, default=0, help="データとリクエストの乱数のシード")
+    parser.add_argument("--url", help="起動済みのサーバーに送る（サーバーの起動・データの登録を行わない）")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    result = run(args)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"{result['target']} / {result['stations']}駅 / 同時接続 {result['concurrency']} / {result['duration_seconds']:.0f}秒")
+        print(f"  {'種類':<16} {'件数':>8} {'エラー':>6} {'RPS':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+        for route, value in result["routes"].items():
+            print(f"  {route:<16} {value['count']:>8} {value['errors']:>6} {value['rps']:>9.1f} "
+                  f"{value['p50_ms']:>9.2f} {value['p95_ms']:>9.2f} {value['p99_ms']:>9.2f}")
+
+    return 1 if result["routes"].get("total", {}).get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
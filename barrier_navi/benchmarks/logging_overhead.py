@@ -0,0 +1,82 @@
+"""
+ログ出力のオーバーヘッドのベンチマーク - print() と構造化ログ（キュー経由）を比較する
+
+1リクエストあたり2行（DB接続・切断）を出力する場合の、リクエストを処理するスレッド側の
+所要時間を計測します。出力先の標準出力は通常どおりパイプやファイルにリダイレクトしてください
+（計測結果は標準エラー出力に表示します）。
+
+使い方（プロジェクトルートで実行）:
+    python benchmarks/logging_overhead.py > /dev/null
+    python benchmarks/logging_overhead.py --threads 8 --requests 20000 > /tmp/out.log
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from structured_logging import configure_logging, request_id_var  # noqa: E402
+
+logger = logging.getLogger("database_connection")
+
+
+def with_print():
+    print("MySQLデータベース 'station' に接続しました。")
+    print("データベース接続を閉じました。")
+
+
+def with_logging():
+    logger.info("MySQLデータベース '%s' に接続しました。", "station")
+    logger.info("データベース接続を閉じました。")
+
+
+def with_logging_suppressed():
+    logger.debug("MySQLデータベース '%s' に接続しました。", "station")
+    logger.debug("データベース接続を閉じました。")
+
+
+def measure(fn: Callable[[], None], threads: int, requests: int) -> float:
+    """threads個のスレッドで合計requests回fnを呼び出し、1回あたりの時間（マイクロ秒）を返す"""
+    per_thread = requests // threads
+
+    def worker():
+        request_id_var.set("benchmark")
+        for _ in range(per_thread):
+            fn()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    sys.stdout.flush()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="print()と構造化ログのオーバーヘッドを比較")
+    parser.add_argument("--threads", type=int, default=4, help="リクエストを処理するスレッド数")
+    parser.add_argument("--requests", type=int, default=20000, help="リクエスト数")
+    args = parser.parse_args()
+
+    configure_logging()
+    logging.getLogger("database_connection").setLevel(logging.INFO)
+
+    results = [
+        ("print()", measure(with_print, args.threads, args.requests)),
+        ("構造化ログ（INFO、キュー経由）", measure(with_logging, args.threads, args.requests)),
+        ("構造化ログ（DEBUG、出力なし）", measure(with_logging_suppressed, args.threads, args.requests)),
+    ]
+    print(f"{args.threads}スレッド × {args.requests}リクエスト（1リクエストあたり2行）", file=sys.stderr)
+    for name, us in results:
+        print(f"  {name:<32} {us:8.2f} µs/リクエスト", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+メトリクス記録のオーバーヘッドのベンチマーク - 1リクエストあたりの計測・記録にかかる時間を計測する
+
+一覧APIと同じく5つの処理区間（db_connect, db_query, scoring, sort, serialize）を持つリクエストを想定し、
+計測の開始・区間の計測・ヒストグラムへの記録にかかる時間を計測します（目標は50µs未満）。
+
+使い方（プロジェクトルートで実行）:
+    python benchmarks/metrics_overhead.py
+    python benchmarks/metrics_overhead.py --requests 100000 --max-us 50   # 上限を超えると終了コード1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from metrics import begin_request, end_request, span  # noqa: E402
+
+SPANS = ("db_connect", "db_query", "scoring", "sort", "serialize")
+
+
+def measure(requests: int) -> float:
+    """requests回分の計測・記録を行い、1リクエストあたりの時間（マイクロ秒）を返す"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        started = begin_request()
+        for name in SPANS:
+            with span(name):
+                pass
+        end_request(started, "/api/body/stations", "GET", 200)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="メトリクス記録のオーバーヘッドを計測")
+    parser.add_argument("--requests", type=int, default=50000, help="リクエスト数")
+    parser.add_argument("--max-us", type=float, help="1リクエストあたりの上限（マイクロ秒、超えた場合は終了コード1）")
+    args = parser.parse_args()
+
+    measure(1000)  # ラベルの組み合わせを登録しておく
+    us = measure(args.requests)
+    print(f"{len(SPANS)}区間のリクエスト: {us:.2f} µs/リクエスト")
+
+    if args.max_us is not None and us > args.max_us:
+        print(f"NG: 上限（{args.max_us} µs）を超えています", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+マイクロベンチマーク - スコア計算・絞り込み・統計の関数の処理時間を計測し、基準値と比較する
+
+計測対象:
+    evaluate_metric          全駅 × 身体障害向けの全評価項目（compute_score と同じくコンパイル済みの評価項目を渡す）
+    compute_score            全駅 × 3モード
+    build_station_response   全駅（一覧用）
+    build_station_detail     全駅（詳細用、評価項目の内訳つき）
+    calculate_median         全駅のエレベーターの割合の中央値
+    split_line_names         /api/lines の路線名の分割
+    convert_row              インポート時のCSVの行の変換
+
+データセットは同梱の tokyo_stations.csv（130件）と、synthetic_stations.py で作成した全国規模の合成データ（1万件・10万件）です。
+
+計測時間はマシンの性能に左右されるため、項目ごとに同じ純Pythonの処理（較正用）と交互に計測し、
+隣り合った計測の比率の中央値を基準値（benchmarks/baselines/micro.json）と比較します。
+比率が基準値より --tolerance（デフォルト30%）以上大きい項目があれば終了コード1で終了します。
+
+使い方（プロジェクトルートで実行）:
+    python benchmarks/micro.py                       # 計測して基準値と比較
+    python benchmarks/micro.py --datasets tokyo,10k  # データセットを指定
+    python benchmarks/micro.py --update-baseline     # 基準値を更新（意図して性能が変わった場合）
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(BASE_DIR, "benchmarks", "baselines", "micro.json")
+
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import api_server  # noqa: E402
+from datasets import DATASETS, csv_rows, station_rows  # noqa: E402
+from import_csv_data import convert_row  # noqa: E402
+
+# 1回の計測の最小時間（秒）。短い処理は繰り返し回数を増やす
+MIN_MEASURE_SECONDS = 0.2
+
+
+def calibrate() -> Callable[[], Any]:
+    """較正用の処理（辞書の作成・文字列の比較・浮動小数点の計算）"""
+    def run():
+        total = 0.0
+        for i in range(20_000):
+            row = {"value": str(i % 3), "numerator": i % 7, "denominator": i % 5}
+            if str(row["value"]).strip() == "1":
+                total += 1
+            if row["denominator"]:
+                total += row["numerator"] / row["denominator"]
+        return total
+    return run
+
+
+def build_cases(rows: List[Dict[str, Any]], mapping: Dict[str, str],
+                raw_rows: List[Dict[str, str]]) -> Dict[str, Callable[[], Any]]:
+    """データセットに対する計測対象の処理（1回の呼び出しで全駅を処理する関数）"""
+    body_definitions = list(zip(api_server.BODY_METRIC_DEFINITIONS.items(),
+                                api_server.compile_definitions(api_server.BODY_METRIC_DEFINITIONS).metrics))
+    definitions = [api_server.get_definitions(mode) for mode in ("body", "hearing", "vision")]
+    ratios = [
+        row["num_compliant_elevators"] / row["num_elevators"] if row["num_elevators"] else None
+        for row in rows
+    ]
+    line_names = [row["line_name"] for row in rows]
+
+    def evaluate_metric():
+        for row in rows:
+            for (field, definition), metric in body_definitions:
+                api_server.evaluate_metric(row.get(field), definition, row=row, metric=metric)
+
+    def compute_score():
+        for row in rows:
+            for mode_definitions in definitions:
+                api_server.compute_score(row, mode_definitions)
+
+    def build_station_response():
+        for row in rows:
+            api_server.build_station_response(row, mode="body")
+
+    def build_station_detail():
+        for row in rows:
+            api_server.build_station_response(row, mode="body", include_details=True)
+
+    def calculate_median():
+        api_server.calculate_median(ratios)
+
+    def split_line_names():
+        api_server.split_line_names(line_names)
+
+    def convert_rows():
+        for row in raw_rows:
+            convert_row(row, mapping)
+
+    return {
+        "evaluate_metric": evaluate_metric,
+        "compute_score": compute_score,
+        "build_station_response": build_station_response,
+        "build_station_detail": build_station_detail,
+        "calculate_median": calculate_median,
+        "split_line_names": split_line_names,
+        "convert_row": convert_rows,
+    }
+
+
+def repetitions(fn: Callable[[], Any]) -> int:
+    """1回の計測が MIN_MEASURE_SECONDS 以上になる繰り返し回数"""
+    start = time.perf_counter()
+    fn()
+    single = time.perf_counter() - start
+    return max(1, int(MIN_MEASURE_SECONDS / single)) if single > 0 else 1000
+
+
+def timed(fn: Callable[[], Any], number: int) -> float:
+    """fnをnumber回呼んだ1回あたりの時間（秒）"""
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def measure(fn: Callable[[], Any], calibration: Callable[[], Any], repeat: int) -> Tuple[float, float, float]:
+    """
+    fnと較正用の処理を交互にrepeat回計測
+
+    CIのマシンは計測中にも速さが変わるため、較正用の処理は項目ごとに直前に計測し、
+    隣り合った計測の比率の中央値を項目の比率にします。
+
+    Returns:
+        (fnの時間の最小値, 較正用の処理の時間の最小値, 比率の中央値)
+    """
+    number = repetitions(fn)
+    calibration_number = repetitions(calibration)
+
+    timings, calibrations, ratios = [], [], []
+    for _ in range(repeat):
+        calibration_seconds = timed(calibration, calibration_number)
+        seconds = timed(fn, number)
+        timings.append(seconds)
+        calibrations.append(calibration_seconds)
+        ratios.append(seconds / calibration_seconds)
+    return min(timings), min(calibrations), statistics.median(ratios)
+
+
+def run(datasets: List[str], repeat: int) -> Dict[str, Any]:
+    """全データセット・全項目を計測"""
+    calibration = calibrate()
+    calibrations = []
+    results = {}
+    for name in datasets:
+        rows = station_rows(name)
+        mapping, raw_rows = csv_rows(name)
+        for case, fn in build_cases(rows, mapping, raw_rows).items():
+            seconds, calibration_seconds, relative = measure(fn, calibration, repeat)
+            calibrations.append(calibration_seconds)
+            results[f"{case}/{name}"] = {
+                "rows": len(rows),
+                "seconds": round(seconds, 6),
+                "ns_per_row": round(seconds / len(rows) * 1e9, 1),
+                "relative": round(relative, 4),
+            }
+    return {
+        "python": sys.version.split()[0],
+        "calibration_seconds": round(min(calibrations, default=0.0), 6),
+        "results": results,
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """基準値より遅くなった項目の一覧（較正用の処理との比率で比較）"""
+    regressions = []
+    for key, current in result["results"].items():
+        expected = baseline["results"].get(key)
+        if expected is None:
+            continue
+        ratio = current["relative"] / expected["relative"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{key}: 基準値の{ratio:.2f}倍（{expected['relative']} → {current['relative']}）")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="スコア計算・絞り込み・統計の関数のマイクロベンチマーク")
+    parser.add_argument("--datasets", default=",".join(DATASETS), help="データセット（カンマ区切り: tokyo,10k,100k）")
+    parser.add_argument("--repeat", type=int, default=9, help="計測回数（較正用の処理との比率の中央値を使用）")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="基準値からの許容範囲（0.3 = 30%%遅くなるまで許容）")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基準値のファイル")
+    parser.add_argument("--update-baseline", action="store_true", help="計測結果で基準値を更新")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    datasets = [name.strip() for name in args.datasets.split(",") if name.strip()]
+    unknown = [name for name in datasets if name not in DATASETS]
+    if unknown:
+        parser.error(f"不明なデータセット: {', '.join(unknown)}")
+
+    logging.disable(logging.CRITICAL)
+    result = run(datasets, args.repeat)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"Python {result['python']}（較正用の処理: {result['calibration_seconds'] * 1000:.2f} ms）")
+        for key, value in result["results"].items():
+            print(f"  {key:<32} {value['seconds'] * 1000:10.3f} ms  {value['ns_per_row']:10.1f} ns/件  "
+                  f"比率 {value['relative']:.4f}")
+
+    if args.update_baseline:
+        baseline = {"results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update({k: v for k, v in result.items() if k != "results"})
+        baseline["results"].update(result["results"])
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"基準値を更新しました: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"基準値のファイルがありません（--update-baseline で作成）: {args.baseline}", file=sys.stderr)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print("NG: 基準値より遅くなった項目があります", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
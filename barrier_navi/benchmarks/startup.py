@@ -0,0 +1,125 @@
+"""
+起動時間のベンチマーク - api_serverのインポート時間と最初のレスポンスまでの時間を計測する
+
+計測項目:
+    import_ms            `python -X importtime -c "import api_server"` で計測したapi_serverの累積インポート時間
+    first_response_ms    新しいプロセスを起動してから GET /healthz の応答を得るまでの時間
+                         （インタープリタの起動・インポート・アプリケーションの初期化を含む）
+
+それぞれ新しいプロセスで --runs 回計測し、中央値を使います。DBへの接続は不要です。
+
+使い方（プロジェクトルートで実行）:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --json
+    python benchmarks/startup.py --max-import-ms 500 --max-first-response-ms 1500   # CI用（超えた場合は終了コード1）
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(BASE_DIR, "backend")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+FIRST_RESPONSE_CODE = (
+    "import api_server\n"
+    "response = api_server.app.test_client().get('/healthz')\n"
+    "assert response.status_code == 200, response.status_code\n"
+)
+
+
+def run_python(args: List[str]) -> subprocess.CompletedProcess:
+    """backendディレクトリで新しいPythonプロセスを実行"""
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def measure_import() -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    api_serverのインポート時間を計測
+
+    Returns:
+        (api_serverの累積インポート時間（ミリ秒）, [(モジュール名, 自身のインポート時間（ミリ秒）)])
+    """
+    result = run_python(["-X", "importtime", "-c", "import api_server"])
+    total_ms = 0.0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        modules.append((name, int(self_us) / 1000))
+        if name == "api_server":
+            total_ms = int(cumulative_us) / 1000
+    return total_ms, modules
+
+
+def measure_first_response() -> float:
+    """プロセスの起動から GET /healthz の応答までの時間（ミリ秒）"""
+    start = time.perf_counter()
+    run_python(["-c", FIRST_RESPONSE_CODE])
+    return (time.perf_counter() - start) * 1000
+
+
+def run(runs: int) -> Dict[str, object]:
+    """各項目をruns回計測して結果をまとめる"""
+    import_results = [measure_import() for _ in range(runs)]
+    first_response = [measure_first_response() for _ in range(runs)]
+
+    # 自身のインポート時間が長いモジュール（最後の計測結果から）
+    slowest = sorted(import_results[-1][1], key=lambda m: m[1], reverse=True)[:10]
+    return {
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "import_ms": round(statistics.median(r[0] for r in import_results), 1),
+        "first_response_ms": round(statistics.median(first_response), 1),
+        "slowest_modules": [{"module": name, "self_ms": round(ms, 1)} for name, ms in slowest],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="api_serverの起動時間を計測")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（中央値を使用）")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    parser.add_argument("--max-import-ms", type=float, help="インポート時間の上限（超えた場合は終了コード1）")
+    parser.add_argument("--max-first-response-ms", type=float, help="最初のレスポンスまでの時間の上限（超えた場合は終了コード1）")
+    args = parser.parse_args()
+
+    result = run(args.runs)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"Python {result['python']}（{result['runs']}回の中央値）")
+        print(f"  api_serverのインポート:   {result['import_ms']:8.1f} ms")
+        print(f"  最初のレスポンスまで:     {result['first_response_ms']:8.1f} ms")
+        print("  インポートに時間がかかっているモジュール:")
+        for module in result["slowest_modules"]:
+            print(f"    {module['self_ms']:8.1f} ms  {module['module']}")
+
+    failed = False
+    if args.max_import_ms is not None and result["import_ms"] > args.max_import_ms:
+        print(f"NG: インポート時間が上限（{args.max_import_ms} ms）を超えています", file=sys.stderr)
+        failed = True
+    if args.max_first_response_ms is not None and result["first_response_ms"] > args.max_first_response_ms:
+        print(f"NG: 最初のレスポンスまでの時間が上限（{args.max_first_response_ms} ms）を超えています", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+全国規模の合成駅データの作成 - import_csv_data.py で読み込めるCSV（Shift_JIS、日本語ヘッダー）を出力する
+
+同梱の tokyo_stations.csv は東京都のJR東日本の130駅のみのため、全国（約9,000駅）や
+負荷試験（100万駅）の規模でインポート・検索・キャッシュを計測するためのデータを作成します。
+
+- 設備の項目（段差への対応〜転落防止設備の23列のうち数値・フラグの17列）は実データの1駅分をまとめて
+  ランダムに選んで使います（項目間の関係、例えば適合しているエレベーターの数 ≦ エレベーターの数、も実データのまま）
+- 都道府県はおおよその駅数の比率で選び、鉄道事業者・市・路線は都道府県ごとに作成します
+  （東京都の市・路線名は実データのものを使います）
+- 1駅あたりの路線数は実データの分布に従います
+- 駅名は実データの駅名に連番を付けたもの（重複しない）、IDは1からの連番です
+
+同じサイズ・seedであれば同じデータになります。
+
+使い方（プロジェクトルートで実行）:
+    python benchmarks/synthetic_stations.py -o /tmp/stations_national.csv               # 全国規模（9,000駅）
+    python benchmarks/synthetic_stations.py --size 1m --seed 1 -o /tmp/stations_1m.csv  # 100万駅
+    CSV_FILE_PATH=/tmp/stations_national.csv python database/import_csv_data.py         # MySQLにインポート
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+from typing import Dict, Iterator, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from datasets import column_mapping, load_csv  # noqa: E402
+
+# 全国の駅数（おおよそ）
+NATIONAL_SIZE = 9_000
+
+# 都道府県ごとのおおよその駅数（都道府県を選ぶ比率に使う）
+PREFECTURE_WEIGHTS = {
+    "北海道": 460, "青森県": 140, "岩手県": 190, "宮城県": 160, "秋田県": 130, "山形県": 120,
+    "福島県": 190, "茨城県": 150, "栃木県": 120, "群馬県": 160, "埼玉県": 290, "千葉県": 420,
+    "東京都": 760, "神奈川県": 480, "新潟県": 260, "富山県": 180, "石川県": 120, "福井県": 130,
+    "山梨県": 80, "長野県": 330, "岐阜県": 230, "静岡県": 290, "愛知県": 510, "三重県": 280,
+    "滋賀県": 140, "京都府": 290, "大阪府": 520, "兵庫県": 490, "奈良県": 130, "和歌山県": 110,
+    "鳥取県": 70, "島根県": 110, "岡山県": 160, "広島県": 230, "山口県": 130, "徳島県": 70,
+    "香川県": 120, "愛媛県": 140, "高知県": 130, "福岡県": 380, "佐賀県": 70, "長崎県": 170,
+    "熊本県": 160, "大分県": 100, "宮崎県": 70, "鹿児島県": 130, "沖縄県": 20,
+}
+
+# JRの会社ごとの都道府県（沖縄県はJRがない）
+JR_OPERATORS = {
+    "JR北海道": ("北海道",),
+    "JR東日本": ("青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県", "茨城県", "栃木県", "群馬県",
+                "埼玉県", "千葉県", "東京都", "神奈川県", "新潟県", "山梨県", "長野県"),
+    "JR東海": ("岐阜県", "静岡県", "愛知県", "三重県"),
+    "JR西日本": ("富山県", "石川県", "福井県", "滋賀県", "京都府", "大阪府", "兵庫県", "奈良県", "和歌山県",
+                "鳥取県", "島根県", "岡山県", "広島県", "山口県"),
+    "JR四国": ("徳島県", "香川県", "愛媛県", "高知県"),
+    "JR九州": ("福岡県", "佐賀県", "長崎県", "熊本県", "大分県", "宮崎県", "鹿児島県"),
+}
+
+# 1つの路線あたりのおおよその駅数（都道府県ごとの路線数の決定に使う）
+STATIONS_PER_LINE = 15
+
+# 1つの市あたりのおおよその駅数
+STATIONS_PER_CITY = 8
+
+# 駅の設備の項目（実データの1駅分をまとめて使う）以外の項目
+_IDENTITY_COLUMNS = ("id", "railway_operator", "station_name", "line_name", "prefecture", "city")
+
+
+def parse_size(value: str) -> int:
+    """駅数（"9000", "10k", "1m" の形式）"""
+    text = value.strip().lower().replace("_", "")
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def _prefecture_stem(prefecture: str) -> str:
+    """都道府県名から都・府・県を除いた部分（北海道はそのまま）"""
+    return prefecture if prefecture == "北海道" else prefecture[:-1]
+
+
+def _jr_operator(prefecture: str) -> Optional[str]:
+    """都道府県のJRの会社（JRがない場合はNone）"""
+    for operator, prefectures in JR_OPERATORS.items():
+        if prefecture in prefectures:
+            return operator
+    return None
+
+
+class _Prefecture:
+    """都道府県ごとの鉄道事業者・市・路線の候補"""
+
+    def __init__(self, name: str, weight: int, scale: float, rng: random.Random,
+                 tokyo_cities: List[str], real_lines: List[str]):
+        stem = _prefecture_stem(name)
+        expected = max(1.0, weight * scale)
+        jr = _jr_operator(name)
+        self.name = name
+        self.operators = ([jr] if jr else []) + [f"{stem}鉄道", f"{stem}電鉄"]
+        self.operator_weights = ([6] if jr else []) + [3, 1]
+        if name == "東京都":
+            self.cities = tokyo_cities
+            self.lines = real_lines
+        else:
+            self.cities = [f"{stem}市"] + [f"{stem}第{k}市" for k in range(2, int(expected / STATIONS_PER_CITY) + 2)]
+            line_count = max(2, int(expected / STATIONS_PER_LINE))
+            self.lines = [f"{stem}{rng.choice(real_lines)}" for _ in range(line_count)]
+            self.lines = list(dict.fromkeys(self.lines)) or [f"{stem}本"]
+
+
+def generate_rows(size: int, seed: int = 0) -> Iterator[Dict[str, str]]:
+    """
+    合成駅データの行（tokyo_stations.csv と同じヘッダーをキーとする文字列の辞書）を順に返す
+
+    Args:
+        size: 駅数
+        seed: 乱数のシード
+    """
+    header, real_rows = load_csv()
+    mapping = column_mapping(header)
+    rng = random.Random(seed)
+
+    identity = {mapping[column] for column in _IDENTITY_COLUMNS}
+    facility_columns = [column for column in header if column not in identity]
+    facilities = [tuple(row[column] for column in facility_columns) for row in real_rows]
+    station_names = [row[mapping["station_name"]] for row in real_rows]
+    line_counts = [len(row[mapping["line_name"]].split("・")) for row in real_rows]
+    tokyo_cities = [row[mapping["city"]] for row in real_rows]
+    real_lines = sorted({name for row in real_rows for name in row[mapping["line_name"]].split("・")})
+
+    total_weight = sum(PREFECTURE_WEIGHTS.values())
+    scale = size / total_weight
+    prefectures = [_Prefecture(name, weight, scale, rng, tokyo_cities, real_lines)
+                   for name, weight in PREFECTURE_WEIGHTS.items()]
+    chosen = rng.choices(prefectures, weights=list(PREFECTURE_WEIGHTS.values()), k=size)
+
+    id_column, name_column, line_column = mapping["id"], mapping["station_name"], mapping["line_name"]
+    operator_column, prefecture_column, city_column = mapping["railway_operator"], mapping["prefecture"], mapping["city"]
+    for i, prefecture in enumerate(chosen, start=1):
+        row = dict(zip(facility_columns, rng.choice(facilities)))
+        lines = rng.sample(prefecture.lines, min(rng.choice(line_counts), len(prefecture.lines)))
+        row[id_column] = str(i)
+        row[operator_column] = rng.choices(prefecture.operators, prefecture.operator_weights)[0]
+        row[name_column] = f"{rng.choice(station_names)}{i}"
+        row[line_column] = "・".join(lines)
+        row[prefecture_column] = prefecture.name
+        row[city_column] = rng.choice(prefecture.cities)
+        yield {column: row[column] for column in header}
+
+
+def write_csv(path: str, size: int, seed: int = 0) -> int:
+    """
+    合成駅データをCSV（Shift_JIS、tokyo_stations.csv と同じヘッダー）に書き出す
+
+    Returns:
+        書き出した駅数
+    """
+    header, _ = load_csv()
+    count = 0
+    with open(path, "w", encoding="cp932", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=header, lineterminator="\n")
+        writer.writeheader()
+        for row in generate_rows(size, seed):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="全国規模の合成駅データ（Shift_JISのCSV）を作成")
+    parser.add_argument("-o", "--output", required=True, help="出力するCSVファイル")
+    parser.add_argument("--size", type=parse_size, default=NATIONAL_SIZE, help="駅数（例: 9000, 100k, 1m）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    args = parser.parse_args()
+
+    count = write_csv(args.output, args.size, args.seed)
+    print(f"{count}駅を書き出しました: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Gunicorn設定ファイル - 本番環境でFlask APIサーバーを複数ワーカーで起動する
+
+使い方（プロジェクトルートで実行）:
+    gunicorn -c config/gunicorn.conf.py api_server:app
+
+環境変数で主な設定を変更できます（詳細は docs/PRODUCTION_SERVER.md を参照）。
+"""
+
+import gc
+import multiprocessing
+import os
+
+# プロジェクトルートとbackendディレクトリ（api_serverをインポートするため）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+chdir = BASE_DIR
+pythonpath = os.path.join(BASE_DIR, "backend")
+
+# 待ち受けアドレス（Docker環境では0.0.0.0が必要）
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+
+# ワーカー数：未指定の場合はCPUコア数から決定（2 × コア数 + 1）
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count() * 2 + 1)
+
+# DB待ちの間も他のリクエストを処理できるよう、各ワーカーでスレッドを使用する
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# マスタープロセスでアプリケーションを読み込んでからforkする
+# （駅データのスナップショットを全ワーカーでコピーオンライト共有する）
+preload_app = True
+
+# Keep-Alive：ロードバランサーのアイドルタイムアウトより長くする
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+
+# タイムアウトとグレースフルシャットダウン（SIGTERM / SIGHUP時に処理中のリクエストを待つ時間）
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# メモリリーク対策：一定数のリクエストを処理したワーカーを順次入れ替える
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# ログは標準出力・標準エラー出力へ（Docker / CloudWatch で収集）
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    """
+    ワーカーをforkする前にマスタープロセスでウォームアップを行う
+
+    preload_appでapi_serverは読み込み済みのため、ここで読み込んだスナップショット・
+    スコア・結果キャッシュはfork後の全ワーカーから共有されます。gc.freeze()でGCによる
+    ページの書き換え（コピーオンライトの解除）を防ぎます。
+    """
+    from api_server import readiness, settings, warm_up
+    from settings import config_summary
+    server.log.info("%s", config_summary(settings))
+    if warm_up():
+        server.log.info("ウォームアップが完了しました: %s", readiness.status()["checks"])
+    else:
+        # 起動は続行し、各ワーカーで /readyz へのアクセス時に続きから再試行する
+        server.log.warning("ウォームアップが完了していません: %s", readiness.status()["checks"])
+    gc.freeze()
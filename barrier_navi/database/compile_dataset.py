@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+駅データのコンパイル済みのデータセットを作成
+
+stationsテーブルの全駅を読み込み、モードごとのスコアとJSON断片を計算して
+1つのファイル（backend/compiled_dataset.py の形式）に書き出します。
+COMPILED_DATASET にこのファイルを設定すると、api_server はDBから読み込まずにmmapで使います。
+
+駅データの取り込み（import_csv*.py）や評価基準の定義（api_server の *_METRIC_DEFINITIONS）を
+変更した後に作成し直してください。ファイルには作成元のDBの内容の指紋（行数・チェックサム）を記録し、
+api_server は読み込み時に現在のDBと異なる場合はファイルを使わずにDBから読み込みます。書き出しは一時ファイルから置き換えるため、
+稼働中のサーバーは STATION_SNAPSHOT_TTL の経過後に新しいファイルを読み込みます。
+
+使い方（プロジェクトルートで実行）:
+    python database/compile_dataset.py                  # COMPILED_DATASET（未設定の場合は database/stations.dataset）に作成
+    python database/compile_dataset.py -o path/to/file  # 出力先を指定
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
+
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, "database", "stations.dataset")
+
+
+def main() -> int:
+    from settings import get_settings
+
+    parser = argparse.ArgumentParser(description="駅データのコンパイル済みのデータセットを作成")
+    parser.add_argument("-o", "--output", default=get_settings().compiled_dataset_path or DEFAULT_OUTPUT,
+                        help="出力するファイル（デフォルト: COMPILED_DATASET または database/stations.dataset）")
+    args = parser.parse_args()
+
+    import api_server
+    from compiled_dataset import write_compiled_dataset
+    from station_snapshot import StationSnapshot
+
+    started = time.perf_counter()
+    fingerprint = api_server.load_station_fingerprint()
+    snapshot = StationSnapshot(api_server.load_station_rows(), api_server.build_station_response)
+    # 読み込み中にDBが更新された場合は、指紋と内容が一致しないため作成しない
+    if api_server.load_station_fingerprint() != fingerprint:
+        print("駅データの読み込み中にDBが更新されました。もう一度実行してください", file=sys.stderr)
+        return 1
+    header = write_compiled_dataset(args.output, snapshot, api_server.SNAPSHOT_MODES, api_server.SCORING_VERSION,
+                                    metric_evaluator=api_server.ALL_METRICS_EVALUATOR, db_fingerprint=fingerprint)
+    elapsed = time.perf_counter() - started
+
+    size = os.path.getsize(args.output)
+    print(f"作成しました: {args.output}")
+    print(f"  駅数: {header['count']}  バージョン: {header['dataset_version'][:12]}  "
+          f"評価基準: {header['scoring_version']}  サイズ: {size / 1024 / 1024:.1f}MB  ({elapsed:.1f}秒)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
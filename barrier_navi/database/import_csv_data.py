@@ -7,8 +7,118 @@ Docker環境の初期化時に自動実行されます
 import os
 import sys
 import csv
-import mysql.connector
-from mysql.connector import Error
+
+# stationsテーブルのカラム（INSERTの順序）
+DB_COLUMNS = [
+    'id', 'railway_operator', 'station_name', 'line_name', 'prefecture', 'city',
+    'step_response_status', 'num_platforms', 'num_step_free_platforms',
+    'num_elevators', 'num_compliant_elevators', 'num_escalators', 'num_compliant_escalators',
+    'num_other_lifts', 'num_slopes', 'num_compliant_slopes',
+    'has_tactile_paving', 'has_guidance_system', 'has_accessible_restroom',
+    'has_accessible_gate', 'has_accessible_ticket_machine',
+    'num_wheelchair_accessible_platforms', 'has_fall_prevention'
+]
+
+# 数値型のカラム（文字列以外）
+INTEGER_COLUMNS = set(DB_COLUMNS) - {'railway_operator', 'station_name', 'line_name', 'prefecture', 'city'}
+
+# カラム名のマッピング（データベースのカラム名 → CSVのカラム名の候補）
+# 日本語ヘッダーまたは英語ヘッダーに対応
+POSSIBLE_MAPPINGS = {
+    'id': ['ID', 'id', 'Id'],
+    'railway_operator': ['鉄道事業者名', 'railway_operator', 'Railway Operator'],
+    'station_name': ['鉄道駅の名称', 'station_name', 'Station Name'],
+    'line_name': ['路線名', 'line_name', 'Line Name'],
+    'prefecture': ['都道府県', 'prefecture', 'Prefecture'],
+    'city': ['市', 'city', 'City'],
+    'step_response_status': ['段差への対応', 'step_response_status'],
+    'num_platforms': ['プラットホームの数', 'num_platforms'],
+    'num_step_free_platforms': ['段差が解消されているプラットホームの数', 'num_step_free_platforms'],
+    'num_elevators': ['エレベーターの設置基数', 'num_elevators'],
+    'num_compliant_elevators': ['移動等円滑化基準に適合しているエレベーターの設置基数', 'num_compliant_elevators'],
+    'num_escalators': ['エスカレーターの設置基数', 'num_escalators'],
+    'num_compliant_escalators': ['移動等円滑化基準に適合しているエスカレーターの設置基数', 'num_compliant_escalators'],
+    'num_other_lifts': ['その他の昇降機の設置基数', 'num_other_lifts'],
+    'num_slopes': ['傾斜路の設置箇所数', 'num_slopes'],
+    'num_compliant_slopes': ['移動等円滑化基準に適合している傾斜路の設置箇所数', 'num_compliant_slopes'],
+    'has_tactile_paving': ['視覚障害者誘導用ブロックの設置の有無', 'has_tactile_paving'],
+    'has_guidance_system': ['案内設備の設置の有無', 'has_guidance_system'],
+    'has_accessible_restroom': ['障害者対応型便所の設置の有無', 'has_accessible_restroom'],
+    'has_accessible_gate': ['障害者対応型改札口の設置の有無', 'has_accessible_gate'],
+    'has_accessible_ticket_machine': ['障害者対応型券売機の設置の有無', 'has_accessible_ticket_machine'],
+    'num_wheelchair_accessible_platforms': ['車いす使用者の円滑な乗降が可能なプラットホームの数', 'num_wheelchair_accessible_platforms'],
+    'has_fall_prevention': ['転落防止のための設備の設置の有無', 'has_fall_prevention']
+}
+
+
+def convert_row(row, column_mapping):
+    """CSVの1行（DictReaderの辞書）をINSERT用の値のタプルに変換"""
+    values = []
+    for db_column in DB_COLUMNS:
+        csv_column = column_mapping.get(db_column)
+        if csv_column and csv_column in row:
+            value = row[csv_column].strip() if row[csv_column] else None
+            # 数値型のカラムは数値に変換
+            if db_column in INTEGER_COLUMNS:
+                try:
+                    value = int(value) if value and value != '' else None
+                except (ValueError, TypeError):
+                    value = None
+            values.append(value)
+        else:
+            values.append(None)
+    return tuple(values)
+
+
+# CSVファイルの文字エンコーディングの候補（順に試す）
+CSV_ENCODINGS = ['utf-8-sig', 'utf-8', 'shift_jis', 'cp932', 'latin-1']
+
+
+def detect_encoding(csv_file_path):
+    """CSVファイルの文字エンコーディングを判定（候補を順に試し、最後まで読めたものを返す。なければNone）"""
+    for encoding in CSV_ENCODINGS:
+        try:
+            with open(csv_file_path, 'r', encoding=encoding, newline='') as f:
+                while f.read(1024 * 1024):
+                    pass
+            return encoding
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+    return None
+
+
+def read_csv(csv_file_path):
+    """
+    CSVファイルを読み込む（文字エンコーディングを自動検出）
+
+    Returns:
+        (DictReaderの行のリスト, 文字エンコーディング)。読み込めない場合は (None, None)
+    """
+    encoding = detect_encoding(csv_file_path)
+    if encoding is None:
+        return None, None
+    with open(csv_file_path, 'r', encoding=encoding, newline='') as f:
+        return list(csv.DictReader(f)), encoding
+
+
+def build_column_mapping(csv_columns):
+    """CSVのカラム名からカラムの対応（データベースのカラム名 → CSVのカラム名）を作成"""
+    column_mapping = {}
+    for db_column, possible_names in POSSIBLE_MAPPINGS.items():
+        for csv_column in csv_columns:
+            if csv_column in possible_names or csv_column.strip() in possible_names:
+                column_mapping[db_column] = csv_column
+                break
+
+    # マッピングが不足している場合は、順序でマッピングを試行
+    if len(column_mapping) < len(POSSIBLE_MAPPINGS):
+        print("警告: 一部のカラムマッピングが見つかりません。順序でマッピングを試行します。")
+        # CSVのカラム順序に基づいてマッピング
+        for i, db_column in enumerate(DB_COLUMNS):
+            if i < len(csv_columns) and db_column not in column_mapping:
+                column_mapping[db_column] = csv_columns[i]
+    return column_mapping
+
 
 def get_mysql_config():
     """環境変数からMySQL接続情報を取得"""
@@ -22,6 +132,9 @@ def get_mysql_config():
 
 def import_csv_to_mysql(csv_file_path, mysql_config):
     """CSVファイルをMySQLデータベースにインポート"""
+    import mysql.connector
+    from mysql.connector import Error
+
     connection = None
     cursor = None
     
@@ -43,19 +156,9 @@ def import_csv_to_mysql(csv_file_path, mysql_config):
         
         # CSVファイルを読み込む（文字エンコーディングを自動検出）
         print(f"CSVファイルを読み込み中: {csv_file_path}")
-        encodings = ['utf-8-sig', 'utf-8', 'shift_jis', 'cp932', 'latin-1']
-        csv_data = None
-        encoding_used = None
-        
-        for encoding in encodings:
-            try:
-                with open(csv_file_path, 'r', encoding=encoding, newline='') as f:
-                    csv_data = list(csv.DictReader(f))
-                    encoding_used = encoding
-                    print(f"文字エンコーディング: {encoding}")
-                    break
-            except (UnicodeDecodeError, UnicodeError):
-                continue
+        csv_data, encoding_used = read_csv(csv_file_path)
+        if encoding_used:
+            print(f"文字エンコーディング: {encoding_used}")
         
         if csv_data is None:
             print("エラー: CSVファイルの読み込みに失敗しました（文字エンコーディングの問題）")
@@ -88,97 +191,19 @@ def import_csv_to_mysql(csv_file_path, mysql_config):
             return False
         
         first_row = csv_data[0]
-        column_mapping = {}
-        
-        # カラム名のマッピングを試行（日本語ヘッダーまたは英語ヘッダーに対応）
-        possible_mappings = {
-            'id': ['ID', 'id', 'Id'],
-            'railway_operator': ['鉄道事業者名', 'railway_operator', 'Railway Operator'],
-            'station_name': ['鉄道駅の名称', 'station_name', 'Station Name'],
-            'line_name': ['路線名', 'line_name', 'Line Name'],
-            'prefecture': ['都道府県', 'prefecture', 'Prefecture'],
-            'city': ['市', 'city', 'City'],
-            'step_response_status': ['段差への対応', 'step_response_status'],
-            'num_platforms': ['プラットホームの数', 'num_platforms'],
-            'num_step_free_platforms': ['段差が解消されているプラットホームの数', 'num_step_free_platforms'],
-            'num_elevators': ['エレベーターの設置基数', 'num_elevators'],
-            'num_compliant_elevators': ['移動等円滑化基準に適合しているエレベーターの設置基数', 'num_compliant_elevators'],
-            'num_escalators': ['エスカレーターの設置基数', 'num_escalators'],
-            'num_compliant_escalators': ['移動等円滑化基準に適合しているエスカレーターの設置基数', 'num_compliant_escalators'],
-            'num_other_lifts': ['その他の昇降機の設置基数', 'num_other_lifts'],
-            'num_slopes': ['傾斜路の設置箇所数', 'num_slopes'],
-            'num_compliant_slopes': ['移動等円滑化基準に適合している傾斜路の設置箇所数', 'num_compliant_slopes'],
-            'has_tactile_paving': ['視覚障害者誘導用ブロックの設置の有無', 'has_tactile_paving'],
-            'has_guidance_system': ['案内設備の設置の有無', 'has_guidance_system'],
-            'has_accessible_restroom': ['障害者対応型便所の設置の有無', 'has_accessible_restroom'],
-            'has_accessible_gate': ['障害者対応型改札口の設置の有無', 'has_accessible_gate'],
-            'has_accessible_ticket_machine': ['障害者対応型券売機の設置の有無', 'has_accessible_ticket_machine'],
-            'num_wheelchair_accessible_platforms': ['車いす使用者の円滑な乗降が可能なプラットホームの数', 'num_wheelchair_accessible_platforms'],
-            'has_fall_prevention': ['転落防止のための設備の設置の有無', 'has_fall_prevention']
-        }
         
         # CSVのカラム名を確認してマッピングを作成
         csv_columns = list(first_row.keys())
         print(f"CSVカラム数: {len(csv_columns)}")
         print(f"最初のカラム名（サンプル）: {csv_columns[:5]}")
-        
-        for db_column, possible_names in possible_mappings.items():
-            for csv_column in csv_columns:
-                if csv_column in possible_names or csv_column.strip() in possible_names:
-                    column_mapping[db_column] = csv_column
-                    break
-        
-        # マッピングが不足している場合は、順序でマッピングを試行
-        if len(column_mapping) < len(possible_mappings):
-            print("警告: 一部のカラムマッピングが見つかりません。順序でマッピングを試行します。")
-            # CSVのカラム順序に基づいてマッピング
-            db_columns_order = [
-                'id', 'railway_operator', 'station_name', 'line_name', 'prefecture', 'city',
-                'step_response_status', 'num_platforms', 'num_step_free_platforms',
-                'num_elevators', 'num_compliant_elevators', 'num_escalators', 'num_compliant_escalators',
-                'num_other_lifts', 'num_slopes', 'num_compliant_slopes',
-                'has_tactile_paving', 'has_guidance_system', 'has_accessible_restroom',
-                'has_accessible_gate', 'has_accessible_ticket_machine',
-                'num_wheelchair_accessible_platforms', 'has_fall_prevention'
-            ]
-            for i, db_column in enumerate(db_columns_order):
-                if i < len(csv_columns) and db_column not in column_mapping:
-                    column_mapping[db_column] = csv_columns[i]
+        column_mapping = build_column_mapping(csv_columns)
         
         # データを挿入
         inserted_count = 0
         for row in csv_data:
             try:
-                # 値を取得（マッピングに基づく）
-                values = []
-                for db_column in [
-                    'id', 'railway_operator', 'station_name', 'line_name', 'prefecture', 'city',
-                    'step_response_status', 'num_platforms', 'num_step_free_platforms',
-                    'num_elevators', 'num_compliant_elevators', 'num_escalators', 'num_compliant_escalators',
-                    'num_other_lifts', 'num_slopes', 'num_compliant_slopes',
-                    'has_tactile_paving', 'has_guidance_system', 'has_accessible_restroom',
-                    'has_accessible_gate', 'has_accessible_ticket_machine',
-                    'num_wheelchair_accessible_platforms', 'has_fall_prevention'
-                ]:
-                    csv_column = column_mapping.get(db_column)
-                    if csv_column and csv_column in row:
-                        value = row[csv_column].strip() if row[csv_column] else None
-                        # 数値型のカラムは数値に変換
-                        if db_column in ['id', 'step_response_status', 'num_platforms', 'num_step_free_platforms',
-                                       'num_elevators', 'num_compliant_elevators', 'num_escalators', 'num_compliant_escalators',
-                                       'num_other_lifts', 'num_slopes', 'num_compliant_slopes',
-                                       'has_tactile_paving', 'has_guidance_system', 'has_accessible_restroom',
-                                       'has_accessible_gate', 'has_accessible_ticket_machine',
-                                       'num_wheelchair_accessible_platforms', 'has_fall_prevention']:
-                            try:
-                                value = int(value) if value and value != '' else None
-                            except (ValueError, TypeError):
-                                value = None
-                        values.append(value)
-                    else:
-                        values.append(None)
-                
-                cursor.execute(insert_query, tuple(values))
+                values = convert_row(row, column_mapping)
+                cursor.execute(insert_query, values)
                 inserted_count += 1
                 
                 if inserted_count % 100 == 0:
@@ -214,6 +239,9 @@ def import_csv_to_mysql(csv_file_path, mysql_config):
 
 def main():
     """メイン関数"""
+    import mysql.connector
+    from mysql.connector import Error
+
     mysql_config = get_mysql_config()
     
     # CSVファイルのパス（Docker環境では/app/database/にマウントされる）
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+CSVファイルからSQLiteのデータベースを作成するスクリプト
+
+MySQLサーバーを使わずにローカルのファイルから配信する場合（DB_BACKEND=sqlite）に使用します。
+テーブル（schema_sqlite.sql）がなければ作成し、stationsテーブルの内容をCSVの内容で置き換えます
+（users・users_preferencesテーブルのデータはそのまま残ります）。
+CSVは1行ずつ読み込むため、100万駅規模のファイルもメモリに載せずにインポートできます。
+
+使い方（プロジェクトルートで実行）:
+    python database/import_csv_sqlite.py                                           # tokyo_stations.csv → database/stations.sqlite3
+    python database/import_csv_sqlite.py /tmp/stations_national.csv -o /tmp/stations.sqlite3
+    DB_BACKEND=sqlite SQLITE_PATH=/tmp/stations.sqlite3 gunicorn -c config/gunicorn.conf.py api_server:app
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from typing import Iterable, Optional
+
+from import_csv_data import DB_COLUMNS, build_column_mapping, convert_row, detect_encoding
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(DATABASE_DIR, "schema_sqlite.sql")
+DEFAULT_CSV_PATH = os.path.join(DATABASE_DIR, "tokyo_stations.csv")
+DEFAULT_DATABASE_PATH = os.path.join(DATABASE_DIR, "stations.sqlite3")
+
+# 一度にINSERTする行数
+BATCH_SIZE = 10_000
+
+
+def create_schema(connection: sqlite3.Connection):
+    """テーブルを作成（既にある場合は何もしない）"""
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        connection.executescript(f.read())
+
+
+def replace_stations(connection: sqlite3.Connection, rows: Iterable[tuple]) -> int:
+    """
+    stationsテーブルの内容を置き換える（コミットは呼び出し側で行う）
+
+    Args:
+        rows: DB_COLUMNSの順の値のタプル（import_csv_data.convert_row の結果）
+
+    Returns:
+        登録した駅数
+    """
+    insert_query = f"INSERT INTO stations ({', '.join(DB_COLUMNS)}) VALUES ({', '.join('?' * len(DB_COLUMNS))})"
+    connection.execute("DELETE FROM stations")
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            connection.executemany(insert_query, batch)
+            count += len(batch)
+            batch.clear()
+    connection.executemany(insert_query, batch)
+    return count + len(batch)
+
+
+def import_csv_to_sqlite(csv_file_path: str, database_path: str, wal: bool = False) -> Optional[int]:
+    """
+    CSVファイルをSQLiteのデータベースにインポート
+
+    Args:
+        csv_file_path: CSVファイル
+        database_path: SQLiteのファイル（なければ作成）
+        wal: WALモードにする（読み込みと書き込みを並行して行う場合）
+
+    Returns:
+        インポートした駅数（CSVを読み込めない場合はNone）
+    """
+    encoding = detect_encoding(csv_file_path)
+    if encoding is None:
+        print("エラー: CSVファイルの読み込みに失敗しました（文字エンコーディングの問題）")
+        return None
+    print(f"CSVファイルを読み込み中: {csv_file_path}（文字エンコーディング: {encoding}）")
+
+    connection = sqlite3.connect(database_path)
+    try:
+        if wal:
+            connection.execute("PRAGMA journal_mode=WAL")
+        create_schema(connection)
+        with open(csv_file_path, "r", encoding=encoding, newline="") as f:
+            reader = csv.DictReader(f)
+            column_mapping = build_column_mapping(reader.fieldnames or [])
+            count = replace_stations(connection, (convert_row(row, column_mapping) for row in reader))
+        connection.commit()
+        # 大量に削除・追加した後の統計情報を更新（クエリの実行計画に使われる）
+        connection.execute("ANALYZE")
+        return count
+    finally:
+        connection.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CSVファイルからSQLiteのデータベースを作成")
+    parser.add_argument("csv", nargs="?", default=DEFAULT_CSV_PATH, help="CSVファイル（デフォルト: tokyo_stations.csv）")
+    parser.add_argument("-o", "--output", default=os.getenv("SQLITE_PATH") or DEFAULT_DATABASE_PATH,
+                        help="SQLiteのファイル（デフォルト: 環境変数 SQLITE_PATH または database/stations.sqlite3）")
+    parser.add_argument("--wal", action="store_true", help="WALモードにする（読み込みと書き込みを並行して行う場合）")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"エラー: CSVファイルが見つかりません: {args.csv}")
+        return 1
+
+    start = time.perf_counter()
+    count = import_csv_to_sqlite(args.csv, args.output, wal=args.wal)
+    if count is None:
+        return 1
+    print(f"完了: {count}件のデータを {args.output} にインポートしました（{time.perf_counter() - start:.1f}秒）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
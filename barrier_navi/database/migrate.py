@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+データベースのマイグレーション（インデックスの追加など、テーブル作成後のスキーマの変更）
+
+init.sql / schema_sqlite.sql で作成したテーブルに、番号順のマイグレーションを適用します。
+適用済みの番号は schema_migrations テーブルに記録し、未適用のものだけを実行します。
+接続先は api_server と同じ設定（DB_BACKEND・MYSQL_*・SQLITE_PATH）です。
+
+各マイグレーションには、効果を確認するクエリ（PlanCheck、api_server が実行するクエリそのもの）を付けます。
+適用後に EXPLAIN（SQLiteは EXPLAIN QUERY PLAN）で実行計画を取得し、
+全件走査になっていないこと・追加したインデックスを使っていることを確認します。
+
+使い方（プロジェクトルートで実行）:
+    python database/migrate.py            # 未適用のマイグレーションを適用して実行計画を確認
+    python database/migrate.py --status   # 適用状況の一覧
+    python database/migrate.py --check    # 適用済みのマイグレーションの実行計画を確認
+"""
+
+import argparse
+import os
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
+
+MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@dataclass(frozen=True)
+class Index:
+    """追加するインデックス（既に存在する場合は作成しない）"""
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+
+    @property
+    def create_sql(self) -> str:
+        return f"CREATE INDEX {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+@dataclass(frozen=True)
+class PlanCheck:
+    """
+    実行計画の確認
+
+    Attributes:
+        query: アプリケーションが実行するクエリ（api_server の定義をそのまま使う。プレースホルダーは %s）
+        params: クエリパラメータ
+        table: 全件走査になっていないことを確認するテーブル
+        index: 使われていることを確認するインデックス（Noneの場合は全件走査でないことのみ確認）
+        full_scan: 全件を読むクエリ（スナップショットなど）。全件走査は問題にせず、クエリが現在のスキーマで
+            実行できること（EXPLAINが成功すること）のみ確認する
+    """
+    query: str
+    params: tuple
+    table: str
+    index: Optional[str] = None
+    full_scan: bool = False
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    番号順に適用するスキーマの変更
+
+    checks はアプリケーションのクエリ（api_server）を読み込んで確認の一覧を返す関数です
+    （マイグレーションの適用だけの場合は api_server を読み込まない）。
+    """
+    version: int
+    description: str
+    indexes: Tuple[Index, ...] = ()
+    checks: Callable[[], Tuple[PlanCheck, ...]] = tuple
+
+
+def _user_checks() -> Tuple[PlanCheck, ...]:
+    """ログイン・プロフィールの検索"""
+    from api_server import LOGIN_USER_QUERY, PROFILE_PREFERENCES_QUERY, PROFILE_USER_QUERY
+
+    return (
+        # username・email の一意インデックスは init.sql で作成済み
+        # ログインは OR ではなく UNION ALL で検索する（LOGIN_USER_QUERY）
+        PlanCheck(LOGIN_USER_QUERY, ("migration-check", "migration-check"), "users"),
+        PlanCheck(PROFILE_USER_QUERY, (0,), "users"),
+        PlanCheck(PROFILE_PREFERENCES_QUERY, (0,), "users_preferences"),
+    )
+
+
+def _station_checks() -> Tuple[PlanCheck, ...]:
+    """駅データの一覧・スナップショット・都道府県一覧"""
+    from api_server import (PREFECTURE_COUNTS_QUERY, SNAPSHOT_QUERY, build_station_list_query,
+                            parse_station_list_args)
+
+    prefecture_query, prefecture_params = build_station_list_query("body", parse_station_list_args({"prefecture": "東京都"}))
+    list_query, list_params = build_station_list_query("body", parse_station_list_args({}))
+    return (
+        # 都道府県の絞り込みは (prefecture, station_name) のインデックスで絞り込みと駅名順の並び替えを行う
+        PlanCheck(prefecture_query, prefecture_params, "stations", "idx_stations_prefecture_name"),
+        # 都道府県一覧の集計（GROUP BY prefecture）は (prefecture, station_name) のインデックスだけで完結する
+        PlanCheck(PREFECTURE_COUNTS_QUERY, (), "stations", "idx_stations_prefecture_name"),
+        # 絞り込みなしの一覧・スナップショットは全件を読む。駅名順の並び替えに idx_stations_station_name を使うかは
+        # オプティマイザーの判断による（SQLiteは使う。MySQLは全件走査 + filesort を選ぶことがある）ため、
+        # 現在のスキーマで実行できることのみ確認する
+        PlanCheck(list_query, list_params, "stations", full_scan=True),
+        PlanCheck(SNAPSHOT_QUERY, (), "stations", full_scan=True),
+    )
+
+
+MIGRATIONS = [
+    Migration(
+        version=1,
+        description="usersの検索（ログイン・プロフィール）が一意インデックス・主キーを使うことを確認",
+        checks=_user_checks,
+    ),
+    Migration(
+        version=2,
+        description="stationsの駅名順・都道府県の絞り込みのインデックス",
+        indexes=(
+            Index("idx_stations_station_name", "stations", ("station_name",)),
+            Index("idx_stations_prefecture_name", "stations", ("prefecture", "station_name")),
+        ),
+        checks=_station_checks,
+    ),
+]
+
+
+def _is_full_scan(row: Dict[str, Any], table: str) -> bool:
+    """実行計画の行がテーブルの全件走査か（MySQLは type=ALL、SQLiteはインデックスを使わない SCAN）"""
+    if row.get("table") == table and row.get("type") == "ALL":
+        return True
+    detail = row.get("detail") or ""
+    return bool(re.match(rf"SCAN (TABLE )?{table}\b", detail)) and "INDEX" not in detail
+
+
+def _uses_index(row: Dict[str, Any], index: str) -> bool:
+    """実行計画の行がインデックスを使っているか（MySQLは key、SQLiteは detail に記載される）"""
+    return row.get("key") == index or f"INDEX {index}" in (row.get("detail") or "")
+
+
+def check_plan(db, check: PlanCheck) -> Optional[str]:
+    """
+    クエリの実行計画を確認
+
+    Returns:
+        問題がない場合はNone、ある場合はその内容
+    """
+    plan = db.explain(check.query, check.params)
+    if check.full_scan:
+        return None
+    if any(_is_full_scan(row, check.table) for row in plan):
+        return f"{check.table}を全件走査しています"
+    if check.index and not any(_uses_index(row, check.index) for row in plan):
+        return f"{check.index}を使っていません"
+    return None
+
+
+def run_checks(db, migrations: List[Migration]) -> List[str]:
+    """マイグレーションの実行計画の確認を行い、問題の一覧を返す"""
+    problems = []
+    for migration in migrations:
+        for check in migration.checks():
+            problem = check_plan(db, check)
+            if problem:
+                problems.append(f"{migration.version:04d}: {problem}（{' '.join(check.query.split())}）")
+    return problems
+
+
+def applied_versions(db) -> Dict[int, Any]:
+    """適用済みのマイグレーションの番号と適用日時"""
+    db.execute_non_query(MIGRATIONS_TABLE_SQL)
+    rows = db.execute_query("SELECT version, applied_at FROM schema_migrations ORDER BY version")
+    return {row["version"]: row["applied_at"] for row in rows}
+
+
+def pending_migrations(db) -> List[Migration]:
+    """未適用のマイグレーション（番号順）"""
+    applied = applied_versions(db)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+def apply_migration(db, migration: Migration):
+    """マイグレーションを適用して記録（作成済みのインデックスは作成しない）"""
+    for index in migration.indexes:
+        if not db.has_index(index.table, index.name):
+            db.execute_non_query(index.create_sql)
+    db.execute_non_query(
+        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+        (migration.version, migration.description),
+    )
+
+
+def migrate(db) -> List[Migration]:
+    """
+    未適用のマイグレーションを番号順に適用
+
+    Returns:
+        適用したマイグレーション
+    """
+    migrations = pending_migrations(db)
+    for migration in migrations:
+        apply_migration(db, migration)
+    return migrations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="データベースのマイグレーション")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--status", action="store_true", help="適用状況の一覧を表示")
+    group.add_argument("--check", action="store_true", help="適用済みのマイグレーションの実行計画を確認")
+    args = parser.parse_args()
+
+    from api_server import SCHEMA_VERSION
+    from database_connection import connect_database
+    from settings import get_settings
+
+    # /readyz はこの番号まで適用されていることを確認するため、マイグレーションを追加したら合わせて更新する
+    if MIGRATIONS[-1].version != SCHEMA_VERSION:
+        print(f"api_server.SCHEMA_VERSION（{SCHEMA_VERSION}）が最新のマイグレーション"
+              f"（{MIGRATIONS[-1].version:04d}）と一致しません", file=sys.stderr)
+        return 1
+
+    db = connect_database(**get_settings().database_config)
+    try:
+        if args.status:
+            applied = applied_versions(db)
+            for migration in MIGRATIONS:
+                state = f"適用済み（{applied[migration.version]}）" if migration.version in applied else "未適用"
+                print(f"{migration.version:04d}  {state}  {migration.description}")
+            return 0
+
+        if args.check:
+            applied = applied_versions(db)
+            checked = [migration for migration in MIGRATIONS if migration.version in applied]
+        else:
+            checked = migrate(db)
+            for migration in checked:
+                print(f"適用しました: {migration.version:04d} {migration.description}")
+            if not checked:
+                print("未適用のマイグレーションはありません")
+
+        problems = run_checks(db, checked)
+    finally:
+        db.close()
+
+    if problems:
+        print("NG: 実行計画に問題があります", file=sys.stderr)
+        for line in problems:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
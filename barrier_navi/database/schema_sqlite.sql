@@ -0,0 +1,48 @@
+-- SQLite用のテーブル定義（init.sql と同じテーブル・カラム）
+-- database/import_csv_sqlite.py がデータベースの作成時に実行します
+
+CREATE TABLE IF NOT EXISTS stations (
+    id INTEGER PRIMARY KEY,
+    railway_operator VARCHAR(255),
+    station_name VARCHAR(255),
+    line_name TEXT,
+    prefecture VARCHAR(255),
+    city VARCHAR(255),
+    step_response_status INTEGER,
+    num_platforms INTEGER,
+    num_step_free_platforms INTEGER,
+    num_elevators INTEGER,
+    num_compliant_elevators INTEGER,
+    num_escalators INTEGER,
+    num_compliant_escalators INTEGER,
+    num_other_lifts INTEGER,
+    num_slopes INTEGER,
+    num_compliant_slopes INTEGER,
+    has_tactile_paving INTEGER,
+    has_guidance_system INTEGER,
+    has_accessible_restroom INTEGER,
+    has_accessible_gate INTEGER,
+    has_accessible_ticket_machine INTEGER,
+    num_wheelchair_accessible_platforms INTEGER,
+    has_fall_prevention INTEGER
+);
+
+-- 日時はMySQLのDATETIMEと同じ形式（YYYY-MM-DD HH:MM:SS）の文字列で保存します
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) NOT NULL UNIQUE,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_login_at DATETIME NULL
+);
+
+CREATE TABLE IF NOT EXISTS users_preferences (
+    user_id INTEGER PRIMARY KEY,
+    disability_type TEXT NULL,       -- 障害の種類（JSON配列形式）
+    favorite_stations TEXT NULL,     -- お気に入りの駅のIDリスト（JSON配列形式）
+    preferred_features TEXT NULL,    -- 優先したい機能のリスト（JSON配列形式）
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
@@ -110,7 +110,7 @@ class ProfilePage {
     }
     async searchStations(keyword) {
         try {
-            const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(keyword)}&limit=10`);
+            const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(keyword)}&limit=10&fields=id,station_name,prefecture,city`);
             const data = await response.json();
             if (data.success && data.data) {
                 this.showStationSearchResults(data.data);
@@ -307,7 +307,7 @@ class ProfilePage {
         const stations = [];
         for (const id of stationIds) {
             try {
-                const response = await fetch(`${this.apiBaseUrl}/stations/${id}`);
+                const response = await fetch(`${this.apiBaseUrl}/stations/${id}?fields=id,station_name`);
                 const data = await response.json();
                 if (data.success && data.data) {
                     stations.push({ id: data.data.id, name: data.data.station_name });
@@ -333,7 +333,7 @@ class ProfilePage {
             const cleanName = name.replace(/^駅ID:\s*/, '').trim();
             // 駅名から駅IDを検索（完全一致）
             try {
-                const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(cleanName)}&limit=50`);
+                const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(cleanName)}&limit=50&fields=id,station_name`);
                 const data = await response.json();
                 if (data.success && data.data && data.data.length > 0) {
                     // 完全一致する駅を探す
@@ -0,0 +1,30 @@
+// ビルド後の静的ファイル（dist/*.js と styles.css）の圧縮版（.br / .gz）を生成するスクリプト
+// Flaskサーバーはクライアントが対応していれば、リクエストごとに圧縮せずこれらをそのまま返す
+import { readdirSync, readFileSync, writeFileSync } from 'node:fs';
+import { dirname, join } from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib';
+
+const frontendDir = join(dirname(fileURLToPath(import.meta.url)), '..');
+const distDir = join(frontendDir, 'dist');
+
+const targets = [
+  ...readdirSync(distDir)
+    .filter((name) => name.endsWith('.js'))
+    .map((name) => join(distDir, name)),
+  join(frontendDir, 'styles.css'),
+];
+
+for (const file of targets) {
+  const source = readFileSync(file);
+  const br = brotliCompressSync(source, {
+    params: {
+      [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+      [constants.BROTLI_PARAM_SIZE_HINT]: source.length,
+    },
+  });
+  const gz = gzipSync(source, { level: 9 });
+  writeFileSync(`${file}.br`, br);
+  writeFileSync(`${file}.gz`, gz);
+  console.log(`${file}: ${source.length} -> br ${br.length}, gz ${gz.length} bytes`);
+}
@@ -149,7 +149,7 @@ class ProfilePage {
 
   private async searchStations(keyword: string): Promise<void> {
     try {
-      const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(keyword)}&limit=10`);
+      const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(keyword)}&limit=10&fields=id,station_name,prefecture,city`);
       const data: ApiResponse<Station[]> = await response.json();
 
       if (data.success && data.data) {
@@ -358,7 +358,7 @@ class ProfilePage {
     const stations: Array<{ id: number; name: string }> = [];
     for (const id of stationIds) {
       try {
-        const response = await fetch(`${this.apiBaseUrl}/stations/${id}`);
+        const response = await fetch(`${this.apiBaseUrl}/stations/${id}?fields=id,station_name`);
         const data: ApiResponse<Station> = await response.json();
         if (data.success && data.data) {
           stations.push({ id: data.data.id, name: data.data.station_name });
@@ -384,7 +384,7 @@ class ProfilePage {
       
       // 駅名から駅IDを検索（完全一致）
       try {
-        const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(cleanName)}&limit=50`);
+        const response = await fetch(`${this.apiBaseUrl}/stations/search?keyword=${encodeURIComponent(cleanName)}&limit=50&fields=id,station_name`);
         const data: ApiResponse<Station[]> = await response.json();
         if (data.success && data.data && data.data.length > 0) {
           // 完全一致する駅を探す